@@ -0,0 +1,117 @@
+# benchmarks/great_circle.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Measures how long finding the nearest airports to each of many random points
+# takes with the NumPy kernels, compared with doing it through SQL: a search of
+# the R*Tree spatial index for each point, and a plain SQL query for each point
+# that orders every airport by its distance (which needs SQLite's math functions).
+#
+# The database is copied first, since the spatial index is created if it's missing.
+#
+# Run it from the project directory with:
+#
+#     python -m benchmarks.great_circle path/to/airport.db [points] [count]
+
+import math
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+from p2app.engine.greatcircle import *
+from p2app.engine.spatial import *
+
+
+# The haversine formula in SQL, for the distance from the point (?1, ?2)
+_DISTANCE_SQL = (
+    f'2 * {EARTH_RADIUS_KM} * asin(min(1, sqrt('
+    'pow(sin(radians(latitude_deg - ?1) / 2), 2) + '
+    'cos(radians(?1)) * cos(radians(latitude_deg)) * pow(sin(radians(longitude_deg - ?2) / 2), 2))))')
+
+
+def random_points(count: int) -> list[tuple[float, float]]:
+    """Returns random points, spread evenly over the earth's surface."""
+
+    generator = random.Random(33)
+    return [(math.degrees(math.asin(generator.uniform(-1, 1))), generator.uniform(-180, 180)) for _ in range(count)]
+
+
+def numpy_seconds(connection: sqlite3.Connection, points: list, count: int) -> float:
+    """Returns how long the NumPy kernels take, including reading the coordinates."""
+
+    start = time.perf_counter()
+    coordinates = AirportCoordinates()
+    coordinates.load(connection)
+    coordinates.nearest(points, count)
+    return time.perf_counter() - start
+
+
+def rtree_seconds(connection: sqlite3.Connection, points: list, count: int) -> float:
+    """Returns how long searching the R*Tree spatial index for each point takes."""
+
+    table = spatial_table('airport')
+    start = time.perf_counter()
+
+    for latitude, longitude in points:
+        nearest_places(connection, table, latitude, longitude, count, True)
+
+    return time.perf_counter() - start
+
+
+def sql_seconds(connection: sqlite3.Connection, points: list, count: int) -> float:
+    """Returns how long ordering every airport by distance in SQL takes for each point."""
+
+    sql = f'SELECT airport_id, {_DISTANCE_SQL} AS distance FROM airport ORDER BY distance LIMIT ?3'
+    start = time.perf_counter()
+
+    for latitude, longitude in points:
+        connection.execute(sql, (latitude, longitude, count)).fetchall()
+
+    return time.perf_counter() - start
+
+
+def main():
+    if len(sys.argv) < 2:
+        print('usage: python -m benchmarks.great_circle path/to/airport.db [points] [count]')
+        return
+
+    if not numpy_available():
+        print('NumPy is not installed')
+        return
+
+    point_count = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    points = random_points(point_count)
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        path = Path(temporary_directory) / 'airport.db'
+        shutil.copyfile(sys.argv[1], path)
+        connection = sqlite3.connect(path)
+        provision_spatial(connection)
+
+        print(f'nearest {count} airports to each of {point_count} points')
+        print(f'{"method":>8}  {"seconds":>8}  {"per point (ms)":>14}')
+
+        results = [('numpy', numpy_seconds(connection, points, count)),
+                   ('rtree', rtree_seconds(connection, points, count))]
+
+        try:
+            # The plain SQL query is slow enough that a sample of the points is timed,
+            # and scaled up to all of them
+            sample = points[:max(1, point_count // 100)]
+            results.append(('sql', sql_seconds(connection, sample, count) * point_count / len(sample)))
+        except sqlite3.OperationalError:
+            print('(SQLite was built without its math functions, so the plain SQL query is skipped)')
+
+        for method, seconds in results:
+            print(f'{method:>8}  {seconds:>8.2f}  {1000 * seconds / point_count:>14.3f}')
+
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/import_scaling.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Measures how importing a directory of OurAirports CSV files scales with the
+# number of worker processes parsing them, both for parsing alone and for the
+# whole import (whose writes are done by one connection, however many workers
+# there are).
+#
+# Run it from the project directory with:
+#
+#     python -m benchmarks.import_scaling path/to/csv/directory [max_workers]
+
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from p2app.engine.importer import *
+from p2app.engine.ourairports import SOURCE_FILES
+
+
+_SCHEMA_PATH = Path(__file__).parent.parent / 'schema.sql'
+
+
+def parse_seconds(directory: Path, workers: int) -> float:
+    """Returns how long parsing every file takes with the given number of workers."""
+
+    start = time.perf_counter()
+
+    if workers == 1:
+        for source in SOURCE_FILES:
+            for _ in parse_chunks(directory / source.file_name, source.convert):
+                pass
+    else:
+        with ProcessPoolExecutor(workers, multiprocessing.get_context('spawn')) as executor:
+            for source in SOURCE_FILES:
+                for _ in parallel_parse_chunks(directory / source.file_name, source.convert, executor, workers):
+                    pass
+
+    return time.perf_counter() - start
+
+
+def import_seconds(directory: Path, workers: int) -> float:
+    """Returns how long importing every file into an empty database takes with the
+    given number of workers."""
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        connection = sqlite3.connect(Path(temporary_directory) / 'airport.db')
+        connection.executescript(_SCHEMA_PATH.read_text())
+        connection.execute('PRAGMA foreign_keys = ON')
+
+        start = time.perf_counter()
+
+        for event in import_ourairports(connection, directory, workers = workers):
+            if isinstance(event, ImportFailedEvent):
+                raise RuntimeError(event.reason())
+
+        seconds = time.perf_counter() - start
+        connection.close()
+
+    return seconds
+
+
+def main():
+    if len(sys.argv) < 2:
+        print('usage: python -m benchmarks.import_scaling path/to/csv/directory [max_workers]')
+        return
+
+    directory = Path(sys.argv[1])
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    worker_counts = sorted({1, *(2 ** power for power in range(1, max_workers.bit_length())), max_workers})
+
+    print(f'{"workers":>7}  {"parse (s)":>9}  {"speedup":>7}  {"import (s)":>10}  {"speedup":>7}')
+
+    for workers in worker_counts:
+        parse = parse_seconds(directory, workers)
+        full = import_seconds(directory, workers)
+
+        if workers == 1:
+            serial_parse, serial_full = parse, full
+
+        print(f'{workers:>7}  {parse:>9.2f}  {serial_parse / parse:>7.2f}  {full:>10.2f}  {serial_full / full:>7.2f}')
+
+
+if __name__ == '__main__':
+    main()
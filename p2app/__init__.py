@@ -8,5 +8,6 @@
 # YOU WILL NOT NEED TO MODIFY THIS FILE AT ALL
 
 from .engine import Engine
+from .engine import EngineWorker
 from .events import EventBus
 from .views import MainView
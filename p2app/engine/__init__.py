@@ -8,3 +8,4 @@
 # YOU WILL NOT NEED TO MODIFY THIS FILE AT ALL
 
 from .main import Engine
+from .worker import EngineWorker
@@ -0,0 +1,203 @@
+# p2app/engine/advisor.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# An index advisor, which sends the engine a representative set of events, records
+# every statement it issues, and reports the ones that SQLite would run by scanning
+# a whole table.
+#
+# The sample saves are made inside a savepoint that's rolled back afterward, so
+# advising leaves the database exactly as it was.
+#
+# Run it from the command line with:
+#
+#     python -m p2app.engine.advisor path/to/airport.db [--provision]
+
+import math
+import sys
+from collections import namedtuple
+from pathlib import Path
+from p2app.events import *
+from .main import Engine
+from .transactions import TransactionManager
+
+
+QueryPlanReport = namedtuple('QueryPlanReport', ['statement', 'detail'])
+
+
+_PLANNED_STATEMENTS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+# The statements that FTS5 issues against its own shadow tables are traced too,
+# but aren't the engine's to index; they always name the schema this way
+_SHADOW_TABLE_PREFIX = "'main'."
+
+
+def sample_events(connection) -> list:
+    """Builds the events to send the engine, using the first row of each table for
+    the values being searched for, loaded and saved (the saves are rolled back).
+
+    Args:
+        connection: a connection to an airport database
+    """
+
+    events = []
+
+    continent = connection.execute(
+        'SELECT continent_id, continent_code, name FROM continent LIMIT 1').fetchone()
+
+    if continent is not None:
+        continent = Continent(*continent)
+        events += [
+            StartContinentSearchEvent(continent.continent_code, continent.name),
+            StartContinentSearchEvent(continent.continent_code, None),
+            StartContinentSearchEvent(None, continent.name),
+            LoadContinentEvent(continent.continent_id),
+            SaveContinentEvent(continent)]
+
+    country = connection.execute(
+        'SELECT country_id, country_code, name, continent_id, wikipedia_link, keywords FROM country LIMIT 1').fetchone()
+
+    if country is not None:
+        country = Country(*country)
+        events += [
+            StartCountrySearchEvent(country.country_code, country.name),
+            StartCountrySearchEvent(country.country_code, None),
+            StartCountrySearchEvent(None, country.name),
+            LoadCountryEvent(country.country_id),
+            SaveCountryEvent(country)]
+
+    region = connection.execute(
+        'SELECT region_id, region_code, local_code, name, continent_id, country_id, wikipedia_link, keywords FROM region LIMIT 1').fetchone()
+
+    if region is not None:
+        region = Region(*region)
+        events += [
+            StartRegionSearchEvent(region.region_code, region.local_code, region.name),
+            StartRegionSearchEvent(region.region_code, None, None),
+            StartRegionSearchEvent(None, region.local_code, None),
+            StartRegionSearchEvent(None, None, region.name),
+            LoadRegionEvent(region.region_id),
+            SaveRegionEvent(region)]
+
+    airport = connection.execute(f'SELECT {", ".join(Airport._fields)} FROM airport LIMIT 1').fetchone()
+
+    if airport is not None:
+        airport = Airport(*airport)
+        codes = (airport.airport_ident, airport.iata_code, airport.gps_code, airport.local_code, airport.name)
+        events.append(StartAirportSearchEvent(*codes))
+
+        # A search by each of the airport's codes alone, leaving out the ones it
+        # doesn't have, since a search for nothing isn't made
+        for index, code in enumerate(codes):
+            if code is not None:
+                events.append(StartAirportSearchEvent(*(code if i == index else None for i in range(len(codes)))))
+
+        events += [
+            LoadAirportEvent(airport.airport_id),
+            SaveAirportEvent(airport)]
+
+    return events
+
+
+def advise(engine) -> list[QueryPlanReport]:
+    """Sends the sample events to an engine with an open database, then runs
+    EXPLAIN QUERY PLAN on every statement it issued. The writes the events make are
+    rolled back, along with any other writes not yet committed, which are
+    committed first.
+
+    Args:
+        engine: an engine with an open database
+
+    Returns:
+        a report for each step of each statement's plan that scans a whole table
+
+    Raises:
+        RuntimeError: if an event was answered without the engine issuing any
+        statement, in which case its plans couldn't be checked
+    """
+
+    connection = engine.connection
+    events = sample_events(connection)
+    statements = []
+    traced = 0
+
+    def record(statement):
+        nonlocal traced
+
+        if statement.lstrip().upper().startswith(_PLANNED_STATEMENTS) and _SHADOW_TABLE_PREFIX not in statement:
+            traced += 1
+
+            if statement not in statements:
+                statements.append(statement)
+
+    # Nothing may be committed while the sample saves are pending, since a commit
+    # would end the savepoint they're rolled back to
+    engine.commit_changes()
+    transactions = engine.transactions
+    engine.transactions = TransactionManager(math.inf, math.inf)
+
+    connection.execute('SAVEPOINT advisor')
+    connection.set_trace_callback(record)
+
+    try:
+        for event in events:
+            # An event answered from the engine's caches never reaches the database
+            engine.entity_cache.clear()
+            engine.search_cache.clear()
+            traced = 0
+
+            for _ in engine.process_event(event):
+                pass
+
+            if traced == 0:
+                raise RuntimeError(f'{event} issued no statements, so its plans could not be checked')
+    finally:
+        connection.set_trace_callback(None)
+        # The savepoint began the transaction, since everything before it was
+        # committed, so the whole transaction is rolled back; releasing the savepoint
+        # after rolling back to it would commit, and so rewrite the file's header
+        connection.rollback()
+        engine.transactions = transactions
+
+        # What the engine remembers of the saves was rolled back with them
+        engine.entity_cache.clear()
+        engine.search_cache.clear()
+        engine.airport_coordinates.clear()
+        engine.airport_codes.clear()
+
+    reports = []
+
+    for statement in statements:
+        for *_, detail in connection.execute(f'EXPLAIN QUERY PLAN {statement}'):
+            if detail.startswith('SCAN ') and not detail.startswith('SCAN CONSTANT ROW'):
+                reports.append(QueryPlanReport(statement, detail))
+
+    return reports
+
+
+def main():
+    if len(sys.argv) < 2:
+        print('usage: python -m p2app.engine.advisor path/to/airport.db [--provision]')
+        return
+
+    engine = Engine(provision_indexes = '--provision' in sys.argv[2:])
+    for event in engine.process_event(OpenDatabaseEvent(Path(sys.argv[1]))):
+        if isinstance(event, DatabaseOpenFailedEvent):
+            print(event.reason())
+            return
+
+    reports = advise(engine)
+
+    for report in reports:
+        print(f'{report.detail}: {report.statement}')
+
+    if not reports:
+        print('No statements scan a whole table')
+
+    for _ in engine.process_event(CloseDatabaseEvent()):
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# p2app/engine/batch.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Saves many records of one kind at once, a chunk of rows per executemany call,
+# inside the engine's current transaction. A chunk in which any row fails is
+# rolled back and saved again one row at a time, so that a constraint violated by
+# one row is reported for that row without keeping the rest of the batch out.
+
+import sqlite3
+from sqlite3 import Cursor
+from p2app.events import BatchSaveFailure
+
+
+# The number of rows written by one executemany call
+CHUNK_SIZE = 500
+
+
+def save_batch(cursor: Cursor, table: str, columns: list[str], records: list[tuple],
+               allocate_id) -> tuple[list[tuple], list[BatchSaveFailure]]:
+    """Saves a batch of records into a table, inserting those without an id and
+    updating the rest.
+
+    Args:
+        cursor: a cursor object used to query the database
+        table: the table the records are saved into
+        columns: the table's columns, in the order of the records' fields, with the
+        id column first
+        records: the records, already cleaned up as they would be saved one at a time
+        allocate_id: a function returning the id of a new row, or None if SQLite
+        should assign it
+
+    Returns:
+        the saved records (with the ids of new ones filled in), in the order they
+        were in the batch, and a BatchSaveFailure for each record that wasn't saved
+    """
+
+    id_column = columns[0]
+    insert_sql = f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})'
+    update_sql = f'UPDATE {table} SET {", ".join(f"{column}=?" for column in columns[1:])} WHERE {id_column}=?'
+
+    inserts = []
+    updates = []
+
+    for index, record in enumerate(records):
+        if record[0] is None:
+            inserts.append((index, _with_id(record, allocate_id())))
+        else:
+            updates.append((index, record))
+
+    # SAVEPOINT outside of a transaction would commit on release, so one is begun
+    # first, leaving the commit to the engine's transaction manager
+    if not cursor.connection.in_transaction:
+        cursor.execute('BEGIN')
+
+    saved = []
+    failures = []
+
+    for start in range(0, len(inserts), CHUNK_SIZE):
+        _save_chunk(cursor, table, insert_sql, inserts[start:start + CHUNK_SIZE], tuple, saved, failures)
+
+    for start in range(0, len(updates), CHUNK_SIZE):
+        _save_chunk(cursor, table, update_sql, updates[start:start + CHUNK_SIZE],
+                    lambda record: (*record[1:], record[0]), saved, failures)
+
+    saved.sort(key = lambda indexed: indexed[0])
+
+    # A new record that failed is reported as it was given, without the id it was
+    # going to have
+    failures = sorted((failure._replace(record = records[failure.index]) for failure in failures),
+                      key = lambda failure: failure.index)
+
+    return [record for _, record in saved], failures
+
+
+def stripped(text: str | None) -> str | None:
+    """Returns text without the whitespace around it, or None if it's None."""
+
+    return text if text is None else text.strip()
+
+
+def _save_chunk(cursor, table, sql, chunk, parameters_of, saved, failures):
+    # Rows whose ids SQLite assigns have to be written one at a time to learn them
+    if all(record[0] is not None for _, record in chunk):
+        cursor.execute('SAVEPOINT batch_chunk')
+
+        try:
+            cursor.executemany(sql, [parameters_of(record) for _, record in chunk])
+            complete = cursor.rowcount == len(chunk)
+        except sqlite3.Error:
+            complete = False
+
+        if complete:
+            cursor.execute('RELEASE batch_chunk')
+            saved.extend(chunk)
+            return
+
+        cursor.execute('ROLLBACK TO batch_chunk')
+        cursor.execute('RELEASE batch_chunk')
+
+    for index, record in chunk:
+        try:
+            cursor.execute(sql, parameters_of(record))
+        except sqlite3.Error as e:
+            failures.append(BatchSaveFailure(index, record, str(e)))
+            continue
+
+        if cursor.rowcount == 0:
+            failures.append(BatchSaveFailure(index, record, f'No {table} has id {record[0]}'))
+        elif record[0] is None:
+            saved.append((index, _with_id(record, cursor.lastrowid)))
+        else:
+            saved.append((index, record))
+
+
+def _with_id(record, record_id):
+    return record._replace(**{record._fields[0]: record_id})
@@ -0,0 +1,234 @@
+# p2app/engine/cache.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# In-memory caches of the continents, countries, regions and airports the engine
+# has recently read or written, so that loading one again costs no I/O, and of the
+# results of recent searches, so that running one again costs no I/O either.
+
+from collections import OrderedDict
+
+
+class EntityCache:
+    """A bounded cache of entity records (such as Continent, Country, Region and
+    Airport namedtuples) keyed on the kind of entity and its id, which evicts the least
+    recently used record when it's full.
+
+    Attributes:
+        max_size: the most records kept at once
+        hits: the number of lookups that found a record
+        misses: the number of lookups that didn't
+    """
+
+    def __init__(self, max_size: int = 4096):
+        """Initializes an empty cache.
+
+        Args:
+            max_size: the most records kept at once
+        """
+
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._records = OrderedDict()
+
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+    def get(self, entity: str, entity_id: int):
+        """Returns the cached record for an entity, or None if it isn't cached.
+
+        Args:
+            entity: the kind of entity, such as 'region'
+            entity_id: the entity's id
+        """
+
+        key = (entity, entity_id)
+
+        if key in self._records:
+            self._records.move_to_end(key)
+            self.hits += 1
+            return self._records[key]
+        else:
+            self.misses += 1
+            return None
+
+
+    def put(self, entity: str, entity_id: int, record):
+        """Caches a record, evicting the least recently used one if the cache is full.
+
+        Args:
+            entity: the kind of entity, such as 'region'
+            entity_id: the entity's id
+            record: the entity's record
+        """
+
+        key = (entity, entity_id)
+        self._records[key] = record
+        self._records.move_to_end(key)
+
+        while len(self._records) > self.max_size:
+            self._records.popitem(last = False)
+
+
+    def put_all(self, entity: str, records):
+        """Caches records whose first field is their id.
+
+        Args:
+            entity: the kind of entity, such as 'region'
+            records: the records to cache
+        """
+
+        for record in records:
+            self.put(entity, record[0], record)
+
+
+    def invalidate(self, entity: str, entity_id: int):
+        """Removes an entity's record from the cache, if it's there.
+
+        Args:
+            entity: the kind of entity, such as 'region'
+            entity_id: the entity's id
+        """
+
+        self._records.pop((entity, entity_id), None)
+
+
+    def clear(self):
+        """Removes every record from the cache."""
+
+        self._records.clear()
+
+
+class SearchResultCache:
+    """A cache of the result events of recent searches, keyed on the kind of entity
+    searched for and the search's query, bounded by the total number of results it
+    holds, with a search that found nothing counting as one result, so that the
+    number of searches held is bounded too.
+
+    Each kind of entity has a generation, which any write to that kind of entity
+    bumps; the searches cached under its earlier generation are dropped then.
+
+    Attributes:
+        max_results: the most results (summed over every cached search, counting at
+        least one for each) kept at once
+        hits: the number of lookups that found cached results
+        misses: the number of lookups that didn't
+    """
+
+    def __init__(self, max_results: int = 20000):
+        """Initializes an empty cache.
+
+        Args:
+            max_results: the most results kept at once
+        """
+
+        self.max_results = max_results
+        self.hits = 0
+        self.misses = 0
+        self._generations = {}
+        self._searches = OrderedDict()
+        self._result_count = 0
+
+        # The keys of the cached searches for each kind of entity, so that they can be
+        # dropped when it's bumped
+        self._keys = {}
+
+
+    def generation(self, entity: str) -> int:
+        """Returns the current generation of a kind of entity.
+
+        Args:
+            entity: the kind of entity, such as 'region'
+        """
+
+        return self._generations.get(entity, 0)
+
+
+    def bump(self, entity: str):
+        """Marks every cached search for a kind of entity as stale, after a write to it,
+        dropping them from the cache.
+
+        Args:
+            entity: the kind of entity, such as 'region'
+        """
+
+        self._generations[entity] = self.generation(entity) + 1
+
+        for key in list(self._keys.get(entity, ())):
+            self._remove((entity, key))
+
+
+    def get(self, entity: str, key) -> list | None:
+        """Returns the result events of a cached search, or None if the search isn't
+        cached or its results are stale.
+
+        Args:
+            entity: the kind of entity searched for
+            key: the search's key
+        """
+
+        cached = self._searches.get((entity, key))
+
+        if cached is not None and cached[0] == self.generation(entity):
+            self._searches.move_to_end((entity, key))
+            self.hits += 1
+            return cached[1]
+
+        if cached is not None:
+            self._remove((entity, key))
+
+        self.misses += 1
+        return None
+
+
+    def put(self, entity: str, key, events: list, generation: int, result_count: int):
+        """Caches a search's result events, evicting the least recently used searches
+        until the cache is within its bound.
+
+        Args:
+            entity: the kind of entity searched for
+            key: the search's key
+            events: the search's result events
+            generation: the entity's generation when the search began, so that results
+            read before a write aren't cached after it
+            result_count: the number of results in the events
+        """
+
+        size = max(result_count, 1)
+
+        if generation != self.generation(entity) or size > self.max_results:
+            return
+
+        self._remove((entity, key))
+        self._searches[(entity, key)] = (generation, events, size)
+        self._keys.setdefault(entity, set()).add(key)
+        self._result_count += size
+
+        while self._result_count > self.max_results:
+            self._remove(next(iter(self._searches)))
+
+
+    def clear(self):
+        """Removes every cached search."""
+
+        self._searches.clear()
+        self._keys.clear()
+        self._result_count = 0
+
+
+    def _remove(self, cache_key):
+        cached = self._searches.pop(cache_key, None)
+
+        if cached is not None:
+            self._result_count -= cached[2]
+
+            entity, key = cache_key
+            keys = self._keys[entity]
+            keys.discard(key)
+
+            if not keys:
+                del self._keys[entity]
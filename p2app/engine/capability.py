@@ -0,0 +1,275 @@
+# p2app/engine/capability.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# A table of what each airport's open runways can take, updated by triggers as
+# runways are written, so that finding the airports with, say, a lighted paved
+# runway of at least 8,000 feet reads an index of that table rather than every
+# runway.
+#
+# The table has a row for each airport, class of surface and whether the runways
+# are lighted, holding the longest and widest of the airport's open runways of
+# that kind. When a runway is written, the rows of the kinds it was and is are
+# counted again from the airport's runways, since a maximum can't be taken back
+# the way a count can.
+
+import sqlite3
+from p2app.events import *
+from .indexes import provision_indexes
+
+
+# The table of capabilities
+CAPABILITY_TABLE = 'runway_capability'
+
+# The index of the table by runway length, which covers a search, since an index of
+# a WITHOUT ROWID table holds its primary key
+CAPABILITY_INDEX = 'runway_capability_length_index'
+
+# The classes of surface a runway's surface is put in by how it begins, checked in
+# order; a surface that's missing or matches none of them is SURFACE_UNKNOWN
+_SURFACE_PATTERNS = [
+    (SURFACE_PAVED, ['ASP', 'BIT', 'CON', 'PEM', 'TAR', 'PAV', 'CEM']),
+    (SURFACE_WATER, ['WAT']),
+    (SURFACE_UNKNOWN, ['UNK']),
+    (SURFACE_UNPAVED, ['GR', 'TURF', 'DIRT', 'SAND', 'CLAY', 'COR', 'SOIL', 'SNOW', 'ICE', 'MAT', 'PSP', 'LAT'])
+]
+
+# The index the triggers find an airport's runways by
+_RUNWAY_INDEX = 'runway_airport_id_index'
+
+
+def surface_class_sql(prefix: str = '') -> str:
+    """Returns the expression for the class of a runway's surface.
+
+    Args:
+        prefix: what's put before the surface column, such as 'new.' in a trigger
+    """
+
+    cases = []
+
+    for surface_class, patterns in _SURFACE_PATTERNS:
+        matches = ' OR '.join(f"upper({prefix}surface) LIKE '{pattern}%'" for pattern in patterns)
+        cases.append(f"WHEN {matches} THEN '{surface_class}'")
+
+    return f"CASE {' '.join(cases)} ELSE '{SURFACE_UNKNOWN}' END"
+
+
+def _capabilities_sql(condition: str = 'TRUE') -> str:
+    # The query for the rows of the table of capabilities, for the open runways that
+    # meet a condition
+    return (
+        f'SELECT airport_id, {surface_class_sql()} AS surface_class, lighted, '
+        f'MAX(length_ft) AS max_length_ft, MAX(width_ft) AS max_width_ft, COUNT(*) AS runways '
+        f'FROM runway WHERE closed = 0 AND {condition} GROUP BY 1, 2, 3')
+
+
+def capability_provisioned(connection: sqlite3.Connection) -> bool:
+    """Checks whether the table of capabilities exists in the database.
+
+    Args:
+        connection: a connection to the database
+    """
+
+    return connection.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name=?", (CAPABILITY_TABLE,)).fetchone()[0] == 1
+
+
+def _recount_sql(prefix: str) -> str:
+    # The statements counting again the row for the kind of runway a runway is, from
+    # the open runways of its airport of that kind
+    same_kind = f'airport_id = {prefix}airport_id AND lighted = {prefix}lighted'
+    surface_class = surface_class_sql(prefix)
+
+    return (f'DELETE FROM {CAPABILITY_TABLE} WHERE {same_kind} AND surface_class = {surface_class};\n'
+            f'INSERT INTO {CAPABILITY_TABLE} '
+            f'{_capabilities_sql(f"{same_kind} AND {surface_class_sql()} = {surface_class}")};')
+
+
+def provision_capability(connection: sqlite3.Connection) -> bool:
+    """Creates the table of capabilities and its index, if they don't already exist,
+    along with the triggers that keep the table up to date, then fills it. The index
+    of runways by their airport, which the triggers rely on, is created too if it's
+    missing.
+
+    Args:
+        connection: a connection to the database
+
+    Returns:
+        whether the table was created
+    """
+
+    if capability_provisioned(connection):
+        return False
+
+    provision_indexes(connection, [_RUNWAY_INDEX])
+
+    connection.executescript(f'''
+        CREATE TABLE {CAPABILITY_TABLE} (
+            airport_id INTEGER NOT NULL,
+            surface_class TEXT NOT NULL,
+            lighted INTEGER NOT NULL,
+            max_length_ft INTEGER NULL,
+            max_width_ft INTEGER NULL,
+            runways INTEGER NOT NULL,
+            PRIMARY KEY (airport_id, surface_class, lighted)
+        ) WITHOUT ROWID;
+
+        CREATE TRIGGER {CAPABILITY_TABLE}_insert AFTER INSERT ON runway BEGIN
+            {_recount_sql('new.')}
+        END;
+
+        CREATE TRIGGER {CAPABILITY_TABLE}_delete AFTER DELETE ON runway BEGIN
+            {_recount_sql('old.')}
+        END;
+
+        CREATE TRIGGER {CAPABILITY_TABLE}_update
+        AFTER UPDATE OF airport_id, length_ft, width_ft, surface, lighted, closed ON runway BEGIN
+            {_recount_sql('old.')}
+            {_recount_sql('new.')}
+        END;
+
+        INSERT INTO {CAPABILITY_TABLE} {_capabilities_sql()};
+
+        CREATE INDEX {CAPABILITY_INDEX}
+        ON {CAPABILITY_TABLE} (max_length_ft, surface_class, lighted, max_width_ft);''')
+
+    return True
+
+
+def drop_capability(connection: sqlite3.Connection) -> bool:
+    """Drops the table of capabilities, if it exists, along with its index and
+    triggers.
+
+    Args:
+        connection: a connection to the database
+
+    Returns:
+        whether the table was dropped
+    """
+
+    if not capability_provisioned(connection):
+        return False
+
+    connection.executescript(f'''
+        DROP TRIGGER IF EXISTS {CAPABILITY_TABLE}_insert;
+        DROP TRIGGER IF EXISTS {CAPABILITY_TABLE}_delete;
+        DROP TRIGGER IF EXISTS {CAPABILITY_TABLE}_update;
+        DROP TABLE {CAPABILITY_TABLE};''')
+
+    return True
+
+
+def _source(provisioned: bool) -> str:
+    # The table of capabilities, or a query that stands in for it
+    return CAPABILITY_TABLE if provisioned else f'({_capabilities_sql()})'
+
+
+def runway_capability(connection: sqlite3.Connection, airport_id: int, provisioned: bool) -> RunwayCapability:
+    """Returns what an airport's open runways can take.
+
+    Args:
+        connection: a connection to the database
+        airport_id: the airport's id
+        provisioned: whether the table of capabilities is read, rather than the
+        runways themselves
+    """
+
+    rows = connection.execute(
+        f'SELECT surface_class, lighted, max_length_ft, max_width_ft FROM {_source(provisioned)} '
+        f'WHERE airport_id = ?', (airport_id,)).fetchall()
+
+    lengths = [length for _, _, length, _ in rows if length is not None]
+    widths = [width for _, _, _, width in rows if width is not None]
+    classes = {surface_class for surface_class, _, _, _ in rows}
+
+    return RunwayCapability(
+        airport_id, max(lengths, default = None), max(widths, default = None), any(lighted for _, lighted, _, _ in rows),
+        tuple(surface_class for surface_class in SURFACE_CLASSES if surface_class in classes))
+
+
+def capable_airports(connection: sqlite3.Connection, min_length_ft: int | None, min_width_ft: int | None,
+                     surface_classes: tuple[str, ...] | None, lighted: bool, country_id: int | None,
+                     region_id: int | None, provisioned: bool, limit: int | None = None) -> list[CapableAirport]:
+    """Returns the airports with an open runway that can take what's asked for.
+
+    Args:
+        connection: a connection to the database
+        min_length_ft: the shortest the runway can be, or None for any length
+        min_width_ft: the narrowest the runway can be, or None for any width
+        surface_classes: the classes of surface the runway can have, or None for any
+        lighted: whether the runway must be lighted
+        country_id: the country the airports are in, or None for any country
+        region_id: the region the airports are in, or None for any region
+        provisioned: whether the table of capabilities is read, rather than the
+        runways themselves
+        limit: the most airports returned, or None for all of them
+
+    Returns:
+        the airports, longest matching runway first, then in order of id
+    """
+
+    conditions = []
+    parameters = []
+
+    if min_length_ft is not None:
+        conditions.append('capability.max_length_ft >= ?')
+        parameters.append(min_length_ft)
+
+    if min_width_ft is not None:
+        conditions.append('capability.max_width_ft >= ?')
+        parameters.append(min_width_ft)
+
+    if surface_classes is not None:
+        conditions.append(f'capability.surface_class IN ({", ".join("?" * len(surface_classes))})')
+        parameters.extend(surface_classes)
+
+    if lighted:
+        conditions.append('capability.lighted = 1')
+
+    if country_id is not None:
+        conditions.append('airport.country_id = ?')
+        parameters.append(country_id)
+
+    if region_id is not None:
+        conditions.append('airport.region_id = ?')
+        parameters.append(region_id)
+
+    # A row's longest and widest runways can be different runways, so an airport whose
+    # runways are only long enough and wide enough between them is ruled out by
+    # checking its runways themselves, and the longest and widest reported are those
+    # of the runways that are both
+    maxima = 'MAX(capability.max_length_ft), MAX(capability.max_width_ft)'
+    maxima_parameters = []
+
+    if min_length_ft is not None and min_width_ft is not None:
+        qualifying = (
+            f'FROM runway WHERE runway.airport_id = capability.airport_id '
+            f'AND runway.closed = 0 AND runway.lighted = capability.lighted '
+            f'AND {surface_class_sql("runway.")} = capability.surface_class '
+            f'AND runway.length_ft >= ? AND runway.width_ft >= ?')
+
+        conditions.append(f'EXISTS (SELECT 1 {qualifying})')
+        parameters.extend([min_length_ft, min_width_ft])
+
+        maxima = (f'MAX((SELECT MAX(runway.length_ft) {qualifying})), '
+                  f'MAX((SELECT MAX(runway.width_ft) {qualifying}))')
+        maxima_parameters = [min_length_ft, min_width_ft] * 2
+
+    sql = (f'SELECT airport.airport_id, airport.airport_ident, airport.name, airport.country_id, '
+           f'airport.region_id, {maxima} '
+           f'FROM {_source(provisioned)} AS capability '
+           f'JOIN airport ON airport.airport_id = capability.airport_id')
+
+    parameters = maxima_parameters + parameters
+
+    if conditions:
+        sql += f' WHERE {" AND ".join(conditions)}'
+
+    sql += ' GROUP BY airport.airport_id ORDER BY 6 DESC, 1'
+
+    if limit is not None:
+        sql += ' LIMIT ?'
+        parameters.append(limit)
+
+    return [CapableAirport(*row) for row in connection.execute(sql, parameters)]
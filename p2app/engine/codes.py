@@ -0,0 +1,154 @@
+# p2app/engine/codes.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# An in-memory index of every code an airport is known by (its ident and its IATA,
+# GPS and local codes), so that whatever code the user has can be resolved to
+# the airports it belongs to with one dictionary lookup, rather than a search
+# of four columns.
+
+import sqlite3
+from p2app.events import *
+
+
+# Each kind of code and the airport column it's in, in the order a code is matched
+# against them
+CODE_COLUMNS = [
+    (CODE_IDENT, 'airport_ident'),
+    (CODE_IATA, 'iata_code'),
+    (CODE_GPS, 'gps_code'),
+    (CODE_LOCAL, 'local_code')
+]
+
+# The position of each kind of code in CODE_COLUMNS
+_KIND_ORDER = {kind: order for order, (kind, _) in enumerate(CODE_COLUMNS)}
+
+
+def normalized_code(code: str | None) -> str | None:
+    """Returns a code as it's indexed, without the whitespace around it and in upper
+    case, or None if there's nothing left of it.
+
+    Args:
+        code: the code
+    """
+
+    if code is None:
+        return None
+
+    return code.strip().upper() or None
+
+
+class AirportCodeIndex:
+    """Maps each normalized code to the airports known by it, along with the kinds of
+    code it is for each of them.
+
+    The index is built from the airport table the first time a code is resolved after
+    a database is opened, rather than when it's opened, since reading every airport
+    isn't worth doing for a database no code is looked up in. Once built, it's kept
+    up to date as airports are saved.
+
+    Attributes:
+        built: whether the index has been built since it was last cleared
+    """
+
+    def __init__(self):
+        """Initializes an empty index."""
+
+        self.built = False
+
+        # The airports known by each code, as {code: {airport id: kinds}}, and the
+        # codes of each airport, as {airport id: codes}
+        self._airports = {}
+        self._codes = {}
+
+
+    def __len__(self) -> int:
+        return len(self._airports)
+
+
+    def build(self, connection: sqlite3.Connection):
+        """Indexes the codes of every airport in a database, replacing what was indexed.
+
+        Args:
+            connection: a connection to the database
+        """
+
+        self.clear()
+
+        columns = ', '.join(column for _, column in CODE_COLUMNS)
+
+        for airport_id, *codes in connection.execute(f'SELECT airport_id, {columns} FROM airport'):
+            self._add(airport_id, codes)
+
+        self.built = True
+
+
+    def clear(self):
+        """Removes every code from the index."""
+
+        self._airports.clear()
+        self._codes.clear()
+        self.built = False
+
+
+    def update(self, airport: Airport):
+        """Indexes an airport's codes as they are now, in place of those it had.
+
+        Args:
+            airport: the airport, as it was saved
+        """
+
+        # An index that isn't built yet will read the airport when it is
+        if not self.built:
+            return
+
+        self.remove(airport.airport_id)
+        self._add(airport.airport_id, [getattr(airport, column) for _, column in CODE_COLUMNS])
+
+
+    def remove(self, airport_id: int):
+        """Removes an airport's codes from the index.
+
+        Args:
+            airport_id: the airport's id
+        """
+
+        for code in self._codes.pop(airport_id, ()):
+            airports = self._airports[code]
+            del airports[airport_id]
+
+            if not airports:
+                del self._airports[code]
+
+
+    def resolve(self, code: str) -> tuple[AirportCodeMatch, ...]:
+        """Returns the airports known by a code, with those it's the ident of first,
+        then the IATA, GPS and local codes of.
+
+        Args:
+            code: the code, in any case and with any whitespace around it
+        """
+
+        airports = self._airports.get(normalized_code(code), {})
+
+        return tuple(sorted(
+            (AirportCodeMatch(airport_id, kinds) for airport_id, kinds in airports.items()),
+            key = lambda match: (_KIND_ORDER[match.code_kinds[0]], match.airport_id)))
+
+
+    def _add(self, airport_id, codes):
+        by_code = {}
+
+        for (kind, _), code in zip(CODE_COLUMNS, codes):
+            code = normalized_code(code)
+
+            if code is not None:
+                by_code[code] = by_code.get(code, ()) + (kind,)
+
+        for code, kinds in by_code.items():
+            self._airports.setdefault(code, {})[airport_id] = kinds
+
+        if by_code:
+            self._codes[airport_id] = tuple(by_code)
+
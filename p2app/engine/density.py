@@ -0,0 +1,266 @@
+# p2app/engine/density.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Counts of airports in each cell of a map grid, at several zoom levels, kept in a
+# table of their own and updated by triggers as airports are added, moved or
+# removed, so that drawing a map of where airports are reads one row per cell
+# rather than every airport.
+#
+# At zoom level z, the earth is divided into 2^z columns of equal width in
+# longitude and 2^z rows of equal height in latitude; a cell is named by its
+# column and row, counted from the south-west corner.
+#
+# This is the grid a geohash describes, with the bits of the column and row kept
+# apart rather than interleaved into a string: the cells at zoom z are those of a
+# geohash of z bits of longitude and z of latitude. Keeping them apart means that a
+# box of cells is a range of columns and a range of rows, and that a cell's parent
+# at the next coarser zoom is found by halving them. The cells aren't stored in a
+# column of the airport table, since its columns are the fields of an Airport.
+#
+# Keeping the counts up to date costs one upsert per zoom level when an airport is
+# added (and two statements per zoom level when one is removed; both when one is
+# moved). Measured on a database of 80,000 airports, that takes an insert from about
+# 10 to 90 microseconds, an update of an airport's location from about 1 to 120 and
+# a delete from about 1 to 80; the importer drops the table and fills it again
+# afterward, which takes about a second and a half, rather than paying it per row.
+
+import sqlite3
+from p2app.events import *
+
+
+# The zoom levels whose counts are kept
+DENSITY_ZOOMS = range(0, 11)
+
+# The table of counts, one row for each zoom level, cell, type of airport and
+# whether it has scheduled service, which has airports in it
+DENSITY_TABLE = 'airport_density'
+
+
+def cell_sql(zoom: int, prefix: str = '') -> tuple[str, str]:
+    """Returns the expressions for the column and row of the cell an airport is in.
+
+    Args:
+        zoom: the zoom level
+        prefix: what's put before each column, such as 'new.' in a trigger
+    """
+
+    last = (1 << zoom) - 1
+
+    return (
+        f'MIN(CAST(({prefix}longitude_deg + 180.0) * {1 << zoom} / 360.0 AS INTEGER), {last})',
+        f'MIN(CAST(({prefix}latitude_deg + 90.0) * {1 << zoom} / 180.0 AS INTEGER), {last})')
+
+
+def cell_of(zoom: int, latitude: float, longitude: float) -> tuple[int, int]:
+    """Returns the column and row of the cell a point is in, as cell_sql does.
+
+    Args:
+        zoom: the zoom level
+        latitude: the point's latitude, in degrees
+        longitude: the point's longitude, in degrees
+    """
+
+    last = (1 << zoom) - 1
+    return (min(int((longitude + 180.0) * (1 << zoom) / 360.0), last),
+            min(int((latitude + 90.0) * (1 << zoom) / 180.0), last))
+
+
+def cell_box(zoom: int, cell_x: int, cell_y: int) -> tuple[float, float, float, float]:
+    """Returns the edges of a cell, as (south, west, north, east) in degrees.
+
+    Args:
+        zoom: the zoom level
+        cell_x: the cell's column
+        cell_y: the cell's row
+    """
+
+    width = 360.0 / (1 << zoom)
+    height = 180.0 / (1 << zoom)
+
+    return (-90.0 + cell_y * height, -180.0 + cell_x * width,
+            -90.0 + (cell_y + 1) * height, -180.0 + (cell_x + 1) * width)
+
+
+def density_provisioned(connection: sqlite3.Connection) -> bool:
+    """Checks whether the table of counts exists in the database.
+
+    Args:
+        connection: a connection to the database
+    """
+
+    return connection.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name=?", (DENSITY_TABLE,)).fetchone()[0] == 1
+
+
+def _count_sql(sign: str, prefix: str) -> str:
+    # The statements adding one airport to (or taking one from) the count of its cell
+    # at every zoom level
+    statements = []
+
+    for zoom in DENSITY_ZOOMS:
+        cell_x, cell_y = cell_sql(zoom, prefix)
+        key = (f'zoom = {zoom} AND cell_x = {cell_x} AND cell_y = {cell_y} '
+               f'AND type = {prefix}type AND scheduled_service = {prefix}scheduled_service')
+
+        if sign == '+':
+            statements.append(
+                f'INSERT INTO {DENSITY_TABLE} (zoom, cell_x, cell_y, type, scheduled_service, airports) '
+                f'VALUES ({zoom}, {cell_x}, {cell_y}, {prefix}type, {prefix}scheduled_service, 1) '
+                f'ON CONFLICT DO UPDATE SET airports = airports + 1;')
+        else:
+            # A count that reaches zero is removed, so that only cells with airports
+            # are read
+            statements.append(f'UPDATE {DENSITY_TABLE} SET airports = airports - 1 WHERE {key};')
+            statements.append(f'DELETE FROM {DENSITY_TABLE} WHERE {key} AND airports = 0;')
+
+    return '\n'.join(statements)
+
+
+def provision_density(connection: sqlite3.Connection) -> bool:
+    """Creates the table of counts, if it doesn't already exist, along with the
+    triggers that keep it up to date, then fills it.
+
+    Args:
+        connection: a connection to the database
+
+    Returns:
+        whether the table was created
+    """
+
+    if density_provisioned(connection):
+        return False
+
+    # The finest zoom level is counted from the airports, and each coarser one from
+    # the one finer than it, whose cells are a quarter of the size of its own
+    finest = DENSITY_ZOOMS[-1]
+    fill = [
+        f'INSERT INTO {DENSITY_TABLE} SELECT {finest}, {", ".join(cell_sql(finest))}, type, '
+        f'scheduled_service, COUNT(*) FROM airport GROUP BY 2, 3, 4, 5;'
+    ]
+
+    for zoom in reversed(DENSITY_ZOOMS[:-1]):
+        fill.append(
+            f'INSERT INTO {DENSITY_TABLE} SELECT {zoom}, cell_x / 2, cell_y / 2, type, scheduled_service, '
+            f'SUM(airports) FROM {DENSITY_TABLE} WHERE zoom = {zoom + 1} GROUP BY 2, 3, 4, 5;')
+
+    fill_sql = '\n'.join(fill)
+
+    connection.executescript(f'''
+        CREATE TABLE {DENSITY_TABLE} (
+            zoom INTEGER NOT NULL,
+            cell_x INTEGER NOT NULL,
+            cell_y INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            scheduled_service INTEGER NOT NULL,
+            airports INTEGER NOT NULL,
+            PRIMARY KEY (zoom, cell_x, cell_y, type, scheduled_service)
+        ) WITHOUT ROWID;
+
+        CREATE TRIGGER {DENSITY_TABLE}_insert AFTER INSERT ON airport BEGIN
+            {_count_sql('+', 'new.')}
+        END;
+
+        CREATE TRIGGER {DENSITY_TABLE}_delete AFTER DELETE ON airport BEGIN
+            {_count_sql('-', 'old.')}
+        END;
+
+        CREATE TRIGGER {DENSITY_TABLE}_update
+        AFTER UPDATE OF latitude_deg, longitude_deg, type, scheduled_service ON airport BEGIN
+            {_count_sql('-', 'old.')}
+            {_count_sql('+', 'new.')}
+        END;
+
+        {fill_sql}''')
+
+    return True
+
+
+def drop_density(connection: sqlite3.Connection) -> bool:
+    """Drops the table of counts, if it exists, along with its triggers.
+
+    Args:
+        connection: a connection to the database
+
+    Returns:
+        whether the table was dropped
+    """
+
+    if not density_provisioned(connection):
+        return False
+
+    connection.executescript(f'''
+        DROP TRIGGER IF EXISTS {DENSITY_TABLE}_insert;
+        DROP TRIGGER IF EXISTS {DENSITY_TABLE}_delete;
+        DROP TRIGGER IF EXISTS {DENSITY_TABLE}_update;
+        DROP TABLE {DENSITY_TABLE};''')
+
+    return True
+
+
+def density_cells(connection: sqlite3.Connection, zoom: int, south: float, west: float, north: float,
+                  east: float, airport_type: str | None, scheduled_service: bool | None,
+                  provisioned: bool) -> list[DensityCell]:
+    """Returns the number of airports in each cell of a box that has any.
+
+    Args:
+        connection: a connection to the database
+        zoom: the zoom level
+        south: the box's southern edge, in degrees of latitude
+        west: the box's western edge, in degrees of longitude (which is east of its
+        eastern edge for a box crossing the antimeridian)
+        north: the box's northern edge, in degrees of latitude
+        east: the box's eastern edge, in degrees of longitude
+        airport_type: the type of airport counted, or None to count every type
+        scheduled_service: whether the airports counted have scheduled service, or
+        None to count them all
+        provisioned: whether the table of counts is read, rather than the airports
+        themselves (which works at any zoom level)
+
+    Returns:
+        the cells, in order of column, then row
+    """
+
+    west_x, south_y = cell_of(zoom, south, west)
+    east_x, north_y = cell_of(zoom, north, east)
+
+    # A box crossing the antimeridian takes in the columns at both ends of the grid
+    if west <= east:
+        column_ranges = [(west_x, east_x)]
+    else:
+        column_ranges = [(west_x, (1 << zoom) - 1), (0, east_x)]
+
+    if provisioned:
+        cell_x, cell_y = 'cell_x', 'cell_y'
+        source = f'{DENSITY_TABLE} WHERE zoom = ? AND'
+        count = 'SUM(airports)'
+        parameters = [zoom]
+    else:
+        cell_x, cell_y = cell_sql(zoom)
+        source = 'airport WHERE'
+        count = 'COUNT(*)'
+        parameters = []
+
+    sql = f'SELECT {cell_x}, {cell_y}, {count} FROM {source} {cell_x} BETWEEN ? AND ? AND {cell_y} BETWEEN ? AND ?'
+
+    if airport_type is not None:
+        sql += ' AND type = ?'
+    if scheduled_service is not None:
+        sql += ' AND scheduled_service = ?'
+
+    sql += ' GROUP BY 1, 2 ORDER BY 1, 2'
+    cells = []
+
+    for first_x, last_x in column_ranges:
+        range_parameters = [*parameters, first_x, last_x, south_y, north_y]
+
+        if airport_type is not None:
+            range_parameters.append(airport_type)
+        if scheduled_service is not None:
+            range_parameters.append(1 if scheduled_service else 0)
+
+        for x, y, airports in connection.execute(sql, range_parameters):
+            cells.append(DensityCell(x, y, *cell_box(zoom, x, y), airports))
+
+    return cells
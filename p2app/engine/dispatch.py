@@ -0,0 +1,114 @@
+# p2app/engine/dispatch.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# A registry of the functions that handle each type of event sent to the engine,
+# so that the engine finds the handler for an event with one dictionary lookup,
+# however many types of events there are.
+
+
+class EventHandlers:
+    """Maps each type of event to the function that handles it.
+
+    A handler is called with the engine and the event, and returns (or, more often,
+    is a generator function that yields) the events sent back in response.
+    """
+
+    def __init__(self):
+        """Initializes an empty registry."""
+
+        self._handlers = {}
+        self._searches = {}
+        self._queries = {}
+
+
+    def handles(self, *event_types: type):
+        """A decorator that registers a function as the handler for the given types of
+        events.
+
+        Args:
+            event_types: the types of events the function handles
+        """
+
+        def register(handler):
+            for event_type in event_types:
+                self._handlers[event_type] = handler
+
+            return handler
+
+        return register
+
+
+    def handler_for(self, event_type: type):
+        """Returns the handler for a type of event, or None if there isn't one.
+
+        A type without a handler of its own uses the handler of the nearest base type
+        that has one; the result is remembered so later lookups need only one.
+
+        Args:
+            event_type: the type of the event
+        """
+
+        try:
+            return self._handlers[event_type]
+        except KeyError:
+            pass
+
+        for base_type in event_type.__mro__[1:]:
+            if base_type in self._handlers:
+                self._handlers[event_type] = self._handlers[base_type]
+                return self._handlers[event_type]
+
+        return None
+
+
+    def register_search(self, entity: str, search):
+        """Registers the function used to continue searches for an entity.
+
+        Args:
+            entity: the kind of entity searched for, as named in SearchContinuation
+            search: a function called with the engine and a SearchContinuation, which
+            returns the events for the search's next page
+        """
+
+        self._searches[entity] = search
+
+
+    def search_for(self, entity: str):
+        """Returns the search function registered for an entity, or None.
+
+        Args:
+            entity: the kind of entity searched for
+        """
+
+        return self._searches.get(entity)
+
+
+    def register_query(self, entity: str, build_query):
+        """Registers the function that builds the query for an entity's searches.
+
+        Args:
+            entity: the kind of entity searched for
+            build_query: a function called with a search's criteria (followed by
+            whether it uses the full-text indexes), which returns its SearchQuery
+        """
+
+        self._queries[entity] = build_query
+
+
+    def query_for(self, entity: str):
+        """Returns the query builder registered for an entity, or None.
+
+        Args:
+            entity: the kind of entity searched for
+        """
+
+        return self._queries.get(entity)
+
+
+EVENT_HANDLERS = EventHandlers()
+
+handles = EVENT_HANDLERS.handles
+register_search = EVENT_HANDLERS.register_search
+register_query = EVENT_HANDLERS.register_query
@@ -0,0 +1,166 @@
+# p2app/engine/entity_handlers.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# The handlers shared by every kind of entity that can be searched for, loaded and
+# saved (continents, countries, regions and airports), which differ only in their
+# table, record type, SQL and events. Each entity module describes its entity with
+# an Entity and registers it with register_entity, so that the caching around its
+# searches, loads and saves is written once.
+
+from collections import namedtuple
+from p2app.events import *
+from .batch import save_batch
+from .dispatch import handles
+from .dispatch import register_query
+from .dispatch import register_search
+from .search import *
+
+
+# Everything the shared handlers need to know about one kind of entity:
+#
+#   name: the entity's name, which is also its table's and its cache's, and the
+#   name of the events' accessors for one record ('continent') and its id
+#   ('continent_id')
+#   plural: the name of the events' accessors for many records ('continents')
+#   record_type: the namedtuple its records are, whose fields are its table's columns
+#   search_query: builds the SearchQuery for a search's criteria and full-text flag
+#   search: a generator function yielding a page of a search's result events, called
+#   with a cursor, the criteria, the full-text flag and the key to continue after
+#   load: returns the loaded event for an id (or an ErrorEvent), given a cursor
+#   clean: returns a record as it's saved
+#   save: saves a record, given a cursor, the record, 'modify' or 'new' and the new
+#   record's id, returning the saved or save failed event
+#   criteria: returns the criteria of a start search event
+#   start_search_event, load_event, save_event, save_new_event, save_batch_event:
+#   the types of the events handled
+#   results_batch_event, loaded_event, saved_event, save_failed_event,
+#   batch_saved_event: the types of the events sent back
+#   on_saved: called with the engine and the records just saved, to keep anything
+#   else the engine knows of them up to date, or None
+Entity = namedtuple(
+    'Entity',
+    ['name', 'plural', 'record_type', 'search_query', 'search', 'load', 'clean', 'save', 'criteria',
+     'start_search_event', 'load_event', 'save_event', 'save_new_event', 'save_batch_event',
+     'results_batch_event', 'loaded_event', 'saved_event', 'save_failed_event', 'batch_saved_event',
+     'on_saved'])
+
+Entity.__new__.__defaults__ = (None,)
+
+
+def register_entity(entity: Entity):
+    """Registers the handlers of an entity's events, and the functions that continue
+    its searches and build its search queries.
+
+    Args:
+        entity: the entity
+    """
+
+    name = entity.name
+
+    def record_of(event):
+        return getattr(event, name)()
+
+    def records_of(event):
+        return getattr(event, entity.plural)()
+
+    def id_of(record):
+        return getattr(record, f'{name}_id')
+
+    def search(engine, criteria: tuple, after: tuple | None = None):
+        # Yields the result events of a page of a search, from the search result cache
+        # if it's there, caching the records in them along the way
+        key = search_key(entity.search_query(*criteria), after)
+        generation = engine.search_cache.generation(name)
+        cached = engine.search_cache.get(name, key)
+        results = []
+        result_count = 0
+
+        for result in cached if cached is not None else entity.search(engine.cursor, *criteria, after = after):
+            if isinstance(result, entity.results_batch_event):
+                engine.entity_cache.put_all(name, records_of(result))
+                result_count += len(records_of(result))
+
+            results.append(result)
+            yield result
+
+        if cached is None:
+            engine.search_cache.put(name, key, results, generation, result_count)
+
+    def saved(engine, records: list):
+        # Writes saved records through to the entity cache, and makes cached searches
+        # stale, since the records may now match different ones
+        engine.search_cache.bump(name)
+        engine.entity_cache.put_all(name, records)
+
+        if entity.on_saved is not None:
+            entity.on_saved(engine, records)
+
+    def cached_save(engine, result, record_id: int | None):
+        # Caches a saved record, or drops one that failed to save
+        if isinstance(result, entity.saved_event):
+            saved(engine, [record_of(result)])
+        elif record_id is not None:
+            engine.entity_cache.invalidate(name, record_id)
+
+        return result
+
+    @handles(entity.start_search_event)
+    def _on_start_search(engine, event):
+        return search(engine, (*entity.criteria(event), engine.fulltext_search))
+
+    def _continue_search(engine, continuation: SearchContinuation):
+        return search(engine, continuation.criteria, continuation.last_key)
+
+    @handles(entity.load_event)
+    def _on_load(engine, event):
+        record_id = getattr(event, f'{name}_id')()
+        record = engine.entity_cache.get(name, record_id)
+
+        if record is not None:
+            yield entity.loaded_event(record)
+        else:
+            loaded = entity.load(engine.cursor, record_id)
+
+            if isinstance(loaded, entity.loaded_event):
+                engine.entity_cache.put(name, record_id, record_of(loaded))
+
+            yield loaded
+
+    @handles(entity.save_event)
+    def _on_save(engine, event):
+        record = record_of(event)
+        yield cached_save(engine, entity.save(engine.cursor, record, 'modify'), id_of(record))
+
+    @handles(entity.save_new_event)
+    def _on_save_new(engine, event):
+        result = entity.save(engine.cursor, record_of(event), 'new', engine.ids.allocate(name, engine.connection))
+
+        # The id may have been taken by a row written some other way, so the next one
+        # is counted up from the table's largest id again
+        if isinstance(result, entity.save_failed_event):
+            engine.ids.reset(name)
+
+        yield cached_save(engine, result, None)
+
+    @handles(entity.save_batch_event)
+    def _on_save_batch(engine, event):
+        saved_records, failures = save_batch(
+            engine.cursor, name, list(entity.record_type._fields),
+            [entity.clean(record) for record in records_of(event)],
+            lambda: engine.ids.allocate(name, engine.connection))
+
+        if saved_records:
+            saved(engine, saved_records)
+
+        for failure in failures:
+            if id_of(failure.record) is not None:
+                engine.entity_cache.invalidate(name, id_of(failure.record))
+            else:
+                engine.ids.reset(name)
+
+        yield entity.batch_saved_event(tuple(saved_records), tuple(failures))
+
+    register_search(name, _continue_search)
+    register_query(name, entity.search_query)
@@ -0,0 +1,167 @@
+# p2app/engine/export.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Writes the results of a search to a CSV or JSON Lines file, a chunk of rows at a
+# time as they're read from the cursor, so that exporting millions of rows takes
+# no more memory than exporting a few.
+
+import csv
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from p2app.events import *
+from .search import SearchQuery
+from .search import search_statement
+
+
+# The number of rows fetched from the cursor, and written to the file, at a time
+EXPORT_FETCH_SIZE = 1000
+
+# The number of rows written between progress events
+EXPORT_PROGRESS_ROWS = 10000
+
+
+class ExportCancellations:
+    """The cancellation tokens of the exports that have been sent and haven't
+    finished, each set when a cancellation is sent after its export was.
+
+    A token is made for an export when it's sent, rather than when it begins, so
+    that a cancellation sent while the export is still waiting behind other events
+    stops it too, while one sent before it doesn't. Exports are sent and cancelled
+    on the user interface's thread and run on the engine's, hence the lock.
+    """
+
+    def __init__(self):
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+
+    def sent(self, event: ExportEvent):
+        """Makes the cancellation token of an export that was just sent.
+
+        Args:
+            event: the export's event
+        """
+
+        with self._lock:
+            self._tokens[event] = threading.Event()
+
+
+    def token_for(self, event: ExportEvent) -> threading.Event:
+        """Returns the cancellation token of an export that's beginning, making it if
+        the export was processed without being sent (and so can't have been
+        cancelled yet).
+
+        Args:
+            event: the export's event
+        """
+
+        with self._lock:
+            return self._tokens.setdefault(event, threading.Event())
+
+
+    def cancel_all(self):
+        """Cancels every export that has been sent and hasn't finished."""
+
+        with self._lock:
+            for token in self._tokens.values():
+                token.set()
+
+
+    def finished(self, event: ExportEvent):
+        """Forgets the cancellation token of an export that's over.
+
+        Args:
+            event: the export's event
+        """
+
+        with self._lock:
+            self._tokens.pop(event, None)
+
+
+def column_names(query: SearchQuery) -> list[str]:
+    """Returns the names of a query's columns, without the tables they're from.
+
+    Args:
+        query: the query
+    """
+
+    return [column.rsplit('.', 1)[-1] for column in query.columns]
+
+
+def export_search(connection: sqlite3.Connection, query: SearchQuery, path: Path, export_format: str,
+                  cancelled: threading.Event):
+    """A generator function that writes every result of a search to a file.
+
+    The results are written to a file alongside the given one, which replaces it once
+    they're all written, so that an export that fails or is cancelled leaves nothing
+    half-written behind.
+
+    Args:
+        connection: a connection to the database
+        query: the search's query
+        path: the path to the file
+        export_format: EXPORT_CSV or EXPORT_JSONL
+        cancelled: set when the export is to stop, which is checked between chunks
+
+    Yields:
+        ExportProgressEvent after every EXPORT_PROGRESS_ROWS rows
+        DataExportedEvent once every row is written, ExportCancelledEvent if the
+        export was cancelled, or ExportFailedEvent if it couldn't be done
+    """
+
+    if export_format not in (EXPORT_CSV, EXPORT_JSONL):
+        yield ExportFailedEvent(f'Cannot export in the {export_format} format')
+        return
+
+    names = column_names(query)
+    sql, parameters = search_statement(query)
+    partial_path = path.with_name(path.name + '.partial')
+    rows_written = 0
+
+    # The export gets a cursor of its own, like a search
+    cursor = connection.cursor()
+
+    try:
+        cursor.execute(sql, parameters)
+
+        with open(partial_path, 'w', newline = '', encoding = 'utf-8') as file:
+            if export_format == EXPORT_CSV:
+                writer = csv.writer(file)
+                writer.writerow(names)
+
+            while rows := cursor.fetchmany(EXPORT_FETCH_SIZE):
+                if cancelled.is_set():
+                    break
+
+                # The key columns that follow each row's columns are left out
+                rows = [row[:len(names)] for row in rows]
+
+                if export_format == EXPORT_CSV:
+                    writer.writerows(rows)
+                else:
+                    file.write(''.join(json.dumps(dict(zip(names, row))) + '\n' for row in rows))
+
+                previous_progress = rows_written // EXPORT_PROGRESS_ROWS
+                rows_written += len(rows)
+
+                if rows_written // EXPORT_PROGRESS_ROWS > previous_progress:
+                    yield ExportProgressEvent(rows_written)
+
+        if cancelled.is_set():
+            os.remove(partial_path)
+            yield ExportCancelledEvent(rows_written)
+        else:
+            os.replace(partial_path, path)
+            yield DataExportedEvent(path, rows_written)
+    except (OSError, sqlite3.Error) as e:
+        if partial_path.exists():
+            os.remove(partial_path)
+
+        yield ExportFailedEvent(f'Export failed: {e}')
+    finally:
+        cursor.close()
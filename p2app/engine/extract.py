@@ -0,0 +1,123 @@
+# p2app/engine/extract.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Creates a small airport database covering one country or one continent, by
+# attaching a new database with the same tables and copying the rows that belong
+# to it with one INSERT ... SELECT per table, following the foreign keys down from
+# the chosen countries, so that no row passes through Python on the way.
+
+import re
+import sqlite3
+from pathlib import Path
+from p2app.events import *
+
+
+# The name the new database is attached under
+_SUBSET = 'subset'
+
+
+# Each table and the condition that picks the rows of it belonging to the subset, in
+# the order they're copied; :continent_code and :country_code are the chosen
+# continent and country, only one of which isn't NULL
+EXTRACT_TABLES = [
+    ('country',
+     'continent_id = (SELECT continent_id FROM main.continent WHERE continent_code = :continent_code) '
+     'OR country_code = :country_code'),
+    ('region',
+     f'country_id IN (SELECT country_id FROM {_SUBSET}.country)'),
+    ('airport',
+     f'country_id IN (SELECT country_id FROM {_SUBSET}.country) '
+     f'AND region_id IN (SELECT region_id FROM {_SUBSET}.region)'),
+    ('runway',
+     f'airport_id IN (SELECT airport_id FROM {_SUBSET}.airport)'),
+    ('airport_frequency',
+     f'airport_id IN (SELECT airport_id FROM {_SUBSET}.airport)'),
+    ('navigation_aid',
+     f'airport_id IN (SELECT airport_id FROM {_SUBSET}.airport) '
+     f'OR (airport_id IS NULL AND iso_country IN (SELECT country_code FROM {_SUBSET}.country))'),
+
+    # Every continent the copied rows refer to, which for a country on more than one
+    # continent (or an airport on a different one from its country) is more than one
+    ('continent',
+     f'continent_id IN (SELECT continent_id FROM {_SUBSET}.country '
+     f'UNION SELECT continent_id FROM {_SUBSET}.region '
+     f'UNION SELECT CAST(continent_id AS INTEGER) FROM {_SUBSET}.airport)')
+]
+
+
+def extract_database(connection: sqlite3.Connection, path: Path, continent_code: str | None,
+                     country_code: str | None) -> DatabaseExtractedEvent | ExtractFailedEvent:
+    """Creates a new database containing one continent's or one country's part of a
+    database.
+
+    Args:
+        connection: a connection to the database, with no uncommitted changes
+        path: the path to the new database, which mustn't already exist
+        continent_code: the code of the continent to extract, or None
+        country_code: the code of the country to extract, or None
+
+    Returns:
+        DatabaseExtractedEvent with the number of rows copied into each table
+        ExtractFailedEvent if the database couldn't be created
+    """
+
+    if (continent_code is None) == (country_code is None):
+        return ExtractFailedEvent('Choose either a continent or a country to extract')
+
+    if path.exists():
+        return ExtractFailedEvent(f'{path} already exists')
+
+    schema = {
+        name: sql for name, sql in connection.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'table'")
+    }
+
+    # The new database is detached afterward only if attaching it succeeded, and its
+    # file is removed unless everything was copied into it
+    attached = False
+    extracted = False
+    failure = None
+
+    try:
+        connection.execute(f'ATTACH DATABASE ? AS {_SUBSET}', (str(path),))
+        attached = True
+
+        connection.execute('BEGIN')
+
+        # Each table is created just as it is in the database being extracted from
+        for table, _ in EXTRACT_TABLES:
+            connection.execute(re.sub(r'^CREATE TABLE\s+', f'CREATE TABLE {_SUBSET}.', schema[table]))
+
+        # The continents are copied last, so the foreign keys are checked at commit
+        connection.execute('PRAGMA defer_foreign_keys = ON')
+
+        codes = {'continent_code': continent_code, 'country_code': country_code}
+        rows = {}
+
+        for table, condition in EXTRACT_TABLES:
+            rows[table] = connection.execute(
+                f'INSERT INTO {_SUBSET}.{table} SELECT * FROM main.{table} WHERE {condition}', codes).rowcount
+
+        if rows['country'] == 0:
+            failure = ExtractFailedEvent(f'No country matches {continent_code or country_code}')
+        else:
+            connection.commit()
+            extracted = True
+    except sqlite3.Error as e:
+        failure = ExtractFailedEvent(f'Extract failed: {e}')
+    finally:
+        if not extracted:
+            connection.rollback()
+
+        if attached:
+            connection.execute(f'DETACH DATABASE {_SUBSET}')
+
+        if not extracted:
+            path.unlink(missing_ok = True)
+
+    if failure is not None:
+        return failure
+
+    return DatabaseExtractedEvent(path, rows)
@@ -0,0 +1,145 @@
+# p2app/engine/fulltext.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# FTS5 full-text indexes over the names and keywords of continents, countries,
+# regions and airports, which let searches match words and word prefixes in
+# milliseconds rather than scanning with LIKE.
+
+import sqlite3
+
+
+# Searches match names exactly
+SEARCH_EXACT = 'exact'
+
+# Searches match the words (or the beginnings of words) in names and keywords,
+# with the best matches first
+SEARCH_FULLTEXT = 'fulltext'
+
+
+# Each full-text index as (index table, content table, content table's id column,
+# indexed columns)
+FULLTEXT_TABLES = [
+    ('continent_fts', 'continent', 'continent_id', ('name',)),
+    ('country_fts', 'country', 'country_id', ('name', 'keywords')),
+    ('region_fts', 'region', 'region_id', ('name', 'keywords')),
+    ('airport_fts', 'airport', 'airport_id', ('name', 'keywords'))
+]
+
+
+def fulltext_available(connection: sqlite3.Connection) -> bool:
+    """Checks whether the SQLite library was compiled with FTS5.
+
+    Args:
+        connection: a connection to a database
+    """
+
+    return connection.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0] == 1
+
+
+def fulltext_provisioned(connection: sqlite3.Connection) -> bool:
+    """Checks whether every full-text index exists in the database.
+
+    Args:
+        connection: a connection to the database
+    """
+
+    existing = {name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    return all(fts_table in existing for fts_table, _, _, _ in FULLTEXT_TABLES)
+
+
+def provision_fulltext(connection: sqlite3.Connection) -> list[str]:
+    """Creates every full-text index that doesn't already exist in the database, along
+    with the triggers that keep it in sync with its content table, then fills it.
+
+    Args:
+        connection: a connection to the database
+
+    Returns:
+        the names of the full-text indexes that were created
+    """
+
+    existing = {name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    created = []
+
+    for fts_table, table, id_column, columns in FULLTEXT_TABLES:
+        if fts_table in existing:
+            continue
+
+        column_list = ', '.join(columns)
+        new_values = ', '.join(f'new.{column}' for column in columns)
+        old_values = ', '.join(f'old.{column}' for column in columns)
+
+        connection.executescript(f'''
+            CREATE VIRTUAL TABLE {fts_table} USING fts5(
+                {column_list}, content='{table}', content_rowid='{id_column}', prefix='2 3');
+
+            CREATE TRIGGER {fts_table}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts_table} (rowid, {column_list}) VALUES (new.{id_column}, {new_values});
+            END;
+
+            CREATE TRIGGER {fts_table}_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts_table} ({fts_table}, rowid, {column_list})
+                VALUES ('delete', old.{id_column}, {old_values});
+            END;
+
+            CREATE TRIGGER {fts_table}_update AFTER UPDATE OF {id_column}, {column_list} ON {table} BEGIN
+                INSERT INTO {fts_table} ({fts_table}, rowid, {column_list})
+                VALUES ('delete', old.{id_column}, {old_values});
+                INSERT INTO {fts_table} (rowid, {column_list}) VALUES (new.{id_column}, {new_values});
+            END;
+
+            INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild');''')
+
+        created.append(fts_table)
+
+    return created
+
+
+def drop_fulltext(connection: sqlite3.Connection) -> list[str]:
+    """Drops every full-text index in the database, along with its triggers.
+
+    Args:
+        connection: a connection to the database
+
+    Returns:
+        the names of the full-text indexes that were dropped
+    """
+
+    existing = {name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    dropped = []
+
+    for fts_table, _, _, _ in FULLTEXT_TABLES:
+        if fts_table in existing:
+            connection.executescript(f'''
+                DROP TRIGGER IF EXISTS {fts_table}_insert;
+                DROP TRIGGER IF EXISTS {fts_table}_delete;
+                DROP TRIGGER IF EXISTS {fts_table}_update;
+                DROP TABLE {fts_table};''')
+
+            dropped.append(fts_table)
+
+    return dropped
+
+
+def fulltext_query(text: str) -> str:
+    """Turns what the user typed into an FTS5 query matching rows that contain every
+    word, or a word beginning with it.
+
+    Args:
+        text: the text typed into the search box
+
+    Returns:
+        the FTS5 query, such as '"san"* "fran"*' for 'san fran', or an empty phrase
+        (which matches nothing) if there are no words
+    """
+
+    # The index ignores case, so lowercasing the words makes searches that differ
+    # only in case identical
+    words = text.replace('"', ' ').lower().split()
+
+    if not words:
+        return '""'
+
+    return ' '.join(f'"{word}"*' for word in words)
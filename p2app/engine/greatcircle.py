@@ -0,0 +1,391 @@
+# p2app/engine/greatcircle.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Great-circle distances between many points and every airport at once, computed
+# with NumPy over a column-by-column copy of the airports' coordinates, for work
+# too big to do a row at a time (the nearest airports to each of thousands of
+# points, or the distance between every two airports in a country).
+#
+# Airports are ranked by the dot product of their position on the unit sphere with
+# the point's, which grows as the distance between them shrinks; the dot products
+# of a chunk of points with every airport are one matrix multiplication, and only
+# the airports that rank near enough have their distances measured exactly.
+#
+# NumPy is optional; without it, these searches fail with a message saying so,
+# and every other part of the engine works as it does with it.
+
+import math
+import sqlite3
+from p2app.events import *
+from .spatial import EARTH_RADIUS_KM
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# The most distances computed at once, which bounds the memory a search takes
+# however many points it's for
+CHUNK_DISTANCES = 1 << 20
+
+# One airport in this many is sampled to find, for each point, a dot product that
+# at least the nearest airports to it reach, so that only the airports reaching it
+# are ranked
+SAMPLE_STRIDE = 64
+
+# The most airports a distance matrix is computed for, since the matrix takes
+# eight bytes for every pair of them
+MATRIX_MAX_AIRPORTS = 4000
+
+
+def numpy_available() -> bool:
+    """Checks whether NumPy could be imported."""
+
+    return numpy is not None
+
+
+def unit_vectors(latitudes, longitudes, cos_latitudes):
+    """Returns the positions of points on the unit sphere, one row of (x, y, z) per point.
+
+    Args:
+        latitudes: the points' latitudes, in radians
+        longitudes: the points' longitudes, in radians
+        cos_latitudes: the cosines of the points' latitudes
+    """
+
+    return numpy.stack(
+        [cos_latitudes * numpy.cos(longitudes), cos_latitudes * numpy.sin(longitudes), numpy.sin(latitudes)],
+        axis = -1)
+
+
+def haversine_km(latitudes1, longitudes1, cos_latitudes1, latitudes2, longitudes2, cos_latitudes2):
+    """Returns the great-circle distances between points, in kilometres, using the
+    haversine formula, with the usual NumPy broadcasting between the two sets.
+
+    Args:
+        latitudes1: the first points' latitudes, in radians
+        longitudes1: the first points' longitudes, in radians
+        cos_latitudes1: the cosines of the first points' latitudes
+        latitudes2: the second points' latitudes, in radians
+        longitudes2: the second points' longitudes, in radians
+        cos_latitudes2: the cosines of the second points' latitudes
+    """
+
+    h = numpy.sin((latitudes2 - latitudes1) / 2) ** 2
+    h += cos_latitudes1 * cos_latitudes2 * numpy.sin((longitudes2 - longitudes1) / 2) ** 2
+    numpy.sqrt(h, out = h)
+    numpy.minimum(h, 1.0, out = h)
+    numpy.arcsin(h, out = h)
+    h *= 2 * EARTH_RADIUS_KM
+    return h
+
+
+class AirportCoordinates:
+    """The id, name, country and coordinates of every airport, each kept in an array
+    of its own, which is read from the airport table when it's first needed and kept
+    up to date as airports are saved.
+
+    Attributes:
+        loaded: whether the airports have been read since they were last cleared
+    """
+
+    def __init__(self):
+        """Initializes a cache that hasn't yet read the airports."""
+
+        self.loaded = False
+        self._clear_arrays()
+
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+    def load(self, connection: sqlite3.Connection):
+        """Reads every airport's coordinates from a database, replacing those read before.
+
+        Args:
+            connection: a connection to the database
+        """
+
+        self._clear_arrays()
+        self._append(connection.execute(
+            'SELECT airport_id, name, country_id, latitude_deg, longitude_deg FROM airport ORDER BY airport_id'))
+        self.loaded = True
+
+
+    def clear(self):
+        """Forgets every airport, so that they're read again when next needed."""
+
+        self._clear_arrays()
+        self.loaded = False
+
+
+    def update_all(self, airports):
+        """Brings the coordinates of airports up to date with how they were saved, if the
+        airports have been read.
+
+        Args:
+            airports: the airports, as they were saved
+        """
+
+        if not self.loaded:
+            return
+
+        new_rows = []
+
+        for airport in airports:
+            position = self._positions.get(airport.airport_id)
+            row = (airport.airport_id, airport.name, airport.country_id, airport.latitude_deg, airport.longitude_deg)
+
+            if position is None:
+                new_rows.append(row)
+            else:
+                self._set(position, row)
+
+        if new_rows:
+            self._append(new_rows)
+
+
+    def nearest(self, points: list[tuple[float, float]], count: int) -> list[list[Place]]:
+        """Returns the airports nearest each of some points, nearest first.
+
+        Args:
+            points: the (latitude, longitude) of each point, in degrees
+            count: the number of airports returned for each point, unless there are
+            fewer airports
+
+        Returns:
+            the airports nearest each point, in the order of the points
+        """
+
+        count = min(count, len(self))
+        results = []
+
+        for chunk, dot_products in self._dot_product_chunks(points):
+            if count == 0:
+                results.extend([] for _ in chunk)
+                continue
+
+            rows, positions = self._nearest_candidates(chunk, dot_products, count)
+            distances = self._distances(chunk[rows], positions)
+
+            # Each point's candidates, nearest first, of which the first count are kept
+            order = numpy.lexsort((distances, rows))
+            rows = rows[order]
+            starts = numpy.searchsorted(rows, numpy.arange(len(chunk)))
+            kept = (starts[:, None] + numpy.arange(count)).ravel()
+
+            positions = positions[order][kept].reshape(-1, count)
+            distances = distances[order][kept].reshape(-1, count)
+
+            for point_positions, point_distances in zip(positions.tolist(), distances.tolist()):
+                results.append(self._places(point_positions, point_distances))
+
+        return results
+
+
+    def within(self, points: list[tuple[float, float]], radius_km: float) -> list[list[Place]]:
+        """Returns the airports within a distance of each of some points, nearest first.
+
+        Args:
+            points: the (latitude, longitude) of each point, in degrees
+            radius_km: the distance, in kilometres
+
+        Returns:
+            the airports near each point, in the order of the points
+        """
+
+        # The airports at least this dot product from a point are within the
+        # distance of it, give or take rounding, which the exact distances settle
+        least_dot_product = math.cos(min(math.pi, radius_km / EARTH_RADIUS_KM)) - 1e-9
+        results = []
+
+        for chunk, dot_products in self._dot_product_chunks(points):
+            for point, point_dot_products in zip(chunk, dot_products):
+                positions = numpy.flatnonzero(point_dot_products >= least_dot_product)
+                distances = self._distances(point[None, :], positions[None, :])[0]
+
+                near = distances <= radius_km
+                positions = positions[near]
+                distances = distances[near]
+
+                order = numpy.argsort(distances, kind = 'stable')
+                results.append(self._places(positions[order].tolist(), distances[order].tolist()))
+
+        return results
+
+
+    def distance_matrix(self, country_id: int):
+        """Returns the distance between every two airports in a country.
+
+        Args:
+            country_id: the country's id
+
+        Returns:
+            the ids of the country's airports, in order, and a NumPy array of the
+            distances between them in kilometres, whose row i and column j hold the
+            distance from airport i to airport j
+
+        Raises:
+            ValueError: if the country has more than MATRIX_MAX_AIRPORTS airports
+        """
+
+        positions = numpy.flatnonzero(self._country_ids[:len(self)] == country_id)
+
+        if len(positions) > MATRIX_MAX_AIRPORTS:
+            raise ValueError(
+                f'Country {country_id} has {len(positions)} airports, more than the {MATRIX_MAX_AIRPORTS} '
+                f'a distance matrix can be computed for')
+
+        latitudes = self._latitudes[positions]
+        longitudes = self._longitudes[positions]
+        cos_latitudes = self._cos_latitudes[positions]
+        matrix = numpy.empty((len(positions), len(positions)))
+        rows = max(1, CHUNK_DISTANCES // max(1, len(positions)))
+
+        for start in range(0, len(positions), rows):
+            end = start + rows
+            matrix[start:end] = haversine_km(
+                latitudes[start:end, None], longitudes[start:end, None], cos_latitudes[start:end, None],
+                latitudes, longitudes, cos_latitudes)
+
+        return self._ids[positions].tolist(), matrix
+
+
+    def _dot_product_chunks(self, points):
+        # Yields a chunk of the points at a time, as an array of their latitudes,
+        # longitudes and the cosines of their latitudes (in radians), along with
+        # their dot products with every airport, as an array with a row for each point
+        size = len(self)
+        rows = max(1, CHUNK_DISTANCES // max(1, size))
+        vectors = self._vectors[:size]
+
+        for start in range(0, len(points), rows):
+            chunk = numpy.radians(numpy.array(points[start:start + rows], numpy.float64).reshape(-1, 2))
+            chunk = numpy.column_stack([chunk, numpy.cos(chunk[:, 0])])
+            yield chunk, unit_vectors(chunk[:, 0], chunk[:, 1], chunk[:, 2]) @ vectors.T
+
+
+    def _nearest_candidates(self, chunk, dot_products, count):
+        # Returns the row and position of every airport with a dot product at least
+        # as large as the count-th largest among a sample of the airports, which the
+        # count nearest airports to each point are among
+        sample = dot_products[:, ::SAMPLE_STRIDE]
+
+        if count > sample.shape[1]:
+            positions = numpy.argpartition(dot_products, -count, axis = 1)[:, -count:]
+            return numpy.repeat(numpy.arange(len(chunk)), count), positions.ravel()
+
+        least = numpy.partition(sample, -count, axis = 1)[:, -count]
+        return numpy.divmod(numpy.flatnonzero(dot_products >= least[:, None]), dot_products.shape[1])
+
+
+    def _distances(self, chunk, positions):
+        # The exact distances from each point in a chunk to the airports at the
+        # positions in its row of positions (or, if positions is flat, from each
+        # point to the airport at the same index)
+        if positions.ndim == 1:
+            chunk = chunk.T
+
+            return haversine_km(
+                chunk[0], chunk[1], chunk[2],
+                self._latitudes[positions], self._longitudes[positions], self._cos_latitudes[positions])
+
+        return haversine_km(
+            chunk[:, 0:1], chunk[:, 1:2], chunk[:, 2:3],
+            self._latitudes[positions], self._longitudes[positions], self._cos_latitudes[positions])
+
+
+    def _places(self, positions, distances):
+        return [
+            Place('airport', self._id_list[position], self._names[position],
+                  self._latitude_list[position], self._longitude_list[position], distance)
+            for position, distance in zip(positions, distances)
+        ]
+
+
+    def _clear_arrays(self):
+        # The arrays have room for more airports than there are, so that saving new
+        # airports one at a time doesn't copy every array each time
+        self._ids = self._country_ids = self._latitudes = self._longitudes = self._cos_latitudes = None
+        self._vectors = None
+
+        if numpy is not None:
+            self._ids = numpy.empty(0, numpy.int64)
+            self._country_ids = numpy.empty(0, numpy.int64)
+            self._latitudes = numpy.empty(0)
+            self._longitudes = numpy.empty(0)
+            self._cos_latitudes = numpy.empty(0)
+            self._vectors = numpy.empty((0, 3))
+
+        # The values sent back in each Place, which are quicker to read from lists
+        self._id_list = []
+        self._names = []
+        self._latitude_list = []
+        self._longitude_list = []
+        self._positions = {}
+
+
+    def _append(self, rows):
+        rows = list(rows)
+
+        if not rows:
+            return
+
+        start = len(self._names)
+        end = start + len(rows)
+
+        if end > len(self._ids):
+            self._grow(max(1024, 2 * end))
+
+        airport_ids, names, country_ids, latitudes, longitudes = zip(*rows)
+        latitude_radians = numpy.radians(numpy.array(latitudes, numpy.float64))
+        longitude_radians = numpy.radians(numpy.array(longitudes, numpy.float64))
+        cos_latitudes = numpy.cos(latitude_radians)
+
+        self._ids[start:end] = airport_ids
+        self._country_ids[start:end] = [country_id if country_id is not None else -1 for country_id in country_ids]
+        self._latitudes[start:end] = latitude_radians
+        self._longitudes[start:end] = longitude_radians
+        self._cos_latitudes[start:end] = cos_latitudes
+        self._vectors[start:end] = unit_vectors(latitude_radians, longitude_radians, cos_latitudes)
+
+        self._id_list.extend(airport_ids)
+        self._names.extend(names)
+        self._latitude_list.extend(latitudes)
+        self._longitude_list.extend(longitudes)
+        self._positions.update(zip(airport_ids, range(start, end)))
+
+
+    def _grow(self, capacity):
+        def grown(array):
+            bigger = numpy.zeros((capacity, *array.shape[1:]), array.dtype)
+            bigger[:len(array)] = array
+            return bigger
+
+        self._ids = grown(self._ids)
+        self._country_ids = grown(self._country_ids)
+        self._latitudes = grown(self._latitudes)
+        self._longitudes = grown(self._longitudes)
+        self._cos_latitudes = grown(self._cos_latitudes)
+        self._vectors = grown(self._vectors)
+
+
+    def _set(self, position, row):
+        airport_id, name, country_id, latitude, longitude = row
+        latitude_radians = math.radians(latitude)
+        longitude_radians = math.radians(longitude)
+        cos_latitude = math.cos(latitude_radians)
+
+        self._country_ids[position] = country_id if country_id is not None else -1
+        self._latitudes[position] = latitude_radians
+        self._longitudes[position] = longitude_radians
+        self._cos_latitudes[position] = cos_latitude
+        self._vectors[position] = unit_vectors(latitude_radians, longitude_radians, cos_latitude)
+
+        self._names[position] = name
+        self._latitude_list[position] = latitude
+        self._longitude_list[position] = longitude
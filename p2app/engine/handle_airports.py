@@ -0,0 +1,203 @@
+# p2app/engine/handle_airports.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Handles the processes related to airports
+#
+# The airport table is far larger than the others, so every search criterion is
+# matched through an index (see indexes.py) and results are only ever sent a
+# page at a time.
+
+import sqlite3
+from p2app.events import *
+from sqlite3 import Cursor
+from .batch import stripped
+from .dispatch import handles
+from .entity_handlers import Entity
+from .entity_handlers import register_entity
+from .fulltext import fulltext_query
+from .search import *
+
+
+# The columns of the airport table, in order
+AIRPORT_COLUMNS = list(Airport._fields)
+
+
+def airport_search_query(airport_ident: str, iata_code: str, gps_code: str, local_code: str, name: str,
+                         fulltext: bool) -> SearchQuery:
+    """Builds the SELECT statement for an airport search.
+
+    Args:
+        airport_ident: the airport's ident, or None to match any
+        iata_code: the airport's IATA code, or None to match any
+        gps_code: the airport's GPS code, or None to match any
+        local_code: the airport's local code, or None to match any
+        name: the name of the airport, or None to match any
+        fulltext: whether the name is matched against the words in the airport's
+        name and keywords using the full-text index, rather than exactly
+
+    Returns:
+        the search's query, sorted by id (or by rank, then id, for full-text searches)
+    """
+
+    columns = [f'airport.{column}' for column in AIRPORT_COLUMNS]
+    conditions = []
+    parameters = []
+
+    if fulltext and name is not None:
+        source = 'airport_fts JOIN airport ON airport.airport_id = airport_fts.rowid'
+        key_columns = ['airport_fts.rank', 'airport.airport_id']
+        conditions.append('airport_fts MATCH ?')
+        parameters.append(fulltext_query(name))
+    else:
+        source = 'airport'
+        key_columns = ['airport.airport_id']
+
+        if name is not None:
+            conditions.append('airport.name=?')
+            parameters.append(name)
+
+    if airport_ident is not None:
+        conditions.append('airport.airport_ident=?')
+        parameters.append(airport_ident)
+    if iata_code is not None:
+        conditions.append('airport.iata_code=?')
+        parameters.append(iata_code)
+    if gps_code is not None:
+        conditions.append('airport.gps_code=?')
+        parameters.append(gps_code)
+    if local_code is not None:
+        conditions.append('airport.local_code=?')
+        parameters.append(local_code)
+
+    return SearchQuery(columns, source, conditions, parameters, key_columns)
+
+
+def get_airport(cursor: Cursor, airport_ident: str, iata_code: str, gps_code: str, local_code: str,
+                name: str, fulltext: bool = False, after: tuple | None = None,
+                page_size: int = PAGE_SIZE) -> AirportSearchResultsBatchEvent | None:
+    """A generator function that returns the airports that correspond to the search fields.
+
+    Args:
+        cursor: a cursor object used to query the database
+        airport_ident: the airport's ident, or None to match any
+        iata_code: the airport's IATA code, or None to match any
+        gps_code: the airport's GPS code, or None to match any
+        local_code: the airport's local code, or None to match any
+        name: the name of the airport, or None to match any
+        fulltext: whether the name is matched using the full-text index
+        after: the sort key of the last airport already sent, or None for the first page
+        page_size: the number of airports on a page
+
+    Returns:
+        AirportSearchResultsBatchEvent for each batch of airports, if an airport is found
+        SearchPageEndEvent after a page of airports, if there are more
+        No events if no airport was found
+    """
+
+    criteria = (airport_ident, iata_code, gps_code, local_code, name)
+
+    # A search with no criteria would have to walk the whole table
+    if all(criterion is None for criterion in criteria):
+        return
+
+    yield from paged_search(
+        cursor, 'airport', (*criteria, fulltext), airport_search_query(*criteria, fulltext), after, page_size,
+        lambda rows: AirportSearchResultsBatchEvent(tuple(Airport(*row) for row in rows)))
+
+
+def load_airport_info(cursor: Cursor, airport_id: int) -> AirportLoadedEvent | ErrorEvent:
+    """Returns the airport with the info for the view.
+
+    Args:
+        cursor: a cursor object used to the query the database
+        airport_id: the airport id
+
+    Returns:
+        AirportLoadedEvent containing the loaded information about the airport
+        ErrorEvent if there's no airport with that id
+    """
+
+    cursor.execute(f'SELECT {", ".join(AIRPORT_COLUMNS)} FROM airport WHERE airport_id=?', (airport_id,))
+    row = cursor.fetchone()
+
+    if row is None:
+        return ErrorEvent(f'No airport has id {airport_id}')
+
+    return AirportLoadedEvent(Airport(*row))
+
+
+def clean_airport(airport: Airport) -> Airport:
+    """Returns an airport as it's saved, without the whitespace around its text."""
+
+    return airport._replace(**{
+        field: stripped(value) for field, value in airport._asdict().items()
+        if isinstance(value, str)
+    })
+
+
+def save_airport(cursor: Cursor, airport: Airport, mode: str,
+                 new_id: int | None = None) -> AirportSavedEvent | SaveAirportFailedEvent:
+    """Saves the airport to the airport database.
+
+    Args:
+        cursor: a cursor object used to query the database
+        airport: a namedtuple that holds info about the airport
+        mode: either modify existing airport or make a new one
+        new_id: the id of a new airport, or None to have SQLite assign it
+
+    Returns:
+        AirportSavedEvent if saving the airport succeeded
+        SaveAirportFailedEvent if saving the airport failed
+    """
+
+    airport = clean_airport(airport)
+
+    try:
+        if mode == 'modify':
+            assignments = ', '.join(f'{column}=?' for column in AIRPORT_COLUMNS[1:])
+            cursor.execute(f'UPDATE airport SET {assignments} WHERE airport_id=?', (*airport[1:], airport[0]))
+
+            if cursor.rowcount == 0:
+                return SaveAirportFailedEvent(f'No airport has id {airport.airport_id}')
+        elif mode == 'new':
+            cursor.execute(
+                f'INSERT INTO airport ({", ".join(AIRPORT_COLUMNS)}) '
+                f'VALUES ({", ".join("?" * len(AIRPORT_COLUMNS))})', (new_id, *airport[1:]))
+            airport = airport._replace(airport_id = cursor.lastrowid)
+    except sqlite3.Error:
+        return SaveAirportFailedEvent('Error adding specified fields')
+    else:
+        return AirportSavedEvent(airport)
+
+
+def _airports_saved(engine, airports: list[Airport]):
+    """Keeps the index of airport codes and the airports' coordinates up to date with
+    saved airports."""
+
+    for airport in airports:
+        engine.airport_codes.update(airport)
+
+    engine.airport_coordinates.update_all(airports)
+
+
+@handles(ResolveAirportCodeEvent)
+def _on_resolve_airport_code(engine, event):
+    if not engine.airport_codes.built and engine.connection is not None:
+        engine.airport_codes.build(engine.connection)
+
+    yield AirportCodeResolvedEvent(event.code(), engine.airport_codes.resolve(event.code()))
+
+
+register_entity(Entity(
+    name = 'airport', plural = 'airports', record_type = Airport,
+    search_query = airport_search_query, search = get_airport, load = load_airport_info,
+    clean = clean_airport, save = save_airport,
+    criteria = lambda event: (event.airport_ident(), event.iata_code(), event.gps_code(), event.local_code(), event.name()),
+    start_search_event = StartAirportSearchEvent, load_event = LoadAirportEvent, save_event = SaveAirportEvent,
+    save_new_event = SaveNewAirportEvent, save_batch_event = SaveAirportsBatchEvent,
+    results_batch_event = AirportSearchResultsBatchEvent, loaded_event = AirportLoadedEvent,
+    saved_event = AirportSavedEvent, save_failed_event = SaveAirportFailedEvent,
+    batch_saved_event = AirportsBatchSavedEvent,
+    on_saved = _airports_saved))
@@ -0,0 +1,46 @@
+# p2app/engine/handle_capability.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Handles the processes related to finding airports by what their runways can take
+
+import sqlite3
+from p2app.events import *
+from .capability import *
+from .dispatch import handles
+
+
+@handles(StartCapabilitySearchEvent)
+def _on_start_capability_search(engine, event):
+    surface_classes = event.surface_classes()
+    unknown = [surface_class for surface_class in surface_classes or () if surface_class not in SURFACE_CLASSES]
+
+    if engine.connection is None:
+        yield CapabilitySearchFailedEvent('No database is open')
+    elif unknown:
+        yield CapabilitySearchFailedEvent(f'{", ".join(unknown)} is not a class of surface')
+    elif any(size is not None and size < 0 for size in (event.min_length_ft(), event.min_width_ft())):
+        yield CapabilitySearchFailedEvent('The runway length and width cannot be negative')
+    else:
+        try:
+            airports = capable_airports(
+                engine.connection, event.min_length_ft(), event.min_width_ft(), surface_classes, event.lighted(),
+                event.country_id(), event.region_id(), engine.capability_search, event.limit())
+        except sqlite3.Error as e:
+            yield CapabilitySearchFailedEvent(f'Search failed: {e}')
+        else:
+            yield CapableAirportsFoundEvent(tuple(airports))
+
+
+@handles(LoadRunwayCapabilityEvent)
+def _on_load_runway_capability(engine, event):
+    if engine.connection is None:
+        yield CapabilitySearchFailedEvent('No database is open')
+    else:
+        try:
+            capability = runway_capability(engine.connection, event.airport_id(), engine.capability_search)
+        except sqlite3.Error as e:
+            yield CapabilitySearchFailedEvent(f'Search failed: {e}')
+        else:
+            yield RunwayCapabilityLoadedEvent(capability)
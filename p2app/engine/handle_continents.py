@@ -9,50 +9,73 @@
 import sqlite3
 from p2app.events import *
 from sqlite3 import Cursor
+from .batch import stripped
+from .entity_handlers import Entity
+from .entity_handlers import register_entity
+from .fulltext import fulltext_query
+from .search import *
 
 
-def count_rows(cursor: Cursor) ->int:
-    cursor.execute('SELECT COUNT(*) FROM continent')
-    return int(*cursor.fetchone())
-
-
-def get_continent(cursor: Cursor, continent_code: str, continent_name: str) -> ContinentSearchResultEvent | None:
-    """A generator function that returns every row that corresponds to the search fields.
+def continent_search_query(continent_code: str, continent_name: str, fulltext: bool) -> SearchQuery:
+    """Builds the SELECT statement for a continent search.
 
     Args:
-        cursor: a cursor object used to query the database
-        continent_code: the abbreviation of the continent
-        continent_name: the name of the continent
+        continent_code: the abbreviation of the continent, or None to match any
+        continent_name: the name of the continent, or None to match any
+        fulltext: whether the name is matched against the words in the continent's
+        name using the full-text index, rather than exactly
     Returns:
-        The ContinentSearchResult Event if any rows were found
-        No values if no rows were found
+        the search's query, sorted by id (or by rank, then id, for full-text searches)
     """
 
-    query = 'SELECT continent_id, continent_code, name FROM continent WHERE '
+    columns = ['continent.continent_id', 'continent.continent_code', 'continent.name']
+    conditions = []
     parameters = []
 
+    if fulltext and continent_name is not None:
+        source = 'continent_fts JOIN continent ON continent.continent_id = continent_fts.rowid'
+        key_columns = ['continent_fts.rank', 'continent.continent_id']
+        conditions.append('continent_fts MATCH ?')
+        parameters.append(fulltext_query(continent_name))
+    else:
+        source = 'continent'
+        key_columns = ['continent.continent_id']
+
+        if continent_name is not None:
+            conditions.append('continent.name=?')
+            parameters.append(continent_name)
+
     if continent_code is not None:
-        query += 'continent_code=?'
+        conditions.append('continent.continent_code=?')
         parameters.append(continent_code)
-    else:
-        query += 'continent_code=?'
-        parameters.append('')
-    query += ' AND '
-    if continent_name is not None:
-        query += 'name=?'
-        parameters.append(continent_name)
-    else:
-        query += 'name=?'
-        parameters.append('')
 
-    cursor.execute(query, parameters)
+    return SearchQuery(columns, source, conditions, parameters, key_columns)
 
-    all_rows = cursor.fetchall()
-    if all_rows is None:
-        yield from ()
-    else:
-        for row in all_rows:
-            yield ContinentSearchResultEvent(Continent(*row))
+
+def get_continent(cursor: Cursor, continent_code: str, continent_name: str, fulltext: bool = False,
+                  after: tuple | None = None, page_size: int = PAGE_SIZE) -> ContinentSearchResultsBatchEvent | None:
+    """A generator function that returns every row that corresponds to the search fields.
+
+    Args:
+        cursor: a cursor object used to query the database
+        continent_code: the abbreviation of the continent, or None to match any
+        continent_name: the name of the continent, or None to match any
+        fulltext: whether the name is matched using the full-text index
+        after: the sort key of the last continent already sent, or None for the first page
+        page_size: the number of continents on a page
+    Returns:
+        ContinentSearchResultsBatchEvent for each batch of continents, if any rows were found
+        SearchPageEndEvent after a page of continents, if there are more
+        No values if no rows were found
+    """
+
+    if continent_code is None and continent_name is None:
+        return
+
+    yield from paged_search(
+        cursor, 'continent', (continent_code, continent_name, fulltext),
+        continent_search_query(continent_code, continent_name, fulltext), after, page_size,
+        lambda rows: ContinentSearchResultsBatchEvent(tuple(Continent(*row) for row in rows)))
 
 
 def load_continent_info(cursor: Cursor, continent_id: int) -> ContinentLoadedEvent:
@@ -67,7 +90,13 @@ def load_continent_info(cursor: Cursor, continent_id: int) -> ContinentLoadedEve
     return ContinentLoadedEvent(Continent(*cursor.fetchone()))
 
 
-def save_continent(cursor: Cursor, continent: Continent, mode: str) -> ContinentSavedEvent | SaveContinentFailedEvent:
+def clean_continent(continent: Continent) -> Continent:
+    """Returns a continent as it's saved, without the whitespace around its text."""
+
+    return Continent(continent.continent_id, stripped(continent.continent_code), stripped(continent.name))
+
+
+def save_continent(cursor: Cursor, continent: Continent, mode: str, new_id: int | None = None) -> ContinentSavedEvent | SaveContinentFailedEvent:
     """Saves the continent to the airport database.
 
     Args:
@@ -75,16 +104,14 @@ def save_continent(cursor: Cursor, continent: Continent, mode: str) -> Continent
         continent: a namedtuple containing a continent's continent_id,
         continent_code, and name
         mode: either modify existing continent or add a new one
+        new_id: the id of a new continent, or None to have SQLite assign it
 
     Returns:
         ContinentSavedEvent if saving the continent succeeded
         SaveContinentFailedEvent if saving the continent failed
     """
 
-    new_id = count_rows(cursor) + 1
-    continent_id = continent.continent_id
-    continent_code = continent.continent_code.strip()
-    continent_name = continent.name.strip()
+    continent_id, continent_code, continent_name = clean_continent(continent)
     parameters = (continent_code, continent_name)
     query = f'UPDATE continent SET continent_code=?, name=? WHERE continent_id={continent_id}'
 
@@ -94,10 +121,23 @@ def save_continent(cursor: Cursor, continent: Continent, mode: str) -> Continent
         elif mode == 'new':
             cursor.execute('INSERT INTO continent (continent_id, continent_code, name) VALUES (?, ?, ?)',
                 (new_id, continent_code, continent_name))
+            new_id = cursor.lastrowid
     except sqlite3.Error:
         return SaveContinentFailedEvent('Error modifying specified fields')
     else:
         if mode == 'modify':
             return ContinentSavedEvent(Continent(continent_id, *parameters))
         elif mode == 'new':
-            return ContinentSavedEvent(Continent(new_id, continent_code, continent_name))
\ No newline at end of file
+            return ContinentSavedEvent(Continent(new_id, continent_code, continent_name))
+
+
+register_entity(Entity(
+    name = 'continent', plural = 'continents', record_type = Continent,
+    search_query = continent_search_query, search = get_continent, load = load_continent_info,
+    clean = clean_continent, save = save_continent,
+    criteria = lambda event: (event.continent_code(), event.name()),
+    start_search_event = StartContinentSearchEvent, load_event = LoadContinentEvent, save_event = SaveContinentEvent,
+    save_new_event = SaveNewContinentEvent, save_batch_event = SaveContinentsBatchEvent,
+    results_batch_event = ContinentSearchResultsBatchEvent, loaded_event = ContinentLoadedEvent,
+    saved_event = ContinentSavedEvent, save_failed_event = SaveContinentFailedEvent,
+    batch_saved_event = ContinentsBatchSavedEvent))
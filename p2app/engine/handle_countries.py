@@ -8,60 +8,76 @@
 import sqlite3
 from p2app.events import *
 from sqlite3 import Cursor
+from .batch import stripped
+from .entity_handlers import Entity
+from .entity_handlers import register_entity
+from .fulltext import fulltext_query
+from .search import *
 
 
-def find_max_id_in_col(cursor: Cursor) ->int:
-    """Finds the maximum id in the country table column.
+def country_search_query(country_code: str, country_name: str, fulltext: bool) -> SearchQuery:
+    """Builds the SELECT statement for a country search.
 
     Args:
-        cursor: a cursor object used to query the database
+        country_code: the country code, or None to match any
+        country_name: the name of the country, or None to match any
+        fulltext: whether the name is matched against the words in the country's
+        name and keywords using the full-text index, rather than exactly
 
     Returns:
-        the maximum id
+        the search's query, sorted by id (or by rank, then id, for full-text searches)
     """
 
-    cursor.execute('SELECT MAX(country_id) FROM country')
-    return int(cursor.fetchone()[0])
+    columns = ['country.country_id', 'country.country_code', 'country.name', 'country.continent_id',
+               'country.wikipedia_link', 'country.keywords']
+    conditions = []
+    parameters = []
+
+    if fulltext and country_name is not None:
+        source = 'country_fts JOIN country ON country.country_id = country_fts.rowid'
+        key_columns = ['country_fts.rank', 'country.country_id']
+        conditions.append('country_fts MATCH ?')
+        parameters.append(fulltext_query(country_name))
+    else:
+        source = 'country'
+        key_columns = ['country.country_id']
+
+        if country_name is not None:
+            conditions.append('country.name=?')
+            parameters.append(country_name)
+
+    if country_code is not None:
+        conditions.append('country.country_code=?')
+        parameters.append(country_code)
+
+    return SearchQuery(columns, source, conditions, parameters, key_columns)
 
 
-def get_country(cursor: Cursor, country_code: str, country_name: str) -> CountrySearchResultEvent | None:
+def get_country(cursor: Cursor, country_code: str, country_name: str, fulltext: bool = False,
+                after: tuple | None = None, page_size: int = PAGE_SIZE) -> CountrySearchResultsBatchEvent | None:
     """A generator function that returns the country that corresponds to the search field.
 
     Args:
         cursor: a cursor object used to query the database
-        country_code: the country code
-        country_name: the name of the country
+        country_code: the country code, or None to match any
+        country_name: the name of the country, or None to match any
+        fulltext: whether the name is matched using the full-text index
+        after: the sort key of the last country already sent, or None for the first page
+        page_size: the number of countries on a page
 
     Returns:
-        CountrySearchResultEvent if a country is found
+        CountrySearchResultsBatchEvent for each batch of countries, if a country is found
+        SearchPageEndEvent after a page of countries, if there are more
         No values if no country is found
     """
 
-    query = 'SELECT country_id, country_code, name, continent_id, wikipedia_link, keywords FROM country WHERE '
-    parameters = []
+    if country_code is None and country_name is None:
+        return
 
-    if country_code is not None:
-        query += 'country_code=?'
-        parameters.append(country_code)
-    else:
-        query += 'country_code=?'
-        parameters.append('')
-    query += ' AND '
-    if country_name is not None:
-        query += 'name=?'
-        parameters.append(country_name)
-    else:
-        query += 'name=?'
-        parameters.append('')
-
-    cursor.execute(query, parameters)
-
-    all_rows = cursor.fetchall()
-    if all_rows is None:
-        yield from ()
-    else:
-        for row in all_rows:
-            yield CountrySearchResultEvent(Country(*row))
+    yield from paged_search(
+        cursor, 'country', (country_code, country_name, fulltext),
+        country_search_query(country_code, country_name, fulltext), after, page_size,
+        lambda rows: CountrySearchResultsBatchEvent(tuple(Country(*row) for row in rows)))
 
 
 def load_country_info(cursor: Cursor, country_id: int) -> CountryLoadedEvent:
@@ -79,29 +95,32 @@ def load_country_info(cursor: Cursor, country_id: int) -> CountryLoadedEvent:
     return CountryLoadedEvent(Country(*cursor.fetchone()))
 
 
-def save_country(cursor: Cursor, country: Country, mode: str) -> CountrySavedEvent | SaveCountryFailedEvent:
+def clean_country(country: Country) -> Country:
+    """Returns a country as it's saved, without the whitespace around its text, and
+    with an empty Wikipedia link rather than none."""
+
+    wikipedia_link = stripped(country.wikipedia_link)
+
+    return Country(country.country_id, stripped(country.country_code), stripped(country.name),
+                   country.continent_id, wikipedia_link if wikipedia_link is not None else '',
+                   stripped(country.keywords))
+
+
+def save_country(cursor: Cursor, country: Country, mode: str, new_id: int | None = None) -> CountrySavedEvent | SaveCountryFailedEvent:
     """Saves the country to the airport database.
 
     Args:
         cursor: a cursor object used to query the database
         country: a namedtuple containing information about the country
         mode: either modify an existing country or make a new one
+        new_id: the id of a new country, or None to have SQLite assign it
 
     Returns:
         CountrySavedEvent if saving the country succeeded
         SaveCountryFailedEvent if saving the country failed
     """
 
-    new_id = find_max_id_in_col(cursor) + 1
-    country_code = country.country_code.strip()
-    name = country.name.strip()
-    continent_id = country.continent_id
-    wikipedia_link = country.wikipedia_link if country.wikipedia_link is None else country.wikipedia_link.strip()
-    keywords = country.keywords if country.keywords is None else country.keywords.strip()
-
-    if wikipedia_link is None:
-        wikipedia_link = ''
-
+    _, country_code, name, continent_id, wikipedia_link, keywords = clean_country(country)
     parameters = (country_code, name, continent_id, wikipedia_link, keywords)
     query = f'UPDATE country SET country_code=?, name=?, continent_id=?, wikipedia_link=?, keywords=? WHERE country_id={country.country_id}'
 
@@ -111,10 +130,23 @@ def save_country(cursor: Cursor, country: Country, mode: str) -> CountrySavedEve
         elif mode == 'new':
             cursor.execute('INSERT INTO country (country_id, country_code, name, continent_id, wikipedia_link, keywords) VALUES (?,?,?,?,?,?)',
                 (new_id, country_code, name, continent_id, wikipedia_link, keywords))
+            new_id = cursor.lastrowid
     except sqlite3.Error:
         return SaveCountryFailedEvent('Error adding specified fields')
     else:
         if mode == 'modify':
             return CountrySavedEvent(Country(country.country_id, *parameters))
         elif mode == 'new':
-            return CountrySavedEvent(Country(new_id, country_code, name, continent_id, wikipedia_link, keywords))
\ No newline at end of file
+            return CountrySavedEvent(Country(new_id, country_code, name, continent_id, wikipedia_link, keywords))
+
+
+register_entity(Entity(
+    name = 'country', plural = 'countries', record_type = Country,
+    search_query = country_search_query, search = get_country, load = load_country_info,
+    clean = clean_country, save = save_country,
+    criteria = lambda event: (event.country_code(), event.name()),
+    start_search_event = StartCountrySearchEvent, load_event = LoadCountryEvent, save_event = SaveCountryEvent,
+    save_new_event = SaveNewCountryEvent, save_batch_event = SaveCountriesBatchEvent,
+    results_batch_event = CountrySearchResultsBatchEvent, loaded_event = CountryLoadedEvent,
+    saved_event = CountrySavedEvent, save_failed_event = SaveCountryFailedEvent,
+    batch_saved_event = CountriesBatchSavedEvent))
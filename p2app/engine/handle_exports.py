@@ -0,0 +1,53 @@
+# p2app/engine/handle_exports.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Handles the processes related to exporting search results
+
+from p2app.events import *
+from .dispatch import EVENT_HANDLERS
+from .dispatch import handles
+from .export import export_search
+from .extract import extract_database
+
+
+@handles(ExportEvent)
+def _on_export(engine, event):
+    if engine.connection is None:
+        yield ExportFailedEvent('No database is open')
+        return
+
+    build_query = EVENT_HANDLERS.query_for(event.entity())
+
+    if build_query is None:
+        yield ExportFailedEvent(f'Cannot export {event.entity()}')
+        return
+
+    query = build_query(*event.criteria(), engine.fulltext_search)
+
+    try:
+        yield from export_search(
+            engine.connection, query, event.path(), event.export_format(), engine.export_cancellations.token_for(event))
+    finally:
+        engine.export_cancellations.finished(event)
+
+
+@handles(CancelExportEvent)
+def _on_cancel_export(engine, event):
+    # By the time this is processed, any export it was meant for is over, since it was
+    # already cancelled when the event was submitted, whether it was running or still
+    # waiting to (see Engine.interrupt)
+    return ()
+
+
+@handles(ExtractDatabaseEvent)
+def _on_extract_database(engine, event):
+    if engine.connection is None:
+        yield ExtractFailedEvent('No database is open')
+        return
+
+    # A database can't be attached in the middle of a transaction
+    engine.commit_changes()
+
+    yield extract_database(engine.connection, event.path(), event.continent_code(), event.country_code())
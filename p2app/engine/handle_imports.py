@@ -0,0 +1,47 @@
+# p2app/engine/handle_imports.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Handles the processes related to importing OurAirports data
+
+from p2app.events import *
+from .dispatch import handles
+from .importer import import_ourairports
+from .sync import sync_ourairports
+
+
+@handles(ImportDataEvent)
+def _on_import_data(engine, event):
+    if engine.connection is None:
+        yield ImportFailedEvent('No database is open')
+        return
+
+    # The import is one transaction of its own, so the writes before it are
+    # committed first
+    engine.commit_changes()
+
+    yield from import_ourairports(engine.connection, event.directory())
+
+    engine.entity_cache.clear()
+    engine.search_cache.clear()
+    engine.ids.reset()
+    engine.airport_codes.clear()
+    engine.airport_coordinates.clear()
+
+
+@handles(SyncDataEvent)
+def _on_sync_data(engine, event):
+    if engine.connection is None:
+        yield SyncFailedEvent('No database is open')
+        return
+
+    engine.commit_changes()
+
+    yield from sync_ourairports(engine.connection, event.directory())
+
+    engine.entity_cache.clear()
+    engine.search_cache.clear()
+    engine.ids.reset()
+    engine.airport_codes.clear()
+    engine.airport_coordinates.clear()
@@ -8,64 +8,81 @@
 import sqlite3
 from p2app.events import *
 from sqlite3 import Cursor
+from .batch import stripped
+from .entity_handlers import Entity
+from .entity_handlers import register_entity
+from .fulltext import fulltext_query
+from .search import *
 
-def find_max_id_in_col(cursor: Cursor) ->int:
-    """Finds the maximum id in the country table column.
+
+def region_search_query(region_code: str, local_code: str, name: str, fulltext: bool) -> SearchQuery:
+    """Builds the SELECT statement for a region search.
 
     Args:
-        cursor: a cursor object used to query the database
+        region_code: the region code, or None to match any
+        local_code: the local code, or None to match any
+        name: the name of the region, or None to match any
+        fulltext: whether the name is matched against the words in the region's name
+        and keywords using the full-text index, rather than exactly
 
     Returns:
-        the maximum id
+        the search's query, sorted by id (or by rank, then id, for full-text searches)
     """
 
-    cursor.execute('SELECT MAX(region_id) FROM region')
-    return int(cursor.fetchone()[0])
+    columns = ['region.region_id', 'region.region_code', 'region.local_code', 'region.name',
+               'region.continent_id', 'region.country_id', 'region.wikipedia_link', 'region.keywords']
+    conditions = []
+    parameters = []
 
+    if fulltext and name is not None:
+        source = 'region_fts JOIN region ON region.region_id = region_fts.rowid'
+        key_columns = ['region_fts.rank', 'region.region_id']
+        conditions.append('region_fts MATCH ?')
+        parameters.append(fulltext_query(name))
+    else:
+        source = 'region'
+        key_columns = ['region.region_id']
 
-def get_region(cursor: Cursor, region_code: str, local_code: str, name: str) -> RegionSearchResultEvent | None:
+        if name is not None:
+            conditions.append('region.name=?')
+            parameters.append(name)
+
+    if region_code is not None:
+        conditions.append('region.region_code=?')
+        parameters.append(region_code)
+    if local_code is not None:
+        conditions.append('region.local_code=?')
+        parameters.append(local_code)
+
+    return SearchQuery(columns, source, conditions, parameters, key_columns)
+
+
+def get_region(cursor: Cursor, region_code: str, local_code: str, name: str, fulltext: bool = False,
+               after: tuple | None = None, page_size: int = PAGE_SIZE) -> RegionSearchResultsBatchEvent | None:
     """A generator function that returns the region that corresponds to the search field.
 
     Args:
         cursor: a cursor object used to query the database
-        region_code: the region code
-        local_code: the local code
-        name: the name of the region
+        region_code: the region code, or None to match any
+        local_code: the local code, or None to match any
+        name: the name of the region, or None to match any
+        fulltext: whether the name is matched using the full-text index
+        after: the sort key of the last region already sent, or None for the first page
+        page_size: the number of regions on a page
 
     Returns:
-        RegionSearchResultEvent if a region is found
+        RegionSearchResultsBatchEvent for each batch of regions, if a region is found
+        SearchPageEndEvent after a page of regions, if there are more
         No events if no region was found
     """
 
-    query = 'SELECT region_id, region_code, local_code, name, continent_id, country_id, wikipedia_link, keywords FROM region WHERE '
-    parameters = []
-
-    query += 'region_code=?'
-    if region_code is not None:
-        parameters.append(region_code)
-    else:
-        parameters.append('')
-    query += ' AND '
-    query += 'local_code=?'
-    if local_code is not None:
-        parameters.append(local_code)
-    else:
-        parameters.append('')
-    query += ' AND '
-    query += 'name=?'
-    if name is not None:
-        parameters.append(name)
-    else:
-        parameters.append('')
-
-    cursor.execute(query, parameters)
+    if region_code is None and local_code is None and name is None:
+        return
 
-    all_rows = cursor.fetchall()
-    if all_rows is None:
-        yield from ()
-    else:
-        for row in all_rows:
-            yield RegionSearchResultEvent(Region(*row))
+    yield from paged_search(
+        cursor, 'region', (region_code, local_code, name, fulltext),
+        region_search_query(region_code, local_code, name, fulltext), after, page_size,
+        lambda rows: RegionSearchResultsBatchEvent(tuple(Region(*row) for row in rows)))
 
 
 def load_region_info(cursor: Cursor, region_id: int) -> RegionLoadedEvent:
@@ -83,27 +100,29 @@ def load_region_info(cursor: Cursor, region_id: int) -> RegionLoadedEvent:
     return RegionLoadedEvent(Region(*cursor.fetchone()))
 
 
-def save_region(cursor: Cursor, region: Region, mode: str) -> RegionSavedEvent | SaveRegionFailedEvent:
+def clean_region(region: Region) -> Region:
+    """Returns a region as it's saved, without the whitespace around its text."""
+
+    return Region(region.region_id, stripped(region.region_code), stripped(region.local_code),
+                  stripped(region.name), region.continent_id, region.country_id,
+                  stripped(region.wikipedia_link), stripped(region.keywords))
+
+
+def save_region(cursor: Cursor, region: Region, mode: str, new_id: int | None = None) -> RegionSavedEvent | SaveRegionFailedEvent:
     """Saves the region to the airport database.
 
     Args:
         cursor: a cursor object used to query the database
         region: a namedtuple that holds info about the region
         mode: either modify existing region or make a new one
+        new_id: the id of a new region, or None to have SQLite assign it
 
     Returns:
         RegionSavedEvent if saving the region succeeded
         SaveRegionFailedEvent if saving the region failed
     """
 
-    new_id = find_max_id_in_col(cursor) + 1
-    region_code = region.region_code.strip()
-    local_code = region.local_code.strip()
-    name = region.name.strip()
-    continent_id = region.continent_id
-    country_id = region.country_id
-    wikipedia_link = region.wikipedia_link if region.wikipedia_link is None else region.wikipedia_link.strip()
-    keywords = region.keywords if region.keywords is None else region.keywords.strip()
+    _, region_code, local_code, name, continent_id, country_id, wikipedia_link, keywords = clean_region(region)
 
     parameters = (region_code, local_code, name, continent_id, country_id, wikipedia_link, keywords)
     query = f'UPDATE region SET region_code=? ,local_code=?, name=?, continent_id=?, country_id=?, wikipedia_link=?, keywords=? WHERE region_id={region.region_id}'
@@ -114,10 +133,23 @@ def save_region(cursor: Cursor, region: Region, mode: str) -> RegionSavedEvent |
         elif mode == 'new':
             cursor.execute('INSERT INTO region (region_id, region_code, local_code, name, continent_id, country_id, wikipedia_link, keywords) Values (?,?,?,?,?,?,?,?)',
                 (new_id, region_code, local_code, name, continent_id, country_id, wikipedia_link,keywords))
+            new_id = cursor.lastrowid
     except sqlite3.Error:
         return SaveRegionFailedEvent('Error adding specified fields')
     else:
         if mode == 'modify':
             return RegionSavedEvent(Region(region.region_id, *parameters))
         elif mode == 'new':
-            return RegionSavedEvent(Region(new_id, region_code, local_code, name, continent_id, country_id,wikipedia_link, keywords))
\ No newline at end of file
+            return RegionSavedEvent(Region(new_id, region_code, local_code, name, continent_id, country_id,wikipedia_link, keywords))
+
+
+register_entity(Entity(
+    name = 'region', plural = 'regions', record_type = Region,
+    search_query = region_search_query, search = get_region, load = load_region_info,
+    clean = clean_region, save = save_region,
+    criteria = lambda event: (event.region_code(), event.local_code(), event.name()),
+    start_search_event = StartRegionSearchEvent, load_event = LoadRegionEvent, save_event = SaveRegionEvent,
+    save_new_event = SaveNewRegionEvent, save_batch_event = SaveRegionsBatchEvent,
+    results_batch_event = RegionSearchResultsBatchEvent, loaded_event = RegionLoadedEvent,
+    saved_event = RegionSavedEvent, save_failed_event = SaveRegionFailedEvent,
+    batch_saved_event = RegionsBatchSavedEvent))
@@ -0,0 +1,197 @@
+# p2app/engine/handle_spatial.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Handles the processes related to finding airports, navigation aids and runways
+# by where they are, and to counting airports in each cell of a map grid
+
+import sqlite3
+from p2app.events import *
+from .density import *
+from .dispatch import handles
+from .greatcircle import numpy_available
+from .spatial import *
+
+
+def _invalid_point(latitude: float, longitude: float) -> str | None:
+    """Returns why a point isn't on the earth, or None if it is."""
+
+    if not -90.0 <= latitude <= 90.0:
+        return f'{latitude} is not a latitude'
+    elif not -180.0 <= longitude <= 180.0:
+        return f'{longitude} is not a longitude'
+    else:
+        return None
+
+
+def _find_places(engine, entity: str, problem: str | None, find):
+    """A generator function that yields the places found by a search, or why they
+    couldn't be.
+
+    Args:
+        engine: the engine
+        entity: the kind of entity searched for
+        problem: what's wrong with the search's criteria, or None
+        find: a function called with the entity's SpatialTable, which returns the
+        places found
+    """
+
+    table = spatial_table(entity)
+
+    if engine.connection is None:
+        yield SpatialSearchFailedEvent('No database is open')
+    elif table is None:
+        yield SpatialSearchFailedEvent(f'Cannot search for {entity} by location')
+    elif problem is not None:
+        yield SpatialSearchFailedEvent(problem)
+    else:
+        try:
+            yield PlacesFoundEvent(entity, tuple(find(table)))
+        except sqlite3.Error as e:
+            yield SpatialSearchFailedEvent(f'Search failed: {e}')
+
+
+@handles(StartBoxSearchEvent)
+def _on_start_box_search(engine, event):
+    problem = _invalid_point(event.south(), event.west()) or _invalid_point(event.north(), event.east())
+
+    if problem is None and event.south() > event.north():
+        problem = 'The south edge of the box is north of its north edge'
+
+    return _find_places(
+        engine, event.entity(), problem,
+        lambda table: places_in_box(
+            engine.connection, table, event.south(), event.west(), event.north(), event.east(),
+            engine.spatial_search, event.limit()))
+
+
+@handles(StartRadiusSearchEvent)
+def _on_start_radius_search(engine, event):
+    problem = _invalid_point(event.latitude(), event.longitude())
+
+    if problem is None and event.radius_km() < 0:
+        problem = 'The radius cannot be negative'
+
+    return _find_places(
+        engine, event.entity(), problem,
+        lambda table: places_within(
+            engine.connection, table, event.latitude(), event.longitude(), event.radius_km(),
+            engine.spatial_search, event.limit()))
+
+
+@handles(StartNearestSearchEvent)
+def _on_start_nearest_search(engine, event):
+    problem = _invalid_point(event.latitude(), event.longitude())
+
+    if problem is None and event.count() < 1:
+        problem = 'At least one place must be asked for'
+
+    return _find_places(
+        engine, event.entity(), problem,
+        lambda table: nearest_places(
+            engine.connection, table, event.latitude(), event.longitude(), event.count(),
+            engine.spatial_search))
+
+
+def _coordinates(engine):
+    """Returns the engine's airport coordinates, reading them first if they haven't
+    been read."""
+
+    if not engine.airport_coordinates.loaded:
+        engine.airport_coordinates.load(engine.connection)
+
+    return engine.airport_coordinates
+
+
+def _nearby_airports(engine, points, problem: str | None, find):
+    """A generator function that yields the airports found near each of some points,
+    or why they couldn't be.
+
+    Args:
+        engine: the engine
+        points: the (latitude, longitude) of each point
+        problem: what's wrong with the search's criteria, other than its points, or None
+        find: a function called with the engine's AirportCoordinates, which returns
+        the airports found near each point
+    """
+
+    problem = next(filter(None, (_invalid_point(*point) for point in points)), problem)
+
+    if engine.connection is None:
+        yield SpatialSearchFailedEvent('No database is open')
+    elif not numpy_available():
+        yield SpatialSearchFailedEvent('NumPy is needed to search near many points at once')
+    elif problem is not None:
+        yield SpatialSearchFailedEvent(problem)
+    else:
+        try:
+            places = find(_coordinates(engine))
+        except sqlite3.Error as e:
+            yield SpatialSearchFailedEvent(f'Search failed: {e}')
+        else:
+            yield NearbyAirportsFoundEvent(tuple(tuple(point_places) for point_places in places))
+
+
+@handles(FindNearestAirportsEvent)
+def _on_find_nearest_airports(engine, event):
+    problem = 'At least one airport must be asked for' if event.count() < 1 else None
+
+    return _nearby_airports(
+        engine, event.points(), problem, lambda coordinates: coordinates.nearest(event.points(), event.count()))
+
+
+@handles(FindAirportsWithinEvent)
+def _on_find_airports_within(engine, event):
+    problem = 'The radius cannot be negative' if event.radius_km() < 0 else None
+
+    return _nearby_airports(
+        engine, event.points(), problem, lambda coordinates: coordinates.within(event.points(), event.radius_km()))
+
+
+@handles(ComputeDistanceMatrixEvent)
+def _on_compute_distance_matrix(engine, event):
+    if engine.connection is None:
+        yield SpatialSearchFailedEvent('No database is open')
+    elif not numpy_available():
+        yield SpatialSearchFailedEvent('NumPy is needed to compute a distance matrix')
+    else:
+        try:
+            airport_ids, distances = _coordinates(engine).distance_matrix(event.country_id())
+        except (ValueError, sqlite3.Error) as e:
+            yield SpatialSearchFailedEvent(str(e))
+        else:
+            yield DistanceMatrixComputedEvent(event.country_id(), tuple(airport_ids), distances)
+
+
+
+# The finest zoom level a density can be asked for at
+MAX_DENSITY_ZOOM = 20
+
+
+@handles(StartDensitySearchEvent)
+def _on_start_density_search(engine, event):
+    zoom = event.zoom()
+    problem = _invalid_point(event.south(), event.west()) or _invalid_point(event.north(), event.east())
+
+    if problem is None and event.south() > event.north():
+        problem = 'The south edge of the box is north of its north edge'
+    elif problem is None and not 0 <= zoom <= MAX_DENSITY_ZOOM:
+        problem = f'The zoom level must be between 0 and {MAX_DENSITY_ZOOM}'
+
+    if engine.connection is None:
+        yield SpatialSearchFailedEvent('No database is open')
+    elif problem is not None:
+        yield SpatialSearchFailedEvent(problem)
+    else:
+        # Zoom levels whose counts aren't kept are counted from the airports
+        provisioned = engine.density_search and zoom in DENSITY_ZOOMS
+
+        try:
+            cells = density_cells(
+                engine.connection, zoom, event.south(), event.west(), event.north(), event.east(),
+                event.airport_type(), event.scheduled_service(), provisioned)
+        except sqlite3.Error as e:
+            yield SpatialSearchFailedEvent(f'Search failed: {e}')
+        else:
+            yield AirportDensityEvent(zoom, tuple(cells))
@@ -0,0 +1,53 @@
+# p2app/engine/handle_summary.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Handles the processes related to counting the regions, airports and runways in
+# each continent, country and region
+
+import sqlite3
+from p2app.events import *
+from .dispatch import handles
+from .summary import *
+
+
+# The kinds of area that can be summarized
+_AREAS = (AREA_CONTINENT, AREA_COUNTRY, AREA_REGION)
+
+
+@handles(LoadAreaSummaryEvent)
+def _on_load_area_summary(engine, event):
+    if engine.connection is None:
+        yield AreaSummaryFailedEvent('No database is open')
+    elif event.area() not in _AREAS:
+        yield AreaSummaryFailedEvent(f'Cannot summarize a {event.area()}')
+    else:
+        try:
+            summaries = area_summaries(engine.connection, event.area(), event.area_id(), engine.summary_counts)
+        except sqlite3.Error as e:
+            yield AreaSummaryFailedEvent(f'Summary failed: {e}')
+        else:
+            yield AreaSummariesLoadedEvent(event.area(), tuple(summaries))
+
+
+@handles(RebuildAreaSummariesEvent)
+def _on_rebuild_area_summaries(engine, event):
+    if engine.connection is None:
+        yield AreaSummaryFailedEvent('No database is open')
+        return
+
+    # The tables are rebuilt in a transaction of their own, so the writes before it
+    # are committed first
+    engine.commit_changes()
+
+    try:
+        created = provision_summary(engine.connection)
+        drifted = 0 if created else rebuild_summary(engine.connection)
+        engine.connection.commit()
+    except sqlite3.Error as e:
+        engine.connection.rollback()
+        yield AreaSummaryFailedEvent(f'Rebuild failed: {e}')
+    else:
+        engine.summary_counts = True
+        yield AreaSummariesRebuiltEvent(created, drifted)
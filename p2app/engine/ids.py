@@ -0,0 +1,113 @@
+# p2app/engine/ids.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Hands out the ids of new continents, countries, regions and airports from memory, so
+# that saving one doesn't first have to ask the database for the largest id in
+# use (and doesn't collide with an existing id once ids have gaps).
+
+import sqlite3
+import threading
+
+
+class IdAllocator:
+    """Hands out ids for the new rows of one table, counting up from the largest
+    id in the table when the first id was asked for.
+
+    Ids are handed out under a lock, so no two writers are ever given the same id,
+    even from different threads.
+
+    Attributes:
+        table: the table whose ids are handed out
+        id_column: the table's id column
+    """
+
+    def __init__(self, table: str, id_column: str):
+        """Initializes an allocator that hasn't yet read the table's largest id.
+
+        Args:
+            table: the table whose ids are handed out
+            id_column: the table's id column
+        """
+
+        self.table = table
+        self.id_column = id_column
+        self._last_id = None
+        self._lock = threading.Lock()
+
+
+    def allocate(self, connection: sqlite3.Connection) -> int:
+        """Returns an id that no row of the table has, and that won't be handed out
+        again.
+
+        Args:
+            connection: a connection to the database, which is only queried the
+            first time an id is asked for
+        """
+
+        with self._lock:
+            if self._last_id is None:
+                max_id = connection.execute(f'SELECT MAX({self.id_column}) FROM {self.table}').fetchone()[0]
+                self._last_id = max_id if max_id is not None else 0
+
+            self._last_id += 1
+            return self._last_id
+
+
+    def reset(self):
+        """Forgets the largest id, so that it's read again the next time an id is asked
+        for (after the table has been written to some other way, for example)."""
+
+        with self._lock:
+            self._last_id = None
+
+
+class IdAllocators:
+    """The id allocators of every table whose new rows are saved by the engine.
+
+    Attributes:
+        in_memory: whether ids are handed out from memory; if not, allocate()
+        returns None and the id is assigned by SQLite when the row is inserted
+    """
+
+    def __init__(self, in_memory: bool = True):
+        """Initializes the allocators.
+
+        Args:
+            in_memory: whether ids are handed out from memory
+        """
+
+        self.in_memory = in_memory
+        self._allocators = {
+            'continent': IdAllocator('continent', 'continent_id'),
+            'country': IdAllocator('country', 'country_id'),
+            'region': IdAllocator('region', 'region_id'),
+            'airport': IdAllocator('airport', 'airport_id')
+        }
+
+
+    def allocate(self, entity: str, connection: sqlite3.Connection) -> int | None:
+        """Returns the id of a new row for an entity, or None if SQLite assigns it.
+
+        Args:
+            entity: the kind of entity, such as 'region'
+            connection: a connection to the database
+        """
+
+        if not self.in_memory:
+            return None
+
+        return self._allocators[entity].allocate(connection)
+
+
+    def reset(self, entity: str | None = None):
+        """Forgets the largest id of an entity's table, or of every table.
+
+        Args:
+            entity: the kind of entity, or None for every kind
+        """
+
+        for name, allocator in self._allocators.items():
+            if entity is None or name == entity:
+                allocator.reset()
@@ -0,0 +1,423 @@
+# p2app/engine/importer.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Loads the CSV files published by OurAirports into an airport database, replacing
+# what's there.
+#
+# The files are read a chunk of rows at a time and each chunk is written with one
+# executemany call, all in one transaction with its foreign keys checked only at
+# the end; the engine's indexes, full-text indexes, spatial indexes, map density
+# counts, area summaries and runway capabilities are dropped first and built again
+# once the rows are in, rather than being updated row by row.
+#
+# Large files are parsed in parallel: each is split into byte ranges that begin and
+# end on row boundaries, the ranges are parsed and converted by a pool of worker
+# processes, and their rows are written, in order, by the one connection.
+
+import collections
+import csv
+import io
+import multiprocessing
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from p2app.events import *
+from .capability import drop_capability
+from .capability import provision_capability
+from .density import drop_density
+from .density import provision_density
+from .fulltext import drop_fulltext
+from .fulltext import provision_fulltext
+from .indexes import drop_indexes
+from .indexes import provision_indexes
+from .ourairports import *
+from .spatial import drop_spatial
+from .spatial import provision_spatial
+from .summary import drop_summary
+from .summary import provision_summary
+
+
+# The number of rows read from a file, and written with one executemany call, at a time
+IMPORT_CHUNK_SIZE = 5000
+
+# The number of bytes of a file parsed by a worker process at a time; files shorter
+# than two of these are parsed without the worker processes
+RANGE_BYTES = 1 << 20
+
+# The number of bytes of a file read at a time while splitting it into ranges
+_SCAN_BYTES = 1 << 16
+
+
+def missing_files(directory: Path) -> list[str]:
+    """Returns the names of the OurAirports files that aren't in a directory.
+
+    Args:
+        directory: the directory the files are expected in
+    """
+
+    return [source.file_name for source in SOURCE_FILES if not (directory / source.file_name).is_file()]
+
+
+def parse_chunks(path: Path, convert, chunk_size: int = IMPORT_CHUNK_SIZE):
+    """A generator function that reads a CSV file lazily, yielding its rows a chunk at
+    a time, each converted into the parameters of an INSERT statement.
+
+    Args:
+        path: the path to the CSV file
+        convert: a function that turns a CSV row into parameters
+        chunk_size: the number of rows in a chunk
+
+    Yields:
+        a list of the converted rows in each chunk, along with the number of rows in
+        the chunk that were malformed and left out
+    """
+
+    with open(path, newline = '', encoding = 'utf-8-sig') as file:
+        rows = []
+        malformed = 0
+
+        for row in csv.DictReader(file):
+            try:
+                rows.append(convert(row))
+            except (KeyError, ValueError):
+                malformed += 1
+
+            if len(rows) + malformed >= chunk_size:
+                yield rows, malformed
+                rows = []
+                malformed = 0
+
+        if rows or malformed:
+            yield rows, malformed
+
+
+def split_ranges(path: Path, range_bytes: int = RANGE_BYTES) -> tuple[list[str], list[tuple[int, int]]]:
+    """Splits a CSV file into byte ranges of about the given length, each beginning at
+    the start of a row and ending at the end of one.
+
+    A newline ends a row unless it's inside a quoted field, which it is if an odd
+    number of quotes come before it in the row; since a file's rows each have an
+    even number of quotes, only the quotes since the start of the range need
+    counting. The file is scanned a block at a time, counting quotes as it goes,
+    so it's never held in memory all at once.
+
+    Args:
+        path: the path to the CSV file
+        range_bytes: the length of a range, which is exceeded only to finish its last row
+
+    Returns:
+        the file's header, and the (start, end) offsets of each range after it
+    """
+
+    with open(path, 'rb') as file:
+        header = next(csv.reader([file.readline().decode('utf-8-sig')]), [])
+        ranges = []
+        start = file.tell()
+
+        # The offset of the block being scanned, and whether an odd number of quotes
+        # come between the start of the range and the block
+        offset = start
+        odd_quotes = False
+
+        while block := file.read(_SCAN_BYTES):
+            scanned = 0
+
+            # The range ends at the first newline outside a quoted field that's at
+            # least range_bytes past its start, which may be in a later block
+            while start + range_bytes - offset < len(block):
+                search_from = max(scanned, start + range_bytes - offset)
+                odd_quotes ^= block.count(b'"', scanned, search_from) % 2 == 1
+                scanned = search_from
+                row_end = None
+
+                while (newline := block.find(b'\n', scanned)) != -1:
+                    odd_quotes ^= block.count(b'"', scanned, newline) % 2 == 1
+                    scanned = newline + 1
+
+                    if not odd_quotes:
+                        row_end = offset + scanned
+                        break
+
+                if row_end is None:
+                    break
+
+                ranges.append((start, row_end))
+                start = row_end
+
+            odd_quotes ^= block.count(b'"', scanned) % 2 == 1
+            offset += len(block)
+
+        if start < offset:
+            ranges.append((start, offset))
+
+    return header, ranges
+
+
+def parse_range(path: Path, header: list[str], start: int, end: int, convert) -> tuple[list[tuple], int]:
+    """Parses and converts the rows in a byte range of a CSV file; this is what each
+    worker process runs.
+
+    Args:
+        path: the path to the CSV file
+        header: the file's header
+        start: the offset of the range's first row
+        end: the offset just past the range's last row
+        convert: a function that turns a CSV row into parameters
+
+    Returns:
+        the converted rows, and the number of rows that were malformed and left out
+    """
+
+    with open(path, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode('utf-8')
+
+    rows = []
+    malformed = 0
+
+    for row in csv.DictReader(io.StringIO(text, newline = ''), fieldnames = header):
+        try:
+            rows.append(convert(row))
+        except (KeyError, ValueError):
+            malformed += 1
+
+    return rows, malformed
+
+
+def parallel_parse_chunks(path: Path, convert, executor: ProcessPoolExecutor, workers: int,
+                          range_bytes: int = RANGE_BYTES):
+    """A generator function that parses a CSV file in worker processes, yielding the
+    rows of each byte range in the order they appear in the file.
+
+    At most two ranges per worker are parsed ahead of the rows being consumed, so
+    that a slow consumer doesn't leave the whole file's rows waiting in memory.
+
+    Args:
+        path: the path to the CSV file
+        convert: a function that turns a CSV row into parameters
+        executor: the pool of worker processes
+        workers: the number of worker processes in the pool
+        range_bytes: the length of a range
+
+    Yields:
+        a list of the converted rows in each range, along with the number of rows in
+        the range that were malformed and left out
+    """
+
+    header, ranges = split_ranges(path, range_bytes)
+    pending = collections.deque()
+
+    for start, end in ranges:
+        pending.append(executor.submit(parse_range, path, header, start, end, convert))
+
+        if len(pending) >= 2 * workers:
+            yield pending.popleft().result()
+
+    while pending:
+        yield pending.popleft().result()
+
+
+def parsing_executor(workers: int) -> ProcessPoolExecutor | None:
+    """Returns a pool of worker processes for parsing large files, or None if there's
+    to be only one worker, the calling process.
+
+    Args:
+        workers: the number of worker processes
+    """
+
+    # Worker processes are started rather than forked, since forking a process
+    # that's running other threads (like the engine's worker) isn't safe
+    return ProcessPoolExecutor(workers, multiprocessing.get_context('spawn')) if workers > 1 else None
+
+
+def read_chunks(path: Path, convert, executor: ProcessPoolExecutor | None, workers: int,
+                chunk_size: int = IMPORT_CHUNK_SIZE):
+    """A generator function that yields the converted rows of a CSV file in chunks,
+    parsing it in worker processes if there are any and the file is large enough to
+    be worth it.
+
+    Args:
+        path: the path to the CSV file
+        convert: a function that turns a CSV row into parameters
+        executor: the pool of worker processes, or None
+        workers: the number of worker processes in the pool
+        chunk_size: the number of rows in a chunk, when the file is parsed by the
+        calling process
+
+    Yields:
+        a list of the converted rows in each chunk, along with the number of rows in
+        the chunk that were malformed and left out
+    """
+
+    if executor is not None and path.stat().st_size >= 2 * RANGE_BYTES:
+        yield from parallel_parse_chunks(path, convert, executor, workers)
+    else:
+        yield from parse_chunks(path, convert, chunk_size)
+
+
+def import_ourairports(connection: sqlite3.Connection, directory: Path, chunk_size: int = IMPORT_CHUNK_SIZE,
+                       workers: int | None = None):
+    """A generator function that replaces the contents of a database with the data in
+    a directory of OurAirports CSV files.
+
+    A row that can't be loaded (because it's malformed, breaks a constraint, or refers
+    to a row that couldn't be loaded) is left out and counted, rather than stopping
+    the import; anything else that goes wrong leaves the database as it was.
+
+    Args:
+        connection: a connection to the database, with no uncommitted changes
+        directory: the directory containing the CSV files
+        chunk_size: the number of rows written at a time
+        workers: the number of worker processes that parse the large files, or None
+        for one per CPU; with 1, every file is parsed by the calling process
+
+    Yields:
+        ImportProgressEvent after each chunk of rows is written
+        DataImportedEvent with the number of rows in each table once they're all
+        written, or ImportFailedEvent if the import couldn't be done
+    """
+
+    missing = missing_files(directory)
+
+    if missing:
+        yield ImportFailedEvent(f'Missing {", ".join(missing)} in {directory}')
+        return
+
+    workers = workers or os.cpu_count() or 1
+    executor = parsing_executor(workers)
+
+    dropped_indexes = drop_indexes(connection)
+    dropped_fulltext = drop_fulltext(connection)
+    dropped_spatial = drop_spatial(connection)
+    dropped_density = drop_density(connection)
+    dropped_summary = drop_summary(connection)
+    dropped_capability = drop_capability(connection)
+
+    try:
+        connection.execute('BEGIN')
+        connection.execute('PRAGMA defer_foreign_keys = ON')
+
+        for table in TABLES_CHILDREN_FIRST:
+            connection.execute(f'DELETE FROM {table}')
+
+        rejected = {}
+
+        if (directory / CONTINENT_FILE.file_name).is_file():
+            sources = [CONTINENT_FILE, *SOURCE_FILES]
+        else:
+            connection.executemany(CONTINENT_FILE.insert_sql, CONTINENTS)
+            sources = SOURCE_FILES
+
+        for source in sources:
+            rows_read = 0
+            rejected[source.table] = 0
+
+            path = directory / source.file_name
+
+            for rows, malformed in read_chunks(path, source.convert, executor, workers, chunk_size):
+                for start in range(0, len(rows), chunk_size):
+                    rejected[source.table] += write_chunk(connection, source.insert_sql, rows[start:start + chunk_size])
+
+                rejected[source.table] += malformed
+                rows_read += len(rows) + malformed
+                yield ImportProgressEvent(source.table, rows_read)
+
+        for table, orphans in reject_orphans(connection).items():
+            rejected[table] = rejected.get(table, 0) + orphans
+
+        imported = {
+            table: connection.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+            for table in reversed(TABLES_CHILDREN_FIRST)
+        }
+
+        connection.commit()
+    except (OSError, UnicodeError, csv.Error, sqlite3.Error, BrokenProcessPool) as e:
+        connection.rollback()
+        yield ImportFailedEvent(f'Import failed: {e}')
+    else:
+        yield DataImportedEvent(imported, rejected)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures = True)
+
+        provision_indexes(connection, dropped_indexes)
+
+        if dropped_fulltext:
+            provision_fulltext(connection)
+
+        if dropped_spatial:
+            provision_spatial(connection)
+
+        if dropped_density:
+            provision_density(connection)
+
+        if dropped_summary:
+            provision_summary(connection)
+
+        if dropped_capability:
+            provision_capability(connection)
+
+
+def write_chunk(connection: sqlite3.Connection, sql: str, rows: list[tuple]) -> int:
+    """Writes rows with one executemany call, unless one of them breaks a constraint,
+    in which case they're written one at a time so that only the rows breaking one
+    are lost.
+
+    Args:
+        connection: a connection to the database, in a transaction
+        sql: the statement that writes one row
+        rows: the parameters of each row
+
+    Returns:
+        the number of rows that broke a constraint and weren't written
+    """
+
+    connection.execute('SAVEPOINT import_chunk')
+
+    try:
+        connection.executemany(sql, rows)
+        connection.execute('RELEASE import_chunk')
+        return 0
+    except sqlite3.IntegrityError:
+        connection.execute('ROLLBACK TO import_chunk')
+        connection.execute('RELEASE import_chunk')
+
+    rejected = 0
+
+    for row in rows:
+        try:
+            connection.execute(sql, row)
+        except sqlite3.IntegrityError:
+            rejected += 1
+
+    return rejected
+
+
+def reject_orphans(connection: sqlite3.Connection) -> dict[str, int]:
+    """Removes the rows that refer to a missing row, so that the foreign keys will be
+    satisfied at commit.
+
+    Parents are checked first, so that the children of any parent removed along the
+    way are removed too.
+
+    Args:
+        connection: a connection to the database, in a transaction
+
+    Returns:
+        the number of rows removed from each table they were removed from
+    """
+
+    rejected = {}
+
+    for table in reversed(TABLES_CHILDREN_FIRST):
+        orphans = [(rowid,) for _, rowid, _, _ in connection.execute(f'PRAGMA foreign_key_check({table})')]
+
+        if orphans:
+            connection.executemany(f'DELETE FROM {table} WHERE rowid = ?', orphans)
+            rejected[table] = len(orphans)
+
+    return rejected
@@ -0,0 +1,96 @@
+# p2app/engine/indexes.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# The secondary indexes that the engine's searches and foreign keys rely on, which
+# the airport database doesn't have on its own.
+
+import sqlite3
+
+
+# Each index as (index name, table name, indexed columns)
+INDEXES = [
+    ('continent_name_index', 'continent', ('name',)),
+    ('country_name_index', 'country', ('name',)),
+    ('country_continent_id_index', 'country', ('continent_id',)),
+    ('region_name_index', 'region', ('name',)),
+    ('region_local_code_index', 'region', ('local_code',)),
+    ('region_continent_id_index', 'region', ('continent_id',)),
+    ('region_country_id_index', 'region', ('country_id',)),
+    ('airport_continent_id_index', 'airport', ('continent_id',)),
+    ('airport_country_id_index', 'airport', ('country_id',)),
+    ('airport_region_id_index', 'airport', ('region_id',)),
+    ('airport_name_index', 'airport', ('name',)),
+    ('airport_iata_code_index', 'airport', ('iata_code',)),
+    ('airport_gps_code_index', 'airport', ('gps_code',)),
+    ('airport_local_code_index', 'airport', ('local_code',)),
+    ('airport_frequency_airport_id_index', 'airport_frequency', ('airport_id',)),
+    ('runway_airport_id_index', 'runway', ('airport_id',)),
+    ('navigation_aid_airport_id_index', 'navigation_aid', ('airport_id',)),
+    ('navigation_aid_id_index', 'navigation_aid', ('navigation_aid_id',))
+]
+
+
+def existing_indexes(connection: sqlite3.Connection) -> set[str]:
+    """Returns the names of the indexes in the database.
+
+    Args:
+        connection: a connection to the database
+    """
+
+    return {name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+
+
+def indexes_provisioned(connection: sqlite3.Connection) -> bool:
+    """Checks whether every index in INDEXES exists in the database.
+
+    Args:
+        connection: a connection to the database
+    """
+
+    existing = existing_indexes(connection)
+    return all(name in existing for name, _, _ in INDEXES)
+
+
+def provision_indexes(connection: sqlite3.Connection, names: list[str] | None = None) -> list[str]:
+    """Creates every index in INDEXES that doesn't already exist in the database.
+
+    Args:
+        connection: a connection to the database
+        names: the names of the indexes to create, or None for all of them
+
+    Returns:
+        the names of the indexes that were created
+    """
+
+    existing = existing_indexes(connection)
+    created = []
+
+    for name, table, columns in INDEXES:
+        if name not in existing and (names is None or name in names):
+            connection.execute(f'CREATE INDEX {name} ON {table} ({", ".join(columns)})')
+            created.append(name)
+
+    return created
+
+
+def drop_indexes(connection: sqlite3.Connection) -> list[str]:
+    """Drops every index in INDEXES that exists in the database.
+
+    Args:
+        connection: a connection to the database
+
+    Returns:
+        the names of the indexes that were dropped
+    """
+
+    existing = existing_indexes(connection)
+    dropped = []
+
+    for name, _, _ in INDEXES:
+        if name in existing:
+            connection.execute(f'DROP INDEX {name}')
+            dropped.append(name)
+
+    return dropped
@@ -11,15 +11,39 @@
 
 import sqlite3
 from p2app.events import *
-from .handle_continents import get_continent
-from .handle_continents import load_continent_info
-from .handle_continents import save_continent
-from .handle_countries import get_country
-from .handle_countries import load_country_info
-from .handle_countries import save_country
-from .handle_regions import get_region
-from .handle_regions import load_region_info
-from .handle_regions import save_region
+from .dispatch import EVENT_HANDLERS
+from .dispatch import handles
+from .cache import EntityCache
+from .cache import SearchResultCache
+from .capability import capability_provisioned
+from .capability import provision_capability
+from .codes import AirportCodeIndex
+from .density import density_provisioned
+from .density import provision_density
+from .export import ExportCancellations
+from .fulltext import *
+from .greatcircle import AirportCoordinates
+from .ids import IdAllocators
+from .indexes import provision_indexes
+from .spatial import provision_spatial
+from .spatial import rebuild_stale_spatial
+from .spatial import spatial_available
+from .spatial import spatial_provisioned
+from .summary import provision_summary
+from .summary import summary_provisioned
+from .transactions import TransactionManager
+from .validation import *
+
+# The entity modules register their event handlers when they're imported
+from . import handle_airports
+from . import handle_capability
+from . import handle_continents
+from . import handle_countries
+from . import handle_exports
+from . import handle_imports
+from . import handle_regions
+from . import handle_spatial
+from . import handle_summary
 
 
 class Engine:
@@ -31,65 +55,160 @@ class Engine:
     Attributes:
         connection: the sql connection
         cursor: the sql cursor
+        validation: how thoroughly a database is checked when it is opened, one of
+        VALIDATION_QUICK, VALIDATION_BACKGROUND or VALIDATION_FULL
+        known_good: the databases that have already passed a check
+        provision_indexes: whether the indexes the engine's searches rely on are
+        created, if missing, when a database is opened
+        search_mode: how searches match names, either SEARCH_EXACT or
+        SEARCH_FULLTEXT (which creates the full-text indexes when a database is
+        opened, if they're missing)
+        fulltext_search: whether the open database's searches use the full-text
+        indexes, which they don't if SQLite was built without FTS5
+        spatial_index: whether the spatial indexes are created, if missing, when a
+        database is opened
+        spatial_search: whether the open database's searches by location use the
+        spatial indexes, rather than scanning their tables
+        density_grid: whether the table of airport counts per map cell is created,
+        if missing, when a database is opened
+        density_search: whether the open database's map densities are read from the
+        table of counts, rather than counted from the airports
+        area_summary: whether the tables of regions, airports and runways in each
+        continent, country and region are created, if missing, when a database is
+        opened
+        summary_counts: whether the open database's area summaries are read from
+        those tables, rather than counted from the rows they summarize
+        runway_capability: whether the table of what each airport's runways can
+        take is created, if missing, when a database is opened
+        capability_search: whether the open database's searches by runway read that
+        table, rather than the runways themselves
+        entity_cache: the continents, countries, regions and airports recently read or
+        written
+        search_cache: the results of recent searches
+        transactions: decides when the writes made while processing events are
+        committed
+        ids: hands out the ids of new continents, countries, regions and airports
+        airport_codes: the airports known by each code, built when a code is first
+        resolved
+        airport_coordinates: the coordinates of every airport, read when first needed
+        export_cancellations: the cancellation tokens of the exports sent and not yet
+        finished
     """
 
-    def __init__(self):
-        """Initializes the engine"""
+    def __init__(self, validation: str = VALIDATION_QUICK, known_good_path: Path | None = None,
+                 provision_indexes: bool = False, search_mode: str = SEARCH_EXACT,
+                 entity_cache_size: int = 4096, search_cache_size: int = 20000,
+                 max_pending_writes: int = 32, max_commit_delay: float = 0.5,
+                 allocate_ids: bool = True, spatial_index: bool = False,
+                 density_grid: bool = False, area_summary: bool = False,
+                 runway_capability: bool = False):
+        """Initializes the engine
+
+        Args:
+            validation: how thoroughly a database is checked when it is opened
+            known_good_path: a JSON file in which to remember the databases that
+            passed a check between runs (the application uses
+            DEFAULT_KNOWN_GOOD_PATH), or None to only remember them in memory
+            provision_indexes: whether missing indexes are created when a database
+            is opened
+            search_mode: how searches match names
+            entity_cache_size: the most continents, countries, regions and airports
+            cached at once
+            search_cache_size: the most search results cached at once
+            max_pending_writes: the most events whose writes are grouped into one
+            commit
+            max_commit_delay: the longest, in seconds, a write waits to be committed,
+            provided events keep arriving or idle_events is called (see
+            TransactionManager)
+            allocate_ids: whether the ids of new rows are handed out from memory,
+            rather than assigned by SQLite
+            spatial_index: whether missing spatial indexes are created when a
+            database is opened
+            density_grid: whether a missing table of airport counts per map cell
+            is created when a database is opened
+            area_summary: whether missing tables of regions, airports and runways
+            in each continent, country and region are created when a database is
+            opened
+            runway_capability: whether a missing table of what each airport's
+            runways can take is created when a database is opened
+        """
 
         self.connection = None
         self.cursor = None
+        self.validation = validation
+        self.known_good = KnownGoodMarkers(known_good_path)
+        self.provision_indexes = provision_indexes
+        self.search_mode = search_mode
+        self.fulltext_search = False
+        self.spatial_index = spatial_index
+        self.spatial_search = False
+        self.density_grid = density_grid
+        self.density_search = False
+        self.area_summary = area_summary
+        self.summary_counts = False
+        self.runway_capability = runway_capability
+        self.capability_search = False
+        self.entity_cache = EntityCache(entity_cache_size)
+        self.search_cache = SearchResultCache(search_cache_size)
+        self.transactions = TransactionManager(max_pending_writes, max_commit_delay)
+        self.ids = IdAllocators(allocate_ids)
+        self.airport_codes = AirportCodeIndex()
+        self.airport_coordinates = AirportCoordinates()
+        self.export_cancellations = ExportCancellations()
+        self._path = None
+        self._opened_known_good = False
+        self._opened_data_version = None
+        self._integrity_check = None
 
 
     def process_event(self, event):
         """A generator function that processes one event sent from the user interface,
-        yielding zero or more events in response."""
+        yielding zero or more events in response.
 
-        # This is a way to write a generator function that always yields zero values.
-        # You'll want to remove this and replace it with your own code, once you start
-        # writing your engine, but this at least allows the program to run.
+        The event is handled by the function registered for its type in
+        EVENT_HANDLERS, which the entity modules add to when they're imported. Its
+        writes, if it makes any, are committed along with those of the events around
+        it, as self.transactions decides."""
 
-        if isinstance(event, OpenDatabaseEvent):
-            yield self.open_database(event.path())
-        elif isinstance(event, QuitInitiatedEvent):
-            if self.cursor is not None and self.connection is not None:
-                self.close_database()
-            yield EndApplicationEvent()
-        elif isinstance(event, CloseDatabaseEvent):
-            self.close_database()
-            yield DatabaseClosedEvent()
-        elif isinstance(event, StartContinentSearchEvent):
-            yield from get_continent(self.cursor, event.continent_code(), event.name())
-        elif isinstance(event, LoadContinentEvent):
-            yield load_continent_info(self.cursor, event.continent_id())
-        elif isinstance(event, SaveContinentEvent):
-            yield save_continent(self.cursor, event.continent(), 'modify')
-        elif isinstance(event, SaveNewContinentEvent):
-            yield save_continent(self.cursor, event.continent(), 'new')
-        elif isinstance(event, StartCountrySearchEvent):
-            yield from get_country(self.cursor, event.country_code(), event.name())
-        elif isinstance(event, LoadCountryEvent):
-            yield load_country_info(self.cursor, event.country_id())
-        elif isinstance(event, SaveCountryEvent):
-            yield save_country(self.cursor, event.country(), 'modify')
-        elif isinstance(event, SaveNewCountryEvent):
-            yield save_country(self.cursor, event.country(), 'new')
-        elif isinstance(event, StartRegionSearchEvent):
-            yield from get_region(self.cursor, event.region_code(), event.local_code(), event.name())
-        elif isinstance(event, LoadRegionEvent):
-            yield load_region_info(self.cursor, event.region_id())
-        elif isinstance(event, SaveRegionEvent):
-            yield save_region(self.cursor, event.region(), 'modify')
-        elif isinstance(event, SaveNewRegionEvent):
-            yield save_region(self.cursor, event.region(), 'new')
-        else:
-            yield ErrorEvent("This should not happen")
+        yield from self.idle_events()
 
-        self.commit_changes()
+        handler = EVENT_HANDLERS.handler_for(type(event))
+
+        # The event's writes are counted even if its handler raises, since they're
+        # still pending in the connection's transaction
+        try:
+            if handler is None:
+                yield ErrorEvent("This should not happen")
+            else:
+                yield from handler(self, event)
+        finally:
+            self.transactions.event_processed(self.connection)
+
+
+    def interrupt(self, event):
+        """Acts on an event as soon as it's sent, rather than when it's processed,
+        which for an event that stops the one being processed would be too late.
+
+        This is called on the thread that sends the event, so it only sets flags that
+        the event being processed checks.
+
+        Args:
+            event: an event sent from the user interface
+        """
+
+        if isinstance(event, ExportEvent):
+            self.export_cancellations.sent(event)
+        elif isinstance(event, CancelExportEvent):
+            self.export_cancellations.cancel_all()
 
 
     def open_database(self, path: Path) -> DatabaseOpenedEvent | DatabaseOpenFailedEvent:
         """Opens a sql database from the specified path.
 
+        Rather than reading every page with PRAGMA integrity_check, the file's header
+        and schema are checked first, and the more expensive check is then skipped,
+        deferred or run according to self.validation.
+
         Args:
             path: the path to a sql database.
 
@@ -98,43 +217,200 @@ class Engine:
               DatabaseOpenFailedEvent with a user-friendly error message
         """
 
+        if not has_sqlite_header(path):
+            return DatabaseOpenFailedEvent('Not a database file')
+
         self.connection = sqlite3.connect(path)
-        self.cursor = self.connection.execute('PRAGMA foreign_keys = ON')
 
         # Checks if the file is a database
         try:
-            self.connection.execute('PRAGMA integrity_check')
+            self.cursor = self.connection.execute('PRAGMA foreign_keys = ON')
+            version = schema_version(self.connection)
         except sqlite3.DatabaseError:
-            self.cursor.close()
-            self.connection.close()
+            self.close_database()
             return DatabaseOpenFailedEvent('Not a database file')
 
         # Checks if the database is an airport database
-        correct_tables_list = [('continent',), ('country',), ('region',),
-                               ('airport',), ('airport_frequency',), ('runway',), ('navigation_aid',)]
-        list_of_tables = self.cursor.execute(
-            """SELECT name 
-               FROM sqlite_master 
-               WHERE type='table'""").fetchall()
-        for table in correct_tables_list:
-            if table not in list_of_tables:
-                self.cursor.close()
-                self.connection.close()
-                return DatabaseOpenFailedEvent('Not an airport database')
+        if not has_airport_schema(self.connection):
+            self.close_database()
+            return DatabaseOpenFailedEvent('Not an airport database')
+
+        is_known_good = self.known_good.is_known_good(path, version)
+        was_known_good = is_known_good
+
+        if self.validation == VALIDATION_FULL or (self.validation == VALIDATION_QUICK and not is_known_good):
+            pragma = 'integrity_check' if self.validation == VALIDATION_FULL else 'quick_check'
+
+            if not passes_check(self.connection, pragma):
+                self.known_good.forget(path)
+                self.close_database()
+                return DatabaseOpenFailedEvent('Not a database file')
+
+            self.known_good.mark_known_good(path, version)
+            is_known_good = True
+        elif self.validation == VALIDATION_BACKGROUND and not is_known_good:
+            # The file is only marked if nothing was written to it while it was
+            # being checked
+            snapshot = self.known_good.snapshot(path, version)
+            self._integrity_check = BackgroundIntegrityCheck(
+                path, lambda: self.known_good.mark_known_good(path, version, unchanged_since = snapshot))
+
+        provisioned = self.provision_indexes and provision_indexes(self.connection)
+
+        # Full-text searches fall back to exact ones if SQLite was built without FTS5
+        self.fulltext_search = self.search_mode == SEARCH_FULLTEXT and fulltext_available(self.connection)
+
+        if self.fulltext_search and provision_fulltext(self.connection):
+            provisioned = True
+
+        # Searches by location scan their tables if SQLite was built without R*Tree
+        # or the database has no spatial indexes
+        if self.spatial_index and spatial_available(self.connection) and provision_spatial(self.connection):
+            provisioned = True
+
+        self.spatial_search = spatial_available(self.connection) and spatial_provisioned(self.connection)
+
+        # A spatial index keyed by rowid is out of date if the database was vacuumed
+        # since it was filled, which can only have happened if the file changed since
+        # it was last known to be good
+        if self.spatial_search and not was_known_good and rebuild_stale_spatial(self.connection):
+            provisioned = True
+
+        if self.density_grid and provision_density(self.connection):
+            provisioned = True
+
+        self.density_search = density_provisioned(self.connection)
+
+        if self.area_summary and provision_summary(self.connection):
+            provisioned = True
+
+        self.summary_counts = summary_provisioned(self.connection)
 
+        if self.runway_capability and provision_capability(self.connection):
+            provisioned = True
+
+        self.capability_search = capability_provisioned(self.connection)
+
+        if provisioned:
+            self.commit_changes()
+
+            if is_known_good:
+                self.known_good.mark_known_good(path, schema_version(self.connection))
+
+        self._path = path
+        self._opened_known_good = is_known_good
+        self._opened_data_version = _data_version(self.connection)
+        self.entity_cache.clear()
+        self.search_cache.clear()
+        self.ids.reset()
+        self.airport_codes.clear()
+        self.airport_coordinates.clear()
         return DatabaseOpenedEvent(path)
 
 
+    def load_more_search_results(self, continuation: SearchContinuation):
+        """A generator function that yields the next page of a search's results.
+
+        Args:
+            continuation: where the search left off
+        """
+
+        search = EVENT_HANDLERS.search_for(continuation.entity)
+
+        if search is None:
+            yield ErrorEvent(f'Cannot continue a search for {continuation.entity}')
+        else:
+            yield from search(self, continuation)
+
+
+    def idle_events(self):
+        """A generator function that yields the events that became ready while no event
+        was being processed, such as the result of a background integrity check.
+
+        Writes that have waited too long for a commit are committed along the way."""
+
+        self.transactions.flush_if_overdue(self.connection)
+
+        if self._integrity_check is not None and self._integrity_check.is_done():
+            passed = self._integrity_check.passed()
+            self._integrity_check = None
+
+            if not passed:
+                yield ErrorEvent('The database failed its integrity check and may be corrupt')
+
+
     def close_database(self):
-        """Closes the cursor and database."""
+        """Commits any pending writes, then closes the cursor and database."""
+
+        self.commit_changes()
+
+        # PRAGMA data_version changes when another connection commits to the file, but
+        # not when this one does
+        still_known_good = self._opened_known_good and _data_version(self.connection) == self._opened_data_version
+        version = schema_version(self.connection) if still_known_good else None
+
+        if self.cursor is not None:
+            self.cursor.close()
+            self.cursor = None
 
-        self.cursor.close()
-        self.cursor = None
         self.connection.close()
         self.connection = None
 
+        # A file that was known to be good when it was opened is marked again, since
+        # its size and modification time have changed if the engine wrote to it. That's
+        # safe because the engine's writes are all made in SQLite transactions, which
+        # can't leave a good database corrupt, and nothing else wrote to it while it
+        # was open, or its data version would have changed. A file something else
+        # wrote to is checked again the next time it's opened.
+        if still_known_good:
+            self.known_good.mark_known_good(self._path, version)
+
+        self._path = None
+        self._opened_known_good = False
+        self._opened_data_version = None
+        self._integrity_check = None
+        self.spatial_search = False
+        self.density_search = False
+        self.summary_counts = False
+        self.capability_search = False
+        self.entity_cache.clear()
+        self.search_cache.clear()
+        self.ids.reset()
+        self.airport_codes.clear()
+        self.airport_coordinates.clear()
+
 
     def commit_changes(self):
-        """Commits to memory changes made to the database."""
+        """Commits to memory changes made to the database, including any writes
+        pending a group commit."""
+
+        self.transactions.flush(self.connection)
+
+
+@handles(OpenDatabaseEvent)
+def _on_open_database(engine, event):
+    yield engine.open_database(event.path())
+
+
+@handles(QuitInitiatedEvent)
+def _on_quit_initiated(engine, event):
+    if engine.cursor is not None and engine.connection is not None:
+        engine.close_database()
+
+    yield EndApplicationEvent()
+
+
+@handles(CloseDatabaseEvent)
+def _on_close_database(engine, event):
+    engine.close_database()
+    yield DatabaseClosedEvent()
+
+
+@handles(LoadMoreSearchResultsEvent)
+def _on_load_more_search_results(engine, event):
+    return engine.load_more_search_results(event.continuation())
+
+
 
-        self.connection.commit()
\ No newline at end of file
+def _data_version(connection: sqlite3.Connection) -> int:
+    return connection.execute('PRAGMA data_version').fetchone()[0]
@@ -0,0 +1,189 @@
+# p2app/engine/ourairports.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# How the CSV files published by OurAirports (https://ourairports.com/data/) map
+# onto the tables of the airport database: which file fills which table, and how
+# each CSV row is turned into the parameters of the table's INSERT statement.
+#
+# OurAirports refers to continents, countries, regions and airports by their codes,
+# while the airport database refers to them by id, so the INSERT statements look
+# the ids up by code in the rows already loaded.
+
+from collections import namedtuple
+
+
+# OurAirports has no file of continents, so unless a continents.csv (with code and
+# name columns) is given, these are loaded
+CONTINENTS = [
+    ('AF', 'Africa'),
+    ('AN', 'Antarctica'),
+    ('AS', 'Asia'),
+    ('EU', 'Europe'),
+    ('NA', 'North America'),
+    ('OC', 'Oceania'),
+    ('SA', 'South America')
+]
+
+
+# A CSV file and the table it fills: the INSERT statement that adds one row, and
+# a function that turns a CSV row (a dictionary keyed on the file's header) into
+# that statement's parameters, raising ValueError if the row is malformed
+SourceFile = namedtuple('SourceFile', ['table', 'file_name', 'insert_sql', 'convert'])
+
+
+def _text(value: str | None) -> str | None:
+    return value if value else None
+
+
+def _required_text(value: str | None) -> str:
+    if not value:
+        raise ValueError('missing a required value')
+
+    return value
+
+
+def _int(value: str | None) -> int | None:
+    if not value:
+        return None
+
+    try:
+        return int(value)
+    except ValueError:
+        return int(float(value))
+
+
+def _float(value: str | None) -> float | None:
+    return float(value) if value else None
+
+
+def _required_number(convert, value: str | None):
+    if not value:
+        raise ValueError('missing a required value')
+
+    return convert(value)
+
+
+def _flag(value: str | None) -> int:
+    return 1 if value in ('1', 'yes', 'true') else 0
+
+
+def convert_continent(row: dict) -> tuple:
+    return _required_text(row['code']), _required_text(row['name'])
+
+
+def convert_country(row: dict) -> tuple:
+    return (
+        _required_number(int, row['id']), _required_text(row['code']), _required_text(row['name']),
+        row['continent'], row['wikipedia_link'] or '', _text(row['keywords']))
+
+
+def convert_region(row: dict) -> tuple:
+    return (
+        _required_number(int, row['id']), _required_text(row['code']), row['local_code'] or '',
+        _required_text(row['name']), row['continent'], row['iso_country'],
+        _text(row['wikipedia_link']), _text(row['keywords']))
+
+
+def convert_airport(row: dict) -> tuple:
+    return (
+        _required_number(int, row['id']), _required_text(row['ident']), _required_text(row['type']),
+        row['name'] or '', _required_number(float, row['latitude_deg']),
+        _required_number(float, row['longitude_deg']), _int(row['elevation_ft']),
+        row['continent'], row['iso_country'], row['iso_region'], _text(row['municipality']),
+        _flag(row['scheduled_service']), _text(row['gps_code']), _text(row['iata_code']),
+        _text(row['local_code']), _text(row['home_link']), _text(row['wikipedia_link']),
+        _text(row['keywords']))
+
+
+def convert_runway(row: dict) -> tuple:
+    return (
+        _required_number(int, row['id']), _required_number(int, row['airport_ref']),
+        _int(row['length_ft']), _int(row['width_ft']), _text(row['surface']),
+        _flag(row['lighted']), _flag(row['closed']),
+        _text(row['le_ident']), _float(row['le_latitude_deg']), _float(row['le_longitude_deg']),
+        _int(row['le_elevation_ft']), _float(row['le_heading_degT']), _int(row['le_displaced_threshold_ft']),
+        _text(row['he_ident']), _float(row['he_latitude_deg']), _float(row['he_longitude_deg']),
+        _int(row['he_elevation_ft']), _float(row['he_heading_degT']), _int(row['he_displaced_threshold_ft']))
+
+
+def convert_airport_frequency(row: dict) -> tuple:
+    return (
+        _required_number(int, row['id']), _required_number(int, row['airport_ref']),
+        row['type'] or '', _text(row['description']), _required_number(float, row['frequency_mhz']))
+
+
+def convert_navigation_aid(row: dict) -> tuple:
+    return (
+        _required_number(int, row['id']), row['filename'] or '', row['ident'] or '', row['name'] or '',
+        _required_text(row['type']), _required_number(_int, row['frequency_khz']),
+        _required_number(float, row['latitude_deg']), _required_number(float, row['longitude_deg']),
+        _int(row['elevation_ft']), row['iso_country'] or '', _int(row['dme_frequency_khz']),
+        _text(row['dme_channel']), _float(row['dme_latitude_deg']), _float(row['dme_longitude_deg']),
+        _int(row['dme_elevation_ft']), _float(row['slaved_variation_deg']),
+        _float(row['magnetic_variation_deg']), _text(row['usageType']), _text(row['power']),
+        row['associated_airport'])
+
+
+CONTINENT_FILE = SourceFile(
+    'continent', 'continents.csv',
+    'INSERT INTO continent (continent_code, name) VALUES (?, ?)',
+    convert_continent)
+
+
+# Every other file, in the order they're loaded, which puts each table after the
+# tables it refers to
+SOURCE_FILES = [
+    SourceFile(
+        'country', 'countries.csv',
+        'INSERT INTO country (country_id, country_code, name, continent_id, wikipedia_link, keywords) '
+        'VALUES (?, ?, ?, (SELECT continent_id FROM continent WHERE continent_code = ?), ?, ?)',
+        convert_country),
+    SourceFile(
+        'region', 'regions.csv',
+        'INSERT INTO region (region_id, region_code, local_code, name, continent_id, country_id, '
+        'wikipedia_link, keywords) '
+        'VALUES (?, ?, ?, ?, (SELECT continent_id FROM continent WHERE continent_code = ?), '
+        '(SELECT country_id FROM country WHERE country_code = ?), ?, ?)',
+        convert_region),
+    SourceFile(
+        'airport', 'airports.csv',
+        'INSERT INTO airport (airport_id, airport_ident, type, name, latitude_deg, longitude_deg, '
+        'elevation_ft, continent_id, country_id, region_id, municipality, scheduled_service, '
+        'gps_code, iata_code, local_code, home_link, wikipedia_link, keywords) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, '
+        'CAST((SELECT continent_id FROM continent WHERE continent_code = ?) AS TEXT), '
+        '(SELECT country_id FROM country WHERE country_code = ?), '
+        '(SELECT region_id FROM region WHERE region_code = ?), ?, ?, ?, ?, ?, ?, ?, ?)',
+        convert_airport),
+    SourceFile(
+        'runway', 'runways.csv',
+        'INSERT INTO runway (runway_id, airport_id, length_ft, width_ft, surface, lighted, closed, '
+        'le_ident, le_latitude_deg, le_longitude_deg, le_elevation_ft, le_heading_deg, '
+        'le_displaced_threshold_ft, he_ident, he_latitude_deg, he_longitude_deg, he_elevation_ft, '
+        'he_heading_deg, he_displaced_threshold_ft) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        convert_runway),
+    SourceFile(
+        'airport_frequency', 'airport-frequencies.csv',
+        'INSERT INTO airport_frequency (airport_frequency_id, airport_id, type, description, frequency_mhz) '
+        'VALUES (?, ?, ?, ?, ?)',
+        convert_airport_frequency),
+    SourceFile(
+        'navigation_aid', 'navaids.csv',
+        'INSERT INTO navigation_aid (navigation_aid_id, filename, ident, name, type, frequency_khz, '
+        'latitude_deg, longitude_deg, elevation_ft, iso_country, dme_frequency_khz, dme_channel, '
+        'dme_latitude_deg, dme_longitude_deg, dme_elevation_ft, adjusted_variation_deg, '
+        'magnetic_variation_deg, usage_type, power, airport_id) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, '
+        '(SELECT airport_id FROM airport WHERE airport_ident = ?))',
+        convert_navigation_aid)
+]
+
+
+# Every table, children before the tables they refer to, which is the order in
+# which they're emptied
+TABLES_CHILDREN_FIRST = [
+    'navigation_aid', 'airport_frequency', 'runway', 'airport', 'region', 'country', 'continent'
+]
@@ -0,0 +1,118 @@
+# p2app/engine/search.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Runs searches one page at a time, continuing each page from the sort key of the
+# last result sent (WHERE key > last key ORDER BY key), so that a broad search
+# neither builds its whole result in memory nor waits for it before sending the
+# first row.
+
+from collections import namedtuple
+from sqlite3 import Cursor
+from p2app.events import *
+
+
+# The number of results sent before the user has to ask for more
+PAGE_SIZE = 100
+
+# The number of rows fetched from the cursor, and sent in one batch event, at a time
+BATCH_SIZE = 50
+
+
+# The parts of a search's SELECT statement: the columns of each result, the table
+# (or join) they come from, the WHERE conditions and their parameters, and the
+# columns the results are sorted by, the last of which must be unique
+SearchQuery = namedtuple('SearchQuery', ['columns', 'source', 'conditions', 'parameters', 'key_columns'])
+
+
+def search_key(query: SearchQuery, after: tuple | None) -> tuple:
+    """Returns a key identifying a page of a search, which is the same for any two
+    searches that would run the same statement with the same parameters.
+
+    Args:
+        query: the search's SELECT statement
+        after: the sort key of the last result already sent, or None for the first page
+    """
+
+    return query.source, tuple(query.conditions), tuple(query.parameters), after
+
+
+def search_statement(query: SearchQuery, after: tuple | None = None,
+                     limit: int | None = None) -> tuple[str, list]:
+    """Returns the SELECT statement that runs a search, and its parameters.
+
+    Each row has the query's columns followed by its key columns.
+
+    Args:
+        query: the search's query
+        after: the sort key of the last result already sent, or None to start from the
+        first result
+        limit: the most rows selected, or None for no limit
+
+    Returns:
+        the statement and its parameters
+    """
+
+    conditions = list(query.conditions)
+    parameters = list(query.parameters)
+    key_list = ', '.join(query.key_columns)
+
+    if after is not None:
+        conditions.append(f'({key_list}) > ({", ".join("?" * len(query.key_columns))})')
+        parameters.extend(after)
+
+    sql = f'SELECT {", ".join(query.columns)}, {key_list} FROM {query.source}'
+
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+
+    sql += f' ORDER BY {key_list}'
+
+    if limit is not None:
+        sql += ' LIMIT ?'
+        parameters.append(limit)
+
+    return sql, parameters
+
+
+def paged_search(cursor: Cursor, entity: str, criteria: tuple, query: SearchQuery,
+                 after: tuple | None, page_size: int, make_batch):
+    """A generator function that yields one page of a search's results, in batches,
+    followed by a SearchPageEndEvent if there are more.
+
+    Args:
+        cursor: a cursor object used to query the database
+        entity: the kind of entity being searched for
+        criteria: the search's criteria, which are sent back in a LoadMoreSearchResultsEvent
+        query: the search's SELECT statement
+        after: the sort key of the last result already sent, or None for the first page
+        page_size: the number of results on a page
+        make_batch: a function that turns a list of rows of query.columns into a
+        batch result event
+    """
+
+    key_width = len(query.key_columns)
+
+    # One row more than a page is asked for, only to learn whether there are more
+    sql, parameters = search_statement(query, after, page_size + 1)
+
+    # The search gets a cursor of its own, so that it can't be disturbed by any
+    # other query run while its results are being sent
+    search_cursor = cursor.connection.cursor()
+
+    try:
+        search_cursor.execute(sql, parameters)
+
+        sent = 0
+
+        while sent < page_size and (rows := search_cursor.fetchmany(BATCH_SIZE)):
+            rows = rows[:page_size - sent]
+            sent += len(rows)
+            last_key = tuple(rows[-1][-key_width:])
+            yield make_batch([row[:-key_width] for row in rows])
+
+        if sent == page_size and search_cursor.fetchone() is not None:
+            yield SearchPageEndEvent(SearchContinuation(entity, criteria, last_key))
+    finally:
+        search_cursor.close()
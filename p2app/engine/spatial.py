@@ -0,0 +1,461 @@
+# p2app/engine/spatial.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# R*Tree spatial indexes over the coordinates of airports, navigation aids and
+# runway thresholds, which let searches by location read only the rows near the
+# place searched around rather than scanning the whole table.
+#
+# Each row is indexed by the box around its points (a runway's box spans both of
+# its thresholds). A search finds the rows whose boxes overlap the box around what
+# it's looking for, then measures the great-circle distance to each of them
+# exactly, since an R*Tree only knows about boxes.
+
+import math
+import sqlite3
+from collections import namedtuple
+from p2app.events import *
+
+
+# The mean radius of the earth, in kilometres
+EARTH_RADIUS_KM = 6371.0088
+
+# Half of the earth's circumference, which no two points are farther apart than
+HALF_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM
+
+# How much wider, in degrees, an R*Tree's box can be than the box it was given,
+# since it rounds its coordinates outward to single precision
+_ROUNDING_DEG = 1e-4
+
+# The radius first searched for the nearest places, which is multiplied by four
+# until enough are found
+NEAREST_START_KM = 25.0
+
+
+# A table whose rows are indexed by location: the kind of entity in it, the table,
+# the column that identifies a row to the index, the column sent back as the
+# place's id, an expression naming the place, the (latitude, longitude) columns of
+# each of a row's points, and its R*Tree table
+SpatialTable = namedtuple(
+    'SpatialTable', ['entity', 'table', 'key_column', 'id_column', 'name_sql', 'points', 'rtree'])
+
+
+SPATIAL_TABLES = [
+    SpatialTable(
+        'airport', 'airport', 'airport_id', 'airport_id', 'name',
+        [('latitude_deg', 'longitude_deg')], 'airport_rtree'),
+
+    # Navigation aids have no primary key, so they're indexed by rowid, which stays
+    # the same as long as the database isn't vacuumed; since VACUUM can renumber
+    # the rows, the index is checked against the table when a database that may
+    # have changed since it was last known to be good is opened, and filled again
+    # if they differ (see rebuild_stale_spatial)
+    SpatialTable(
+        'navigation_aid', 'navigation_aid', 'rowid', 'navigation_aid_id', 'name',
+        [('latitude_deg', 'longitude_deg')], 'navigation_aid_rtree'),
+    SpatialTable(
+        'runway', 'runway', 'runway_id', 'runway_id', "COALESCE(le_ident, '') || '/' || COALESCE(he_ident, '')",
+        [('le_latitude_deg', 'le_longitude_deg'), ('he_latitude_deg', 'he_longitude_deg')], 'runway_rtree')
+]
+
+
+def spatial_table(entity: str) -> SpatialTable | None:
+    """Returns the spatial table of a kind of entity, or None if it has none.
+
+    Args:
+        entity: the kind of entity, such as 'airport'
+    """
+
+    return next((table for table in SPATIAL_TABLES if table.entity == entity), None)
+
+
+def spatial_available(connection: sqlite3.Connection) -> bool:
+    """Checks whether the SQLite library was compiled with the R*Tree module.
+
+    Args:
+        connection: a connection to a database
+    """
+
+    return connection.execute("SELECT sqlite_compileoption_used('ENABLE_RTREE')").fetchone()[0] == 1
+
+
+def spatial_provisioned(connection: sqlite3.Connection) -> bool:
+    """Checks whether every spatial index exists in the database.
+
+    Args:
+        connection: a connection to the database
+    """
+
+    existing = {name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    return all(table.rtree in existing for table in SPATIAL_TABLES)
+
+
+def _point_sql(table: SpatialTable, prefix: str = '') -> tuple[list[str], list[str]]:
+    # The latitude and longitude of each point, NULL unless the point has both
+    latitudes = []
+    longitudes = []
+
+    for latitude, longitude in table.points:
+        both = f'{prefix}{latitude} IS NOT NULL AND {prefix}{longitude} IS NOT NULL'
+        latitudes.append(f'CASE WHEN {both} THEN {prefix}{latitude} END')
+        longitudes.append(f'CASE WHEN {both} THEN {prefix}{longitude} END')
+
+    return latitudes, longitudes
+
+
+def _extreme_sql(function: str, values: list[str]) -> str:
+    # The smallest or largest of values that may be NULL, which is NULL only if
+    # they all are
+    if len(values) == 1:
+        return values[0]
+
+    all_values = ', '.join(values)
+    return f'{function}({", ".join(f"COALESCE({value}, {all_values})" for value in values)})'
+
+
+def box_sql(table: SpatialTable, prefix: str = '') -> tuple[str, str, str, str]:
+    """Returns the expressions for the south, north, west and east edges of the box
+    around a row's points.
+
+    Args:
+        table: the spatial table
+        prefix: what's put before each column, such as 'new.' in a trigger
+    """
+
+    latitudes, longitudes = _point_sql(table, prefix)
+
+    return (
+        _extreme_sql('MIN', latitudes), _extreme_sql('MAX', latitudes),
+        _extreme_sql('MIN', longitudes), _extreme_sql('MAX', longitudes))
+
+
+def provision_spatial(connection: sqlite3.Connection) -> list[str]:
+    """Creates every spatial index that doesn't already exist in the database, along
+    with the triggers that keep it in sync with its table, then fills it.
+
+    Args:
+        connection: a connection to the database
+
+    Returns:
+        the names of the spatial indexes that were created
+    """
+
+    existing = {name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    created = []
+
+    for table in SPATIAL_TABLES:
+        if table.rtree in existing:
+            continue
+
+        rtree = table.rtree
+        key_column = table.key_column
+        point_columns = ', '.join(column for point in table.points for column in point)
+        new_edges = box_sql(table, 'new.')
+
+        # A row without a point has no box, so it isn't indexed
+        connection.executescript(f'''
+            CREATE VIRTUAL TABLE {rtree} USING rtree(id, south, north, west, east);
+
+            CREATE TRIGGER {rtree}_insert AFTER INSERT ON {table.table} BEGIN
+                INSERT INTO {rtree}
+                SELECT new.{key_column}, {", ".join(new_edges)} WHERE {new_edges[0]} IS NOT NULL;
+            END;
+
+            CREATE TRIGGER {rtree}_delete AFTER DELETE ON {table.table} BEGIN
+                DELETE FROM {rtree} WHERE id = old.{key_column};
+            END;
+
+            CREATE TRIGGER {rtree}_update AFTER UPDATE OF {table.id_column}, {point_columns} ON {table.table} BEGIN
+                DELETE FROM {rtree} WHERE id = old.{key_column};
+                INSERT INTO {rtree}
+                SELECT new.{key_column}, {", ".join(new_edges)} WHERE {new_edges[0]} IS NOT NULL;
+            END;
+
+            {_fill_sql(table)};''')
+
+        created.append(rtree)
+
+    return created
+
+
+def drop_spatial(connection: sqlite3.Connection) -> list[str]:
+    """Drops every spatial index in the database, along with its triggers.
+
+    Args:
+        connection: a connection to the database
+
+    Returns:
+        the names of the spatial indexes that were dropped
+    """
+
+    existing = {name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    dropped = []
+
+    for table in SPATIAL_TABLES:
+        if table.rtree in existing:
+            connection.executescript(f'''
+                DROP TRIGGER IF EXISTS {table.rtree}_insert;
+                DROP TRIGGER IF EXISTS {table.rtree}_delete;
+                DROP TRIGGER IF EXISTS {table.rtree}_update;
+                DROP TABLE {table.rtree};''')
+
+            dropped.append(table.rtree)
+
+    return dropped
+
+
+def rebuild_stale_spatial(connection: sqlite3.Connection) -> list[str]:
+    """Fills again every spatial index that identifies its rows by rowid and no
+    longer matches its table, which is what becomes of one when VACUUM renumbers the
+    table's rows.
+
+    An index matches its table if it has a row for each of the table's rows with a
+    point, and each of its boxes is the box around the points of the row it names
+    (give or take the rounding of an R*Tree's coordinates). This reads the whole
+    table and index, so the engine only checks a database that may have changed
+    since it was last known to be good.
+
+    Args:
+        connection: a connection to the database
+
+    Returns:
+        the names of the spatial indexes that were filled again
+    """
+
+    existing = {name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    rebuilt = []
+
+    for table in SPATIAL_TABLES:
+        if table.key_column != 'rowid' or table.rtree not in existing:
+            continue
+
+        south, north, west, east = box_sql(table, 't.')
+
+        stale = connection.execute(f'''
+            SELECT (SELECT COUNT(*) FROM {table.rtree})
+                   != (SELECT COUNT(*) FROM {table.table} t WHERE {south} IS NOT NULL)
+                OR EXISTS (
+                    SELECT 1 FROM {table.rtree} r LEFT JOIN {table.table} t ON t.rowid = r.id
+                    WHERE t.rowid IS NULL OR {south} IS NULL
+                       OR NOT (r.south <= {south} AND r.north >= {north} AND r.west <= {west} AND r.east >= {east}
+                               AND r.north - r.south <= {north} - {south} + {_ROUNDING_DEG}
+                               AND r.east - r.west <= {east} - {west} + {_ROUNDING_DEG}))''').fetchone()[0]
+
+        if stale:
+            connection.executescript(f'''
+                DELETE FROM {table.rtree};
+                {_fill_sql(table)};''')
+
+            rebuilt.append(table.rtree)
+
+    return rebuilt
+
+
+def _fill_sql(table: SpatialTable) -> str:
+    # The statement indexing every row of a table that has a point
+    edges = box_sql(table)
+
+    return (f'INSERT INTO {table.rtree} '
+            f'SELECT {table.key_column}, {", ".join(edges)} FROM {table.table} WHERE {edges[0]} IS NOT NULL')
+
+
+def great_circle_km(latitude1: float, longitude1: float, latitude2: float, longitude2: float) -> float:
+    """Returns the great-circle distance between two points, in kilometres, using the
+    haversine formula.
+
+    Args:
+        latitude1: the first point's latitude, in degrees
+        longitude1: the first point's longitude, in degrees
+        latitude2: the second point's latitude, in degrees
+        longitude2: the second point's longitude, in degrees
+    """
+
+    phi1 = math.radians(latitude1)
+    phi2 = math.radians(latitude2)
+    half_dphi = (phi2 - phi1) / 2
+    half_dlambda = math.radians(longitude2 - longitude1) / 2
+
+    h = math.sin(half_dphi) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(half_dlambda) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(h)))
+
+
+def split_box(south: float, west: float, north: float, east: float) -> list[tuple[float, float, float, float]]:
+    """Splits a box that crosses the antimeridian (its west edge being east of its
+    east edge) into the boxes on either side of it.
+
+    Args:
+        south: the box's southern edge, in degrees of latitude
+        west: the box's western edge, in degrees of longitude
+        north: the box's northern edge, in degrees of latitude
+        east: the box's eastern edge, in degrees of longitude
+
+    Returns:
+        the boxes, as (south, west, north, east)
+    """
+
+    if west <= east:
+        return [(south, west, north, east)]
+
+    return [(south, west, north, 180.0), (south, -180.0, north, east)]
+
+
+def radius_boxes(latitude: float, longitude: float, radius_km: float) -> list[tuple[float, float, float, float]]:
+    """Returns the boxes that together contain every point within a distance of a
+    point.
+
+    Args:
+        latitude: the point's latitude, in degrees
+        longitude: the point's longitude, in degrees
+        radius_km: the distance, in kilometres
+
+    Returns:
+        the boxes, as (south, west, north, east)
+    """
+
+    angle = radius_km / EARTH_RADIUS_KM
+    south = latitude - math.degrees(angle)
+    north = latitude + math.degrees(angle)
+
+    # A circle around a pole reaches every longitude
+    if south <= -90.0 or north >= 90.0 or angle >= math.pi / 2:
+        return [(max(south, -90.0), -180.0, min(north, 90.0), 180.0)]
+
+    # The widest the circle gets, which is east and west of the point, a little
+    # toward the nearer pole
+    spread = math.degrees(math.asin(min(1.0, math.sin(angle) / math.cos(math.radians(latitude)))))
+    west = longitude - spread
+    east = longitude + spread
+
+    if west < -180.0:
+        west += 360.0
+    if east > 180.0:
+        east -= 360.0
+
+    return split_box(south, west, north, east)
+
+
+def box_candidates(connection: sqlite3.Connection, table: SpatialTable, boxes: list[tuple], indexed: bool):
+    """A generator function that yields the rows whose boxes overlap any of the given
+    boxes, as (id, name, latitude and longitude of each point).
+
+    Args:
+        connection: a connection to the database
+        table: the spatial table
+        boxes: the boxes, as (south, west, north, east), none crossing the antimeridian
+        indexed: whether the table's spatial index is used, rather than a scan of the table
+    """
+
+    point_columns = ', '.join(f't.{column}' for point in table.points for column in point)
+    columns = f't.{table.id_column}, {table.name_sql}, {point_columns}'
+
+    if indexed:
+        source = f'{table.rtree} r JOIN {table.table} t ON t.{table.key_column} = r.id'
+        south, north, west, east = 'r.south', 'r.north', 'r.west', 'r.east'
+    else:
+        source = f'{table.table} t'
+        south, north, west, east = box_sql(table, 't.')
+
+    sql = f'SELECT {columns} FROM {source} WHERE {north} >= ? AND {south} <= ? AND {east} >= ? AND {west} <= ?'
+
+    # A row whose box overlaps more than one of the boxes is only yielded once
+    seen = set()
+
+    for box_south, box_west, box_north, box_east in boxes:
+        for row in connection.execute(sql, (box_south, box_north, box_west, box_east)):
+            key = row[0], row[2:]
+
+            if key not in seen:
+                seen.add(key)
+                yield row
+
+
+def _points(row):
+    return [(row[i], row[i + 1]) for i in range(2, len(row), 2) if row[i] is not None and row[i + 1] is not None]
+
+
+def places_in_box(connection: sqlite3.Connection, table: SpatialTable, south: float, west: float,
+                  north: float, east: float, indexed: bool, limit: int | None = None) -> list[Place]:
+    """Returns the places with a point inside a box, in order of id.
+
+    Args:
+        connection: a connection to the database
+        table: the spatial table
+        south: the box's southern edge, in degrees of latitude
+        west: the box's western edge, in degrees of longitude (which is east of its
+        eastern edge for a box crossing the antimeridian)
+        north: the box's northern edge, in degrees of latitude
+        east: the box's eastern edge, in degrees of longitude
+        indexed: whether the table's spatial index is used
+        limit: the most places returned, or None for all of them
+    """
+
+    boxes = split_box(south, west, north, east)
+    places = []
+
+    for row in box_candidates(connection, table, boxes, indexed):
+        inside = [
+            (latitude, longitude) for latitude, longitude in _points(row)
+            if any(s <= latitude <= n and w <= longitude <= e for s, w, n, e in boxes)
+        ]
+
+        if inside:
+            places.append(Place(table.entity, row[0], row[1], *inside[0], None))
+
+    places.sort(key = lambda place: place.place_id)
+    return places[:limit] if limit is not None else places
+
+
+def places_within(connection: sqlite3.Connection, table: SpatialTable, latitude: float, longitude: float,
+                  radius_km: float, indexed: bool, limit: int | None = None) -> list[Place]:
+    """Returns the places with a point within a distance of a point, nearest first.
+
+    Args:
+        connection: a connection to the database
+        table: the spatial table
+        latitude: the point's latitude, in degrees
+        longitude: the point's longitude, in degrees
+        radius_km: the distance, in kilometres
+        indexed: whether the table's spatial index is used
+        limit: the most places returned, or None for all of them
+    """
+
+    places = []
+
+    for row in box_candidates(connection, table, radius_boxes(latitude, longitude, radius_km), indexed):
+        distance, point = min(
+            (great_circle_km(latitude, longitude, *point), point) for point in _points(row))
+
+        if distance <= radius_km:
+            places.append(Place(table.entity, row[0], row[1], *point, distance))
+
+    places.sort(key = lambda place: (place.distance_km, place.place_id))
+    return places[:limit] if limit is not None else places
+
+
+def nearest_places(connection: sqlite3.Connection, table: SpatialTable, latitude: float, longitude: float,
+                   count: int, indexed: bool) -> list[Place]:
+    """Returns the places nearest a point, nearest first.
+
+    The places within NEAREST_START_KM are searched for first, then within four times
+    that distance, and so on, until enough are found; since every place within the
+    distance is found each time, the nearest of them are the nearest of all.
+
+    Args:
+        connection: a connection to the database
+        table: the spatial table
+        latitude: the point's latitude, in degrees
+        longitude: the point's longitude, in degrees
+        count: the number of places returned, unless there are fewer
+        indexed: whether the table's spatial index is used
+    """
+
+    radius_km = NEAREST_START_KM
+
+    while True:
+        places = places_within(connection, table, latitude, longitude, radius_km, indexed, count)
+
+        if len(places) >= count or radius_km >= HALF_CIRCUMFERENCE_KM:
+            return places
+
+        radius_km = min(radius_km * 4, HALF_CIRCUMFERENCE_KM)
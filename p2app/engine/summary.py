@@ -0,0 +1,378 @@
+# p2app/engine/summary.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Summary tables holding the number of regions, airports and runways in each
+# continent, country and region, by the type of airport and the runway's surface,
+# updated by triggers as regions, airports and runways are written, so that asking
+# how many airports a country has reads a handful of rows rather than counting
+# them with joins.
+#
+# Each table has a row for each kind of area, area and (for airports and runways)
+# type or surface that has anything in it; a count that reaches zero is removed.
+# What the tables should hold is described by one query for each of them, which
+# fills them, checks them for drift and stands in for them in databases without
+# them.
+
+import sqlite3
+from p2app.events import *
+from .indexes import provision_indexes
+
+
+# Each summary table as (table name, the column its rows are counted by, or None,
+# and the column of the count)
+SUMMARY_TABLES = [
+    ('region_summary', None, 'regions'),
+    ('airport_summary', 'type', 'airports'),
+    ('runway_summary', 'surface', 'runways')
+]
+
+# The kinds of area a region is in, and the column of its id in the region table
+_REGION_AREAS = [
+    (AREA_CONTINENT, 'continent_id'),
+    (AREA_COUNTRY, 'country_id')
+]
+
+# The kinds of area an airport is in, and the expression for its id given an airport
+# row's prefix (the airport table holds a continent's id as text)
+_AIRPORT_AREAS = [
+    (AREA_CONTINENT, 'CAST({}continent_id AS INTEGER)'),
+    (AREA_COUNTRY, '{}country_id'),
+    (AREA_REGION, '{}region_id')
+]
+
+# A runway's surface as it's counted; runways with no surface are counted under ''
+_SURFACE_SQL = "COALESCE({}surface, '')"
+
+# The index the triggers find an airport's runways by
+_RUNWAY_INDEX = 'runway_airport_id_index'
+
+
+def _expected_sql(table: str) -> str:
+    # The query for the rows a summary table should hold, with the table's own columns
+    if table == 'region_summary':
+        selects = [
+            f"SELECT '{area}' AS area, {column} AS area_id, COUNT(*) AS regions FROM region GROUP BY 2"
+            for area, column in _REGION_AREAS]
+    elif table == 'airport_summary':
+        selects = [
+            f"SELECT '{area}' AS area, {expression.format('')} AS area_id, type, COUNT(*) AS airports "
+            f'FROM airport GROUP BY 2, 3'
+            for area, expression in _AIRPORT_AREAS]
+    else:
+        selects = [
+            f"SELECT '{area}' AS area, {expression.format('airport.')} AS area_id, "
+            f"{_SURFACE_SQL.format('runway.')} AS surface, COUNT(*) AS runways "
+            f'FROM runway JOIN airport ON airport.airport_id = runway.airport_id GROUP BY 2, 3'
+            for area, expression in _AIRPORT_AREAS]
+
+    return ' UNION ALL '.join(selects)
+
+
+def summary_provisioned(connection: sqlite3.Connection) -> bool:
+    """Checks whether every summary table exists in the database.
+
+    Args:
+        connection: a connection to the database
+    """
+
+    existing = {name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    return all(table in existing for table, _, _ in SUMMARY_TABLES)
+
+
+def _add_sql(table: str, area: str, area_id: str, key: str | None, count: str) -> str:
+    # The statement adding to the count of a row of a summary table, creating the row
+    # if it's missing
+    _, key_column, count_column = next(summary for summary in SUMMARY_TABLES if summary[0] == table)
+    columns = ['area', 'area_id', key_column, count_column] if key_column else ['area', 'area_id', count_column]
+    values = [f"'{area}'", area_id, key, count] if key_column else [f"'{area}'", area_id, count]
+
+    return (f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join(values)}) '
+            f'ON CONFLICT DO UPDATE SET {count_column} = {count_column} + excluded.{count_column};')
+
+
+def _subtract_sql(table: str, area: str, area_id: str, key: str | None, count: str) -> str:
+    # The statements taking from the count of a row of a summary table, removing the
+    # row if its count reaches zero
+    _, key_column, count_column = next(summary for summary in SUMMARY_TABLES if summary[0] == table)
+    condition = f"area = '{area}' AND area_id = {area_id}"
+
+    if key_column:
+        condition += f' AND {key_column} = {key}'
+
+    return (f'UPDATE {table} SET {count_column} = {count_column} - {count} WHERE {condition};\n'
+            f'DELETE FROM {table} WHERE {condition} AND {count_column} = 0;')
+
+
+def _region_sql(change, prefix: str) -> str:
+    # The statements counting a region in (or out of) its continent and country
+    return '\n'.join(change('region_summary', area, f'{prefix}{column}', None, '1') for area, column in _REGION_AREAS)
+
+
+def _airport_sql(change, prefix: str) -> str:
+    # The statements counting an airport in (or out of) its continent, country and
+    # region
+    return '\n'.join(
+        change('airport_summary', area, expression.format(prefix), f'{prefix}type', '1')
+        for area, expression in _AIRPORT_AREAS)
+
+
+def _airport_runways_sql(sign: str, prefix: str) -> str:
+    # The statements counting every runway of an airport in (or out of) the areas
+    # the airport is in
+    statements = []
+
+    for area, expression in _AIRPORT_AREAS:
+        area_id = expression.format(prefix)
+
+        if sign == '+':
+            # The WHERE clause keeps ON CONFLICT from being read as part of a join
+            statements.append(
+                f"INSERT INTO runway_summary (area, area_id, surface, runways) "
+                f"SELECT '{area}', {area_id}, {_SURFACE_SQL.format('')}, COUNT(*) FROM runway "
+                f'WHERE airport_id = {prefix}airport_id GROUP BY 3 '
+                f'ON CONFLICT DO UPDATE SET runways = runways + excluded.runways;')
+        else:
+            statements.append(_subtract_sql(
+                'runway_summary', area, area_id, 'runway_summary.surface',
+                f'(SELECT COUNT(*) FROM runway WHERE airport_id = {prefix}airport_id '
+                f"AND {_SURFACE_SQL.format('')} = runway_summary.surface)"))
+
+    return '\n'.join(statements)
+
+
+def _runway_sql(sign: str, prefix: str) -> str:
+    # The statements counting a runway in (or out of) the areas its airport is in,
+    # which do nothing if there's no such airport
+    statements = []
+
+    for area, expression in _AIRPORT_AREAS:
+        if sign == '+':
+            statements.append(
+                f"INSERT INTO runway_summary (area, area_id, surface, runways) "
+                f"SELECT '{area}', {expression.format('')}, {_SURFACE_SQL.format(prefix)}, 1 FROM airport "
+                f'WHERE airport_id = {prefix}airport_id '
+                f'ON CONFLICT DO UPDATE SET runways = runways + 1;')
+        else:
+            statements.append(_subtract_sql(
+                'runway_summary', area,
+                f'(SELECT {expression.format("")} FROM airport WHERE airport_id = {prefix}airport_id)',
+                _SURFACE_SQL.format(prefix), '1'))
+
+    return '\n'.join(statements)
+
+
+def _changed(columns: list[str]) -> str:
+    # The WHEN clause of an update trigger that only does anything if one of some
+    # columns changed
+    return ' OR '.join(f'old.{column} IS NOT new.{column}' for column in columns)
+
+
+def _fill_sql() -> str:
+    # The statements filling the summary tables with what they should hold
+    return '\n'.join(f'INSERT INTO {table} {_expected_sql(table)};' for table, _, _ in SUMMARY_TABLES)
+
+
+def provision_summary(connection: sqlite3.Connection) -> bool:
+    """Creates the summary tables, if they don't already exist, along with the
+    triggers that keep them up to date, then fills them. The index of runways by
+    their airport, which the triggers rely on, is created too if it's missing.
+
+    Args:
+        connection: a connection to the database
+
+    Returns:
+        whether the tables were created
+    """
+
+    if summary_provisioned(connection):
+        return False
+
+    provision_indexes(connection, [_RUNWAY_INDEX])
+    area_columns = ['continent_id', 'country_id', 'region_id']
+
+    connection.executescript(f'''
+        CREATE TABLE region_summary (
+            area TEXT NOT NULL,
+            area_id INTEGER NOT NULL,
+            regions INTEGER NOT NULL,
+            PRIMARY KEY (area, area_id)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE airport_summary (
+            area TEXT NOT NULL,
+            area_id INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            airports INTEGER NOT NULL,
+            PRIMARY KEY (area, area_id, type)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE runway_summary (
+            area TEXT NOT NULL,
+            area_id INTEGER NOT NULL,
+            surface TEXT NOT NULL,
+            runways INTEGER NOT NULL,
+            PRIMARY KEY (area, area_id, surface)
+        ) WITHOUT ROWID;
+
+        CREATE TRIGGER region_summary_insert AFTER INSERT ON region BEGIN
+            {_region_sql(_add_sql, 'new.')}
+        END;
+
+        CREATE TRIGGER region_summary_delete AFTER DELETE ON region BEGIN
+            {_region_sql(_subtract_sql, 'old.')}
+        END;
+
+        CREATE TRIGGER region_summary_update AFTER UPDATE OF continent_id, country_id ON region
+        WHEN {_changed(['continent_id', 'country_id'])} BEGIN
+            {_region_sql(_subtract_sql, 'old.')}
+            {_region_sql(_add_sql, 'new.')}
+        END;
+
+        CREATE TRIGGER airport_summary_insert AFTER INSERT ON airport BEGIN
+            {_airport_sql(_add_sql, 'new.')}
+            {_airport_runways_sql('+', 'new.')}
+        END;
+
+        CREATE TRIGGER airport_summary_delete AFTER DELETE ON airport BEGIN
+            {_airport_sql(_subtract_sql, 'old.')}
+            {_airport_runways_sql('-', 'old.')}
+        END;
+
+        CREATE TRIGGER airport_summary_update AFTER UPDATE OF type, continent_id, country_id, region_id ON airport
+        WHEN {_changed(['type', *area_columns])} BEGIN
+            {_airport_sql(_subtract_sql, 'old.')}
+            {_airport_sql(_add_sql, 'new.')}
+        END;
+
+        CREATE TRIGGER airport_summary_move AFTER UPDATE OF continent_id, country_id, region_id ON airport
+        WHEN {_changed(area_columns)} BEGIN
+            {_airport_runways_sql('-', 'old.')}
+            {_airport_runways_sql('+', 'new.')}
+        END;
+
+        CREATE TRIGGER runway_summary_insert AFTER INSERT ON runway BEGIN
+            {_runway_sql('+', 'new.')}
+        END;
+
+        CREATE TRIGGER runway_summary_delete AFTER DELETE ON runway BEGIN
+            {_runway_sql('-', 'old.')}
+        END;
+
+        CREATE TRIGGER runway_summary_update AFTER UPDATE OF airport_id, surface ON runway
+        WHEN {_changed(['airport_id', 'surface'])} BEGIN
+            {_runway_sql('-', 'old.')}
+            {_runway_sql('+', 'new.')}
+        END;
+
+        {_fill_sql()}''')
+
+    return True
+
+
+def drop_summary(connection: sqlite3.Connection) -> bool:
+    """Drops the summary tables, if they exist, along with their triggers.
+
+    Args:
+        connection: a connection to the database
+
+    Returns:
+        whether the tables were dropped
+    """
+
+    if not summary_provisioned(connection):
+        return False
+
+    statements = [
+        f'DROP TRIGGER IF EXISTS {entity}_summary_{change};'
+        for entity in ['region', 'airport', 'runway']
+        for change in ['insert', 'delete', 'update', 'move']]
+    statements.extend(f'DROP TABLE {table};' for table, _, _ in SUMMARY_TABLES)
+
+    connection.executescript('\n'.join(statements))
+
+    return True
+
+
+def rebuild_summary(connection: sqlite3.Connection) -> int:
+    """Checks the summary tables against the rows they summarize and, if any of their
+    rows are wrong, missing or shouldn't be there, fills them again.
+
+    Args:
+        connection: a connection to the database, whose summary tables exist
+
+    Returns:
+        the number of rows that were wrong, missing or shouldn't have been there
+    """
+
+    drifted = 0
+
+    for table, key_column, count_column in SUMMARY_TABLES:
+        expected = _expected_sql(table)
+        key_columns = ', '.join(['area', 'area_id', key_column] if key_column else ['area', 'area_id'])
+
+        # The rows that are wrong or shouldn't be there, then the rows that are missing
+        # (the expected rows are a subquery, since EXCEPT would otherwise only apply to
+        # the first of the queries joined by UNION ALL)
+        drifted += connection.execute(
+            f'SELECT COUNT(*) FROM (SELECT * FROM {table} EXCEPT SELECT * FROM ({expected}))').fetchone()[0]
+        drifted += connection.execute(
+            f'SELECT COUNT(*) FROM (SELECT {key_columns} FROM ({expected}) '
+            f'EXCEPT SELECT {key_columns} FROM {table})').fetchone()[0]
+
+    if drifted > 0:
+        for table, _, _ in SUMMARY_TABLES:
+            connection.execute(f'DELETE FROM {table}')
+            connection.execute(f'INSERT INTO {table} {_expected_sql(table)}')
+
+    return drifted
+
+
+def area_summaries(connection: sqlite3.Connection, area: str, area_id: int | None,
+                   provisioned: bool) -> list[AreaSummary]:
+    """Returns what's in the areas of one kind, or in one area.
+
+    Args:
+        connection: a connection to the database
+        area: the kind of area, one of AREA_CONTINENT, AREA_COUNTRY and AREA_REGION
+        area_id: the id of the area, or None for every area of its kind that has
+        any regions, airports or runways
+        provisioned: whether the summary tables are read, rather than the rows they
+        summarize being counted
+
+    Returns:
+        the summaries, in order of area id (with one for the area asked for, even if
+        there's nothing in it)
+    """
+
+    # The regions, airports by type and runways by surface in each area
+    counts = {}
+
+    if area_id is not None:
+        counts[area_id] = (0, {}, {})
+
+    for table, key_column, count_column in SUMMARY_TABLES:
+        source = table if provisioned else f'({_expected_sql(table)})'
+        sql = f'SELECT area_id, {key_column or "NULL"}, {count_column} FROM {source} WHERE area = ?'
+        parameters = [area]
+
+        if area_id is not None:
+            sql += ' AND area_id = ?'
+            parameters.append(area_id)
+
+        for row_area_id, key, count in connection.execute(sql, parameters):
+            regions, airports_by_type, runways_by_surface = counts.setdefault(row_area_id, (0, {}, {}))
+
+            if table == 'region_summary':
+                counts[row_area_id] = (count, airports_by_type, runways_by_surface)
+            elif table == 'airport_summary':
+                airports_by_type[key] = count
+            else:
+                runways_by_surface[key or None] = count
+
+    return [
+        AreaSummary(
+            area, summary_area_id, None if area == AREA_REGION else regions,
+            sum(airports_by_type.values()), airports_by_type, sum(runways_by_surface.values()), runways_by_surface)
+        for summary_area_id, (regions, airports_by_type, runways_by_surface) in sorted(counts.items())]
@@ -0,0 +1,395 @@
+# p2app/engine/sync.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Brings an airport database up to date with a newer set of OurAirports CSV files,
+# writing only the rows that changed rather than loading everything again.
+#
+# Each file's rows are sorted on the table's natural key (a continent's, country's
+# or region's code, an airport's ident, or the id of a runway, frequency or
+# navigation aid) and merged with the table's rows, read in the same order through
+# an index of the key. Rows only in the file are inserted, rows only in the table
+# are deleted, and rows in both are updated if they differ; inserts and updates
+# are both written with INSERT ... ON CONFLICT DO UPDATE.
+#
+# The navigation aid table doesn't make its ids unique, so they can't be upserted
+# on; instead, the rows with each id are compared as a whole, and if they differ,
+# they're deleted and the file's rows with that id are inserted in their place.
+#
+# A file is sorted in runs of SYNC_RUN_SIZE rows, and the runs other than the last
+# are written to temporary files and merged as they're read back, so that no more
+# than one run of a large file is held in memory; the changes found are held in
+# memory until they're written, though.
+
+import csv
+import heapq
+import itertools
+import os
+import pickle
+import sqlite3
+import tempfile
+from collections import namedtuple
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from p2app.events import *
+from .importer import *
+from .indexes import provision_indexes
+from .ourairports import *
+
+
+# The most rows of a file sorted in memory at once
+SYNC_RUN_SIZE = 100000
+
+
+# How a table is synced: the file it's synced from, the columns that file's rows
+# fill (in order), its natural key column and that column's position in a row,
+# the position of the first column compared (which skips an id that isn't the key,
+# since a row keeps its id when it's updated), a SELECT statement reading the
+# table's rows, shaped like the file's, in order of the key, and whether the table
+# makes the key unique
+SyncTable = namedtuple(
+    'SyncTable', ['source', 'columns', 'key_column', 'key_index', 'compared_from', 'existing_sql', 'unique_key'])
+
+SyncTable.__new__.__defaults__ = (True,)
+
+
+def _source(table: str) -> SourceFile:
+    return next(source for source in SOURCE_FILES if source.table == table)
+
+
+SYNC_TABLES = [
+    SyncTable(
+        CONTINENT_FILE, ['continent_code', 'name'], 'continent_code', 0, 0,
+        'SELECT continent_code, name FROM continent ORDER BY continent_code'),
+    SyncTable(
+        _source('country'),
+        ['country_id', 'country_code', 'name', 'continent_id', 'wikipedia_link', 'keywords'],
+        'country_code', 1, 1,
+        'SELECT country.country_id, country.country_code, country.name, continent.continent_code, '
+        'country.wikipedia_link, country.keywords '
+        'FROM country LEFT JOIN continent ON continent.continent_id = country.continent_id '
+        'ORDER BY country.country_code'),
+    SyncTable(
+        _source('region'),
+        ['region_id', 'region_code', 'local_code', 'name', 'continent_id', 'country_id',
+         'wikipedia_link', 'keywords'],
+        'region_code', 1, 1,
+        'SELECT region.region_id, region.region_code, region.local_code, region.name, '
+        'continent.continent_code, country.country_code, region.wikipedia_link, region.keywords '
+        'FROM region LEFT JOIN continent ON continent.continent_id = region.continent_id '
+        'LEFT JOIN country ON country.country_id = region.country_id '
+        'ORDER BY region.region_code'),
+    SyncTable(
+        _source('airport'),
+        ['airport_id', 'airport_ident', 'type', 'name', 'latitude_deg', 'longitude_deg', 'elevation_ft',
+         'continent_id', 'country_id', 'region_id', 'municipality', 'scheduled_service', 'gps_code',
+         'iata_code', 'local_code', 'home_link', 'wikipedia_link', 'keywords'],
+        'airport_ident', 1, 1,
+        'SELECT airport.airport_id, airport.airport_ident, airport.type, airport.name, '
+        'airport.latitude_deg, airport.longitude_deg, airport.elevation_ft, continent.continent_code, '
+        'country.country_code, region.region_code, airport.municipality, airport.scheduled_service, '
+        'airport.gps_code, airport.iata_code, airport.local_code, airport.home_link, '
+        'airport.wikipedia_link, airport.keywords '
+        'FROM airport LEFT JOIN continent ON continent.continent_id = airport.continent_id '
+        'LEFT JOIN country ON country.country_id = airport.country_id '
+        'LEFT JOIN region ON region.region_id = airport.region_id '
+        'ORDER BY airport.airport_ident'),
+    SyncTable(
+        _source('runway'),
+        ['runway_id', 'airport_id', 'length_ft', 'width_ft', 'surface', 'lighted', 'closed',
+         'le_ident', 'le_latitude_deg', 'le_longitude_deg', 'le_elevation_ft', 'le_heading_deg',
+         'le_displaced_threshold_ft', 'he_ident', 'he_latitude_deg', 'he_longitude_deg',
+         'he_elevation_ft', 'he_heading_deg', 'he_displaced_threshold_ft'],
+        'runway_id', 0, 0,
+        'SELECT runway_id, airport_id, length_ft, width_ft, surface, lighted, closed, '
+        'le_ident, le_latitude_deg, le_longitude_deg, le_elevation_ft, le_heading_deg, '
+        'le_displaced_threshold_ft, he_ident, he_latitude_deg, he_longitude_deg, he_elevation_ft, '
+        'he_heading_deg, he_displaced_threshold_ft FROM runway ORDER BY runway_id'),
+    SyncTable(
+        _source('airport_frequency'),
+        ['airport_frequency_id', 'airport_id', 'type', 'description', 'frequency_mhz'],
+        'airport_frequency_id', 0, 0,
+        'SELECT airport_frequency_id, airport_id, type, description, frequency_mhz '
+        'FROM airport_frequency ORDER BY airport_frequency_id'),
+
+    # A navigation aid's airport is read back as its ident, as the file has it, which
+    # for a navigation aid without one is empty rather than NULL
+    SyncTable(
+        _source('navigation_aid'),
+        ['navigation_aid_id', 'filename', 'ident', 'name', 'type', 'frequency_khz', 'latitude_deg',
+         'longitude_deg', 'elevation_ft', 'iso_country', 'dme_frequency_khz', 'dme_channel',
+         'dme_latitude_deg', 'dme_longitude_deg', 'dme_elevation_ft', 'adjusted_variation_deg',
+         'magnetic_variation_deg', 'usage_type', 'power', 'airport_id'],
+        'navigation_aid_id', 0, 0,
+        'SELECT navigation_aid.navigation_aid_id, navigation_aid.filename, navigation_aid.ident, '
+        'navigation_aid.name, navigation_aid.type, navigation_aid.frequency_khz, navigation_aid.latitude_deg, '
+        'navigation_aid.longitude_deg, navigation_aid.elevation_ft, navigation_aid.iso_country, '
+        'navigation_aid.dme_frequency_khz, navigation_aid.dme_channel, navigation_aid.dme_latitude_deg, '
+        'navigation_aid.dme_longitude_deg, navigation_aid.dme_elevation_ft, '
+        'navigation_aid.adjusted_variation_deg, navigation_aid.magnetic_variation_deg, '
+        'navigation_aid.usage_type, navigation_aid.power, COALESCE(airport.airport_ident, \'\') '
+        'FROM navigation_aid LEFT JOIN airport ON airport.airport_id = navigation_aid.airport_id '
+        'ORDER BY navigation_aid.navigation_aid_id',
+        False)
+]
+
+# The indexes the tables without a unique key are read in order of, and have their
+# rows deleted by
+_KEY_INDEXES = ['navigation_aid_id_index']
+
+
+def upsert_sql(table: SyncTable) -> str:
+    """Returns the statement that inserts a row of a table, or updates the row with the
+    same key if there is one, leaving its id as it was.
+
+    Args:
+        table: how the table is synced
+    """
+
+    updated = [column for column in table.columns[table.compared_from:] if column != table.key_column]
+    assignments = ', '.join(f'{column} = excluded.{column}' for column in updated)
+    return f'{table.source.insert_sql} ON CONFLICT ({table.key_column}) DO UPDATE SET {assignments}'
+
+
+def merge_changes(new_rows, existing_rows, key_index: int, compared_from: int):
+    """A generator function that merges two sequences of rows, both sorted on their
+    key, yielding the changes that turn the existing rows into the new ones.
+
+    Args:
+        new_rows: the new rows
+        existing_rows: the existing rows
+        key_index: the position of the key in a row
+        compared_from: the position of the first column compared
+
+    Yields:
+        ('insert', new row), ('update', new row) or ('delete', existing key)
+    """
+
+    new_iterator = iter(new_rows)
+    existing_iterator = iter(existing_rows)
+    new = next(new_iterator, None)
+    existing = next(existing_iterator, None)
+
+    while new is not None and existing is not None:
+        if new[key_index] < existing[key_index]:
+            yield 'insert', new
+            new = next(new_iterator, None)
+        elif new[key_index] > existing[key_index]:
+            yield 'delete', existing[key_index]
+            existing = next(existing_iterator, None)
+        else:
+            if tuple(new[compared_from:]) != tuple(existing[compared_from:]):
+                yield 'update', new
+
+            new = next(new_iterator, None)
+            existing = next(existing_iterator, None)
+
+    while new is not None:
+        yield 'insert', new
+        new = next(new_iterator, None)
+
+    while existing is not None:
+        yield 'delete', existing[key_index]
+        existing = next(existing_iterator, None)
+
+
+def merge_groups(new_rows, existing_rows, key_index: int):
+    """A generator function that merges two sequences of rows, both sorted on a key
+    that may not be unique, yielding the changes that turn the existing rows into
+    the new ones. The rows with each key are compared as a whole.
+
+    Args:
+        new_rows: the new rows
+        existing_rows: the existing rows
+        key_index: the position of the key in a row
+
+    Yields:
+        ('insert', new row), ('replace', key) followed by ('update', new row) for
+        each new row with the key, or ('delete', existing key)
+    """
+
+    for change, group in merge_changes(_grouped(new_rows, key_index), _grouped(existing_rows, key_index), 0, 1):
+        if change == 'delete':
+            yield change, group
+        else:
+            if change == 'update':
+                yield 'replace', group[0]
+
+            for row in group[1]:
+                yield change, row
+
+
+def _grouped(rows, key_index):
+    # The rows with each key, as (key, rows), the rows in an order that's the same
+    # however they were read, so that two groups can be compared
+    for key, group in itertools.groupby(rows, lambda row: row[key_index]):
+        yield key, tuple(sorted((tuple(row) for row in group), key = repr))
+
+
+def sync_ourairports(connection: sqlite3.Connection, directory: Path, workers: int | None = None):
+    """A generator function that brings a database up to date with the data in a
+    directory of OurAirports CSV files, writing only the rows that changed.
+
+    As when importing, a row that can't be written (because it's malformed, breaks a
+    constraint or refers to a missing row) is left out and counted rather than
+    stopping the sync, as is a deleted row that's still referred to; anything else
+    that goes wrong leaves the database as it was.
+
+    Args:
+        connection: a connection to the database, with no uncommitted changes
+        directory: the directory containing the CSV files
+        workers: the number of worker processes that parse the large files, or None
+        for one per CPU
+
+    Yields:
+        ImportProgressEvent after each table's changes are written
+        DataSyncedEvent with the number of rows of each table that changed, or
+        SyncFailedEvent if the sync couldn't be done
+    """
+
+    missing = missing_files(directory)
+
+    if missing:
+        yield SyncFailedEvent(f'Missing {", ".join(missing)} in {directory}')
+        return
+
+    workers = workers or os.cpu_count() or 1
+    executor = parsing_executor(workers)
+
+    try:
+        connection.execute('BEGIN')
+        provision_indexes(connection, _KEY_INDEXES)
+
+        changes = {}
+        rejected = {}
+        deletes = {}
+
+        for table in SYNC_TABLES:
+            new_rows, new_count, malformed = _read_sorted(directory, table, executor, workers)
+            inserts = []
+            updates = []
+            deletes[table.source.table] = []
+
+            # The changes are gathered before any are written, so that the table isn't
+            # written while it's being read
+            existing_rows = connection.execute(table.existing_sql)
+
+            if table.unique_key:
+                found = merge_changes(new_rows, existing_rows, table.key_index, table.compared_from)
+            else:
+                found = merge_groups(new_rows, existing_rows, table.key_index)
+
+            replaced = []
+
+            for change, row in found:
+                if change == 'insert':
+                    inserts.append(row)
+                elif change == 'update':
+                    updates.append(row)
+                elif change == 'replace':
+                    replaced.append((row,))
+                else:
+                    deletes[table.source.table].append(row)
+
+            if table.unique_key:
+                sql = upsert_sql(table)
+            else:
+                sql = table.source.insert_sql
+                _write(connection, _delete_sql(table), replaced)
+
+            rejected_inserts = _write(connection, sql, inserts)
+            rejected_updates = _write(connection, sql, updates)
+
+            changes[table.source.table] = TableChanges(
+                len(inserts) - rejected_inserts, len(updates) - rejected_updates, 0)
+            rejected[table.source.table] = malformed + rejected_inserts + rejected_updates
+            yield ImportProgressEvent(table.source.table, new_count)
+
+        # Children are deleted before the parents they refer to, and a row that's still
+        # referred to (by a child the files haven't deleted) isn't deleted at all
+        for table in reversed(SYNC_TABLES):
+            name = table.source.table
+            keys = [(key,) for key in deletes[name]]
+            rejected_deletes = _write(connection, _delete_sql(table), keys)
+
+            changes[name] = changes[name]._replace(deleted = len(keys) - rejected_deletes)
+            rejected[name] += rejected_deletes
+
+        connection.commit()
+    except (OSError, UnicodeError, csv.Error, sqlite3.Error, BrokenProcessPool) as e:
+        connection.rollback()
+        yield SyncFailedEvent(f'Sync failed: {e}')
+    else:
+        yield DataSyncedEvent(changes, rejected)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures = True)
+
+
+def _read_sorted(directory, table, executor, workers):
+    # Returns an iterator of the rows of a table's file in order of the key, the
+    # number of them, and the number that were malformed
+    if table.source is CONTINENT_FILE and not (directory / CONTINENT_FILE.file_name).is_file():
+        return iter(sorted(CONTINENTS)), len(CONTINENTS), 0
+
+    key = lambda row: row[table.key_index]
+    runs = []
+    run = []
+    count = 0
+    malformed = 0
+
+    for chunk, chunk_malformed in read_chunks(directory / table.source.file_name, table.source.convert,
+                                              executor, workers):
+        run.extend(chunk)
+        count += len(chunk)
+        malformed += chunk_malformed
+
+        if len(run) >= SYNC_RUN_SIZE:
+            run.sort(key = key)
+            runs.append(_spilled_run(run))
+            run = []
+
+    run.sort(key = key)
+
+    if not runs:
+        return iter(run), count, malformed
+
+    runs.append(run)
+    return heapq.merge(*runs, key = key), count, malformed
+
+
+def _spilled_run(rows):
+    # Writes a sorted run of rows to a temporary file, which is deleted when it's
+    # closed, and returns a generator reading them back a chunk at a time
+    file = tempfile.TemporaryFile()
+
+    for start in range(0, len(rows), IMPORT_CHUNK_SIZE):
+        pickle.dump(rows[start:start + IMPORT_CHUNK_SIZE], file)
+
+    file.seek(0)
+    return _read_run(file)
+
+
+def _read_run(file):
+    with file:
+        while True:
+            try:
+                chunk = pickle.load(file)
+            except EOFError:
+                return
+
+            yield from chunk
+
+
+def _delete_sql(table):
+    return f'DELETE FROM {table.source.table} WHERE {table.key_column} = ?'
+
+
+def _write(connection, sql, rows):
+    rejected = 0
+
+    for start in range(0, len(rows), IMPORT_CHUNK_SIZE):
+        rejected += write_chunk(connection, sql, rows[start:start + IMPORT_CHUNK_SIZE])
+
+    return rejected
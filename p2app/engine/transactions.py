@@ -0,0 +1,108 @@
+# p2app/engine/transactions.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Decides when the engine's writes are committed, so that events that only read
+# never commit at all, and several saves made in quick succession share one
+# commit (and so one fsync) rather than paying for one each.
+
+import sqlite3
+import time
+
+
+class TransactionManager:
+    """Groups the writes made while processing events into as few commits as
+    possible, within a bound on how many writes, and for how long, they may be left
+    uncommitted.
+
+    A write is noticed by the connection being left in a transaction after an event
+    is processed, since sqlite3 begins one before the first INSERT, UPDATE or
+    DELETE and never for a SELECT.
+
+    Nothing is committed on a timer, since a sqlite3 connection can only be used on
+    the thread that opened it, so the delay is only enforced when the engine is
+    next asked to process an event or for its idle events. An EngineWorker asks for
+    its idle events whenever it has waited a moment for an event, so the delay holds
+    there; an engine whose events are processed directly on the user interface's
+    thread leaves its last writes uncommitted until another event arrives (or until
+    the database is closed), unless idle_events is called from a timer on that
+    thread.
+
+    Attributes:
+        max_pending_writes: the most events whose writes are left uncommitted; 1
+        commits after every event that writes
+        max_delay_seconds: the longest the first uncommitted write is left
+        uncommitted, provided the engine is asked for its idle events
+        commits: the number of commits made
+    """
+
+    def __init__(self, max_pending_writes: int = 32, max_delay_seconds: float = 0.5):
+        """Initializes the manager, with no writes pending.
+
+        Args:
+            max_pending_writes: the most events whose writes are left uncommitted
+            max_delay_seconds: the longest a write is left uncommitted
+        """
+
+        self.max_pending_writes = max_pending_writes
+        self.max_delay_seconds = max_delay_seconds
+        self.commits = 0
+        self._pending_writes = 0
+        self._first_write_time = None
+
+
+    def has_pending_writes(self) -> bool:
+        """Checks whether there are writes that haven't been committed."""
+
+        return self._pending_writes > 0
+
+
+    def event_processed(self, connection: sqlite3.Connection | None):
+        """Notes that an event has been processed, committing if the event wrote to
+        the database and the pending writes have reached either bound.
+
+        Args:
+            connection: the engine's connection, or None if no database is open
+        """
+
+        if connection is None or not connection.in_transaction:
+            return
+
+        if self._pending_writes == 0:
+            self._first_write_time = time.monotonic()
+
+        self._pending_writes += 1
+
+        if self._pending_writes >= self.max_pending_writes or self._is_overdue():
+            self.flush(connection)
+
+
+    def flush_if_overdue(self, connection: sqlite3.Connection | None):
+        """Commits the pending writes if the first of them has waited too long.
+
+        Args:
+            connection: the engine's connection, or None if no database is open
+        """
+
+        if self._pending_writes > 0 and self._is_overdue():
+            self.flush(connection)
+
+
+    def flush(self, connection: sqlite3.Connection | None):
+        """Commits the pending writes, if there are any.
+
+        Args:
+            connection: the engine's connection, or None if no database is open
+        """
+
+        if connection is not None and connection.in_transaction:
+            connection.commit()
+            self.commits += 1
+
+        self._pending_writes = 0
+        self._first_write_time = None
+
+
+    def _is_overdue(self) -> bool:
+        return time.monotonic() - self._first_write_time >= self.max_delay_seconds
@@ -0,0 +1,289 @@
+# p2app/engine/validation.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Checks that a file is an airport database when it is opened, without reading
+# every page of it each time.
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+
+# Checks the header and schema, then runs PRAGMA quick_check only on files that
+# aren't already known to be good
+VALIDATION_QUICK = 'quick'
+
+# Checks the header and schema, then runs PRAGMA integrity_check on a separate
+# connection in the background, on files that aren't already known to be good
+VALIDATION_BACKGROUND = 'background'
+
+# Checks the header and schema, then always runs PRAGMA integrity_check
+VALIDATION_FULL = 'full'
+
+
+# Where the application remembers the databases that passed a check between runs
+DEFAULT_KNOWN_GOOD_PATH = Path.home() / '.p2app' / 'known_good.json'
+
+
+_SQLITE_HEADER = b'SQLite format 3\x00'
+
+
+# The tables (and their columns) that every airport database must have
+AIRPORT_SCHEMA = {
+    'continent': ('continent_id', 'continent_code', 'name'),
+    'country': ('country_id', 'country_code', 'name', 'continent_id', 'wikipedia_link', 'keywords'),
+    'region': ('region_id', 'region_code', 'local_code', 'name', 'continent_id', 'country_id',
+               'wikipedia_link', 'keywords'),
+    'airport': ('airport_id', 'airport_ident', 'type', 'name', 'latitude_deg', 'longitude_deg',
+                'elevation_ft', 'continent_id', 'country_id', 'region_id', 'municipality',
+                'scheduled_service', 'gps_code', 'iata_code', 'local_code', 'home_link',
+                'wikipedia_link', 'keywords'),
+    'airport_frequency': ('airport_frequency_id', 'airport_id', 'type', 'description', 'frequency_mhz'),
+    'runway': ('runway_id', 'airport_id', 'length_ft', 'width_ft', 'surface', 'lighted', 'closed',
+               'le_ident', 'le_latitude_deg', 'le_longitude_deg', 'le_elevation_ft', 'le_heading_deg',
+               'le_displaced_threshold_ft', 'he_ident', 'he_latitude_deg', 'he_longitude_deg',
+               'he_elevation_ft', 'he_heading_deg', 'he_displaced_threshold_ft'),
+    'navigation_aid': ('navigation_aid_id', 'filename', 'ident', 'name', 'type', 'frequency_khz',
+                       'latitude_deg', 'longitude_deg', 'elevation_ft', 'iso_country',
+                       'dme_frequency_khz', 'dme_channel', 'dme_latitude_deg', 'dme_longitude_deg',
+                       'dme_elevation_ft', 'adjusted_variation_deg', 'magnetic_variation_deg',
+                       'usage_type', 'power', 'airport_id')
+}
+
+
+def has_sqlite_header(path: Path) -> bool:
+    """Checks whether a file starts with the SQLite header, reading only its first bytes.
+
+    Args:
+        path: the path to the file
+
+    Returns:
+        True if the file has the header, or is missing or empty (in which case
+        SQLite treats it as a new, empty database)
+    """
+
+    try:
+        with open(path, 'rb') as file:
+            header = file.read(len(_SQLITE_HEADER))
+    except FileNotFoundError:
+        return True
+    except OSError:
+        return False
+
+    return len(header) == 0 or header == _SQLITE_HEADER
+
+
+def schema_version(connection: sqlite3.Connection) -> int:
+    """Returns the schema version of the database, which SQLite changes every time the
+    schema does. Reading it raises sqlite3.DatabaseError if the file isn't a database.
+
+    Args:
+        connection: a connection to the database
+    """
+
+    return connection.execute('PRAGMA schema_version').fetchone()[0]
+
+
+def has_airport_schema(connection: sqlite3.Connection) -> bool:
+    """Checks sqlite_master for every table and column of an airport database.
+
+    Args:
+        connection: a connection to the database
+
+    Returns:
+        True if every table and column is present
+    """
+
+    tables = {name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+
+    for table, columns in AIRPORT_SCHEMA.items():
+        if table not in tables:
+            return False
+
+        table_columns = {row[1] for row in connection.execute(f'PRAGMA table_info({table})')}
+
+        if not table_columns.issuperset(columns):
+            return False
+
+    return True
+
+
+def passes_check(connection: sqlite3.Connection, pragma: str) -> bool:
+    """Runs PRAGMA quick_check or PRAGMA integrity_check.
+
+    Args:
+        connection: a connection to the database
+        pragma: either 'quick_check' or 'integrity_check'
+
+    Returns:
+        True if the database passed the check
+    """
+
+    try:
+        return connection.execute(f'PRAGMA {pragma}(1)').fetchone() == ('ok',)
+    except sqlite3.DatabaseError:
+        return False
+
+
+class KnownGoodMarkers:
+    """Remembers which database files have already passed a check, keyed on their size,
+    modification time and schema version, so that unchanged files aren't checked again.
+
+    Attributes:
+        path: the JSON file the markers are kept in between runs, or None to only
+        keep them in memory
+    """
+
+    def __init__(self, path: Path | None = None):
+        """Initializes the markers, loading any that were saved previously.
+
+        Args:
+            path: the JSON file the markers are kept in, or None
+        """
+
+        self.path = path
+        self._markers = {}
+        self._lock = threading.Lock()
+
+        if path is not None:
+            try:
+                with open(path) as file:
+                    self._markers = json.load(file)
+            except (OSError, ValueError):
+                self._markers = {}
+
+
+    def is_known_good(self, database_path: Path, version: int) -> bool:
+        """Checks whether the database file, exactly as it is now, has passed a check.
+
+        Args:
+            database_path: the path to the database file
+            version: the database's current schema version
+        """
+
+        key, marker = self._marker_for(database_path, version)
+
+        with self._lock:
+            return key is not None and self._markers.get(key) == marker
+
+
+    def snapshot(self, database_path: Path, version: int) -> list | None:
+        """Returns the size, modification time and schema version of the database
+        file as it is now, or None if it can't be read.
+
+        Args:
+            database_path: the path to the database file
+            version: the database's current schema version
+        """
+
+        return self._marker_for(database_path, version)[1]
+
+
+    def mark_known_good(self, database_path: Path, version: int, unchanged_since: list | None = None):
+        """Records that the database file, exactly as it is now, is known to be good.
+
+        Args:
+            database_path: the path to the database file
+            version: the database's current schema version
+            unchanged_since: a snapshot taken when the check began, or None; if the
+            file has changed since it was taken, the check may not have covered
+            what's in it now, so nothing is recorded
+        """
+
+        key, marker = self._marker_for(database_path, version)
+
+        if key is None or (unchanged_since is not None and marker != unchanged_since):
+            return
+
+        with self._lock:
+            self._markers[key] = marker
+            self._save()
+
+
+    def forget(self, database_path: Path):
+        """Removes any marker recorded for the database file.
+
+        Args:
+            database_path: the path to the database file
+        """
+
+        with self._lock:
+            if self._markers.pop(str(Path(database_path).resolve()), None) is not None:
+                self._save()
+
+
+    @staticmethod
+    def _marker_for(database_path: Path, version: int) -> tuple[str | None, list | None]:
+        try:
+            resolved = Path(database_path).resolve()
+            stat = resolved.stat()
+        except OSError:
+            return None, None
+
+        return str(resolved), [stat.st_size, stat.st_mtime_ns, version]
+
+
+    def _save(self):
+        if self.path is None:
+            return
+
+        try:
+            Path(self.path).parent.mkdir(parents = True, exist_ok = True)
+
+            with open(self.path, 'w') as file:
+                json.dump(self._markers, file)
+        except OSError:
+            pass
+
+
+class BackgroundIntegrityCheck:
+    """Runs PRAGMA integrity_check on its own read-only connection, on a background
+    thread, so that opening a database doesn't wait for every page to be read.
+    """
+
+    def __init__(self, database_path: Path, on_passed):
+        """Starts the check.
+
+        Args:
+            database_path: the path to the database file
+            on_passed: called with no arguments, on the background thread, if the
+            database passes the check
+        """
+
+        self._database_path = database_path
+        self._on_passed = on_passed
+        self._passed = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(target = self._run, name = 'p2app-integrity-check', daemon = True)
+        self._thread.start()
+
+
+    def is_done(self) -> bool:
+        return self._done.is_set()
+
+
+    def passed(self) -> bool | None:
+        """Returns whether the database passed the check, or None if it's still running."""
+
+        return self._passed if self._done.is_set() else None
+
+
+    def _run(self):
+        try:
+            uri = Path(self._database_path).resolve().as_uri() + '?mode=ro'
+            connection = sqlite3.connect(uri, uri = True)
+
+            try:
+                self._passed = passes_check(connection, 'integrity_check')
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            self._passed = False
+
+        if self._passed:
+            self._on_passed()
+
+        self._done.set()
@@ -0,0 +1,121 @@
+# p2app/engine/worker.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Runs the engine on a dedicated background thread, so that slow queries
+# never block the Tk mainloop.
+
+import queue
+import threading
+from p2app.events import ErrorEvent
+
+
+# Sentinel placed on the request queue to ask the worker thread to exit
+_STOP = object()
+
+# How long the worker thread waits for an event before asking the engine for
+# any events that became ready in the meantime
+_IDLE_INTERVAL_SECONDS = 0.25
+
+
+class EngineWorker:
+    """Owns an engine and processes the events sent to it on a background thread.
+
+    Events are placed on a request queue by submit(), processed one at a time on
+    the worker thread (which therefore owns the engine's sqlite3 connection), and
+    every event the engine yields in response is placed on a result queue, which
+    the user interface drains from its own thread using completed_events().
+
+    Attributes:
+        engine: the engine whose process_event method is run on the worker thread
+    """
+
+    def __init__(self, engine):
+        """Initializes the worker, without starting its thread.
+
+        Args:
+            engine: the engine that will process the submitted events
+        """
+
+        self.engine = engine
+        self._requests = queue.SimpleQueue()
+        self._results = queue.SimpleQueue()
+        self._thread = None
+
+
+    def start(self):
+        """Starts the worker thread, if it is not already running."""
+
+        if self._thread is None:
+            self._thread = threading.Thread(target = self._run, name = 'p2app-engine', daemon = True)
+            self._thread.start()
+
+
+    def stop(self):
+        """Asks the worker thread to exit once the events already submitted are
+        processed, then waits for it to do so."""
+
+        if self._thread is not None:
+            self._requests.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+
+    def submit(self, event):
+        """Queues an event to be processed by the engine on the worker thread.
+
+        Args:
+            event: an event sent from the user interface
+        """
+
+        # Events that stop the one being processed can't wait in the queue behind it
+        self.engine.interrupt(event)
+        self._requests.put(event)
+
+
+    def completed_events(self, limit: int | None = None):
+        """A generator function that yields the events generated by the engine so
+        far, without ever waiting for more.
+
+        Args:
+            limit: the maximum number of events to yield, or None for no limit
+        """
+
+        count = 0
+
+        while limit is None or count < limit:
+            try:
+                yield self._results.get_nowait()
+            except queue.Empty:
+                return
+
+            count += 1
+
+
+    def _run(self):
+        """Processes submitted events until asked to stop."""
+
+        while True:
+            try:
+                event = self._requests.get(timeout = _IDLE_INTERVAL_SECONDS)
+            except queue.Empty:
+                self._put_results(self.engine.idle_events())
+                continue
+
+            if event is _STOP:
+                # Writes still waiting for a group commit would otherwise be lost
+                # when the connection is closed without one
+                self.engine.commit_changes()
+                return
+
+            self._put_results(self.engine.process_event(event))
+
+
+    def _put_results(self, result_events):
+        try:
+            for result_event in result_events:
+                self._results.put(result_event)
+        except Exception as e:
+            # An exception here would otherwise silently end the worker thread
+            self._results.put(ErrorEvent(f'{type(e).__name__}: {e}'))
@@ -8,8 +8,16 @@
 # YOU WILL NOT NEED TO MODIFY THIS FILE AT ALL
 
 from .event_bus import EventBus
+from .airports import *
 from .app import *
+from .batches import *
+from .capability import *
 from .continents import *
 from .countries import *
 from .database import *
+from .exporting import *
+from .importing import *
 from .regions import *
+from .search import *
+from .spatial import *
+from .summary import *
@@ -0,0 +1,274 @@
+# p2app/events/airports.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Events that are either related to searching for, creating, or editing airports
+# in the database.
+
+from collections import namedtuple
+from .batches import BatchSaveFailure
+
+
+
+Airport = namedtuple(
+    'Airport',
+    ['airport_id', 'airport_ident', 'type', 'name', 'latitude_deg', 'longitude_deg', 'elevation_ft',
+     'continent_id', 'country_id', 'region_id', 'municipality', 'scheduled_service', 'gps_code',
+     'iata_code', 'local_code', 'home_link', 'wikipedia_link', 'keywords'])
+
+Airport.__annotations__ = {
+    'airport_id': int | None,
+    'airport_ident': str | None,
+    'type': str | None,
+    'name': str | None,
+    'latitude_deg': float | None,
+    'longitude_deg': float | None,
+    'elevation_ft': int | None,
+    'continent_id': str | None,
+    'country_id': int | None,
+    'region_id': int | None,
+    'municipality': str | None,
+    'scheduled_service': int | None,
+    'gps_code': str | None,
+    'iata_code': str | None,
+    'local_code': str | None,
+    'home_link': str | None,
+    'wikipedia_link': str | None,
+    'keywords': str | None
+}
+
+
+
+# The kinds of code an airport can be known by, in the order a code is matched
+# against them
+CODE_IDENT = 'ident'
+CODE_IATA = 'iata'
+CODE_GPS = 'gps'
+CODE_LOCAL = 'local'
+
+
+
+# An airport that a code was resolved to, and the kinds of its codes that matched
+AirportCodeMatch = namedtuple('AirportCodeMatch', ['airport_id', 'code_kinds'])
+
+AirportCodeMatch.__annotations__ = {
+    'airport_id': int,
+    'code_kinds': tuple[str, ...]
+}
+
+
+
+class StartAirportSearchEvent:
+    def __init__(self, airport_ident: str, iata_code: str, gps_code: str, local_code: str, name: str):
+        self._airport_ident = airport_ident
+        self._iata_code = iata_code
+        self._gps_code = gps_code
+        self._local_code = local_code
+        self._name = name
+
+
+    def airport_ident(self) -> str:
+        return self._airport_ident
+
+
+    def iata_code(self) -> str:
+        return self._iata_code
+
+
+    def gps_code(self) -> str:
+        return self._gps_code
+
+
+    def local_code(self) -> str:
+        return self._local_code
+
+
+    def name(self) -> str:
+        return self._name
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: airport_ident = {repr(self._airport_ident)}, ' + \
+               f'iata_code = {repr(self._iata_code)}, gps_code = {repr(self._gps_code)}, ' + \
+               f'local_code = {repr(self._local_code)}, name = {repr(self._name)}'
+
+
+
+class AirportSearchResultEvent:
+    def __init__(self, airport: Airport):
+        self._airport = airport
+
+
+    def airport(self) -> Airport:
+        return self._airport
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: airport = {repr(self._airport)}'
+
+
+
+class AirportSearchResultsBatchEvent:
+    def __init__(self, airports: tuple[Airport, ...]):
+        self._airports = airports
+
+
+    def airports(self) -> tuple[Airport, ...]:
+        return self._airports
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: airports = {repr(self._airports)}'
+
+
+
+class LoadAirportEvent:
+    def __init__(self, airport_id: int):
+        self._airport_id = airport_id
+
+
+    def airport_id(self) -> int:
+        return self._airport_id
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: airport_id = {repr(self._airport_id)}'
+
+
+
+class AirportLoadedEvent:
+    def __init__(self, airport: Airport):
+        self._airport = airport
+
+
+    def airport(self) -> Airport:
+        return self._airport
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: airport = {repr(self._airport)}'
+
+
+
+class SaveNewAirportEvent:
+    def __init__(self, airport: Airport):
+        self._airport = airport
+
+
+    def airport(self) -> Airport:
+        return self._airport
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: airport = {repr(self._airport)}'
+
+
+
+class SaveAirportEvent:
+    def __init__(self, airport: Airport):
+        self._airport = airport
+
+
+    def airport(self) -> Airport:
+        return self._airport
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: airport = {repr(self._airport)}'
+
+
+
+class AirportSavedEvent:
+    def __init__(self, airport: Airport):
+        self._airport = airport
+
+
+    def airport(self) -> Airport:
+        return self._airport
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: airport = {repr(self._airport)}'
+
+
+
+class SaveAirportFailedEvent:
+    def __init__(self, reason: str):
+        self._reason = reason
+
+
+    def reason(self) -> str:
+        return self._reason
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: reason = {repr(self._reason)}'
+
+
+
+class SaveAirportsBatchEvent:
+    def __init__(self, airports: tuple[Airport, ...]):
+        self._airports = airports
+
+
+    def airports(self) -> tuple[Airport, ...]:
+        return self._airports
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: airports = {repr(self._airports)}'
+
+
+
+class AirportsBatchSavedEvent:
+    def __init__(self, saved: tuple[Airport, ...], failures: tuple[BatchSaveFailure, ...]):
+        self._saved = saved
+        self._failures = failures
+
+
+    def saved(self) -> tuple[Airport, ...]:
+        return self._saved
+
+
+    def failures(self) -> tuple[BatchSaveFailure, ...]:
+        return self._failures
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: saved = {repr(self._saved)}, ' + \
+               f'failures = {repr(self._failures)}'
+
+
+
+class ResolveAirportCodeEvent:
+    def __init__(self, code: str):
+        self._code = code
+
+
+    def code(self) -> str:
+        return self._code
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: code = {repr(self._code)}'
+
+
+
+class AirportCodeResolvedEvent:
+    def __init__(self, code: str, matches: tuple[AirportCodeMatch, ...]):
+        self._code = code
+        self._matches = matches
+
+
+    def code(self) -> str:
+        return self._code
+
+
+    def matches(self) -> tuple[AirportCodeMatch, ...]:
+        return self._matches
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: code = {repr(self._code)}, ' + \
+               f'matches = {repr(self._matches)}'
@@ -0,0 +1,21 @@
+# p2app/events/batches.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Events that are related to saving many records at once, regardless of which
+# kind of entity they are.
+
+from collections import namedtuple
+
+
+
+# A record in a batch that couldn't be saved: its position in the batch, the
+# record itself, and why it couldn't be saved
+BatchSaveFailure = namedtuple('BatchSaveFailure', ['index', 'record', 'reason'])
+
+BatchSaveFailure.__annotations__ = {
+    'index': int,
+    'record': tuple,
+    'reason': str
+}
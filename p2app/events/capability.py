@@ -0,0 +1,164 @@
+# p2app/events/capability.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Events related to finding airports by what their runways can take: how long and
+# wide they are, what they're surfaced with and whether they're lighted.
+#
+# Only open runways count. Each runway's surface is put in one of a few classes,
+# since the surfaces in the runway table are free text ('ASP', 'ASPH-G', 'TURF',
+# and so on).
+
+from collections import namedtuple
+
+
+
+# The classes a runway's surface is put in
+SURFACE_PAVED = 'paved'
+SURFACE_UNPAVED = 'unpaved'
+SURFACE_WATER = 'water'
+SURFACE_UNKNOWN = 'unknown'
+
+SURFACE_CLASSES = (SURFACE_PAVED, SURFACE_UNPAVED, SURFACE_WATER, SURFACE_UNKNOWN)
+
+
+
+# What an airport's open runways can take: the longest and widest of them (None if
+# none of their lengths or widths are known), whether any of them is lighted, and
+# the classes of their surfaces
+RunwayCapability = namedtuple(
+    'RunwayCapability', ['airport_id', 'max_length_ft', 'max_width_ft', 'lighted', 'surface_classes'])
+
+RunwayCapability.__annotations__ = {
+    'airport_id': int,
+    'max_length_ft': int | None,
+    'max_width_ft': int | None,
+    'lighted': bool,
+    'surface_classes': tuple[str, ...]
+}
+
+
+
+# An airport found by what its runways can take, with the length and width of the
+# longest and widest of its open runways of the surface classes and lighting that
+# matched
+CapableAirport = namedtuple(
+    'CapableAirport',
+    ['airport_id', 'airport_ident', 'name', 'country_id', 'region_id', 'max_length_ft', 'max_width_ft'])
+
+CapableAirport.__annotations__ = {
+    'airport_id': int,
+    'airport_ident': str,
+    'name': str,
+    'country_id': int,
+    'region_id': int,
+    'max_length_ft': int | None,
+    'max_width_ft': int | None
+}
+
+
+
+class StartCapabilitySearchEvent:
+    def __init__(self, min_length_ft: int | None = None, min_width_ft: int | None = None,
+                 surface_classes: tuple[str, ...] | None = None, lighted: bool = False,
+                 country_id: int | None = None, region_id: int | None = None, limit: int | None = None):
+        self._min_length_ft = min_length_ft
+        self._min_width_ft = min_width_ft
+        self._surface_classes = surface_classes
+        self._lighted = lighted
+        self._country_id = country_id
+        self._region_id = region_id
+        self._limit = limit
+
+
+    def min_length_ft(self) -> int | None:
+        return self._min_length_ft
+
+
+    def min_width_ft(self) -> int | None:
+        return self._min_width_ft
+
+
+    def surface_classes(self) -> tuple[str, ...] | None:
+        return self._surface_classes
+
+
+    def lighted(self) -> bool:
+        return self._lighted
+
+
+    def country_id(self) -> int | None:
+        return self._country_id
+
+
+    def region_id(self) -> int | None:
+        return self._region_id
+
+
+    def limit(self) -> int | None:
+        return self._limit
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: min_length_ft = {repr(self._min_length_ft)}, ' + \
+               f'min_width_ft = {repr(self._min_width_ft)}, ' + \
+               f'surface_classes = {repr(self._surface_classes)}, lighted = {repr(self._lighted)}, ' + \
+               f'country_id = {repr(self._country_id)}, region_id = {repr(self._region_id)}, ' + \
+               f'limit = {repr(self._limit)}'
+
+
+
+class CapableAirportsFoundEvent:
+    def __init__(self, airports: tuple[CapableAirport, ...]):
+        self._airports = airports
+
+
+    def airports(self) -> tuple[CapableAirport, ...]:
+        return self._airports
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: airports = {repr(self._airports)}'
+
+
+
+class LoadRunwayCapabilityEvent:
+    def __init__(self, airport_id: int):
+        self._airport_id = airport_id
+
+
+    def airport_id(self) -> int:
+        return self._airport_id
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: airport_id = {repr(self._airport_id)}'
+
+
+
+class RunwayCapabilityLoadedEvent:
+    def __init__(self, capability: RunwayCapability):
+        self._capability = capability
+
+
+    def capability(self) -> RunwayCapability:
+        return self._capability
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: capability = {repr(self._capability)}'
+
+
+
+class CapabilitySearchFailedEvent:
+    def __init__(self, reason: str):
+        self._reason = reason
+
+
+    def reason(self) -> str:
+        return self._reason
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: reason = {repr(self._reason)}'
@@ -11,6 +11,7 @@
 # YOU WILL NOT NEED TO MODIFY THIS FILE AT ALL
 
 from collections import namedtuple
+from .batches import BatchSaveFailure
 
 
 
@@ -57,6 +58,20 @@ class ContinentSearchResultEvent:
 
 
 
+class ContinentSearchResultsBatchEvent:
+    def __init__(self, continents: tuple[Continent, ...]):
+        self._continents = continents
+
+
+    def continents(self) -> tuple[Continent, ...]:
+        return self._continents
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: continents = {repr(self._continents)}'
+
+
+
 class LoadContinentEvent:
     def __init__(self, continent_id: int):
         self._continent_id = continent_id
@@ -138,3 +153,37 @@ class SaveContinentFailedEvent:
 
     def __repr__(self) -> str:
         return f'{type(self).__name__}: reason = {repr(self._reason)}'
+
+
+
+class SaveContinentsBatchEvent:
+    def __init__(self, continents: tuple[Continent, ...]):
+        self._continents = continents
+
+
+    def continents(self) -> tuple[Continent, ...]:
+        return self._continents
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: continents = {repr(self._continents)}'
+
+
+
+class ContinentsBatchSavedEvent:
+    def __init__(self, saved: tuple[Continent, ...], failures: tuple[BatchSaveFailure, ...]):
+        self._saved = saved
+        self._failures = failures
+
+
+    def saved(self) -> tuple[Continent, ...]:
+        return self._saved
+
+
+    def failures(self) -> tuple[BatchSaveFailure, ...]:
+        return self._failures
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: saved = {repr(self._saved)}, ' + \
+               f'failures = {repr(self._failures)}'
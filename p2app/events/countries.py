@@ -11,6 +11,7 @@
 # YOU WILL NOT NEED TO MODIFY THIS FILE AT ALL
 
 from collections import namedtuple
+from .batches import BatchSaveFailure
 
 
 
@@ -62,6 +63,20 @@ class CountrySearchResultEvent:
 
 
 
+class CountrySearchResultsBatchEvent:
+    def __init__(self, countries: tuple[Country, ...]):
+        self._countries = countries
+
+
+    def countries(self) -> tuple[Country, ...]:
+        return self._countries
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: countries = {repr(self._countries)}'
+
+
+
 class LoadCountryEvent:
     def __init__(self, country_id: int):
         self._country_id = country_id
@@ -143,3 +158,37 @@ class SaveCountryFailedEvent:
 
     def __repr__(self) -> str:
         return f'{type(self).__name__}: reason = {repr(self._reason)}'
+
+
+
+class SaveCountriesBatchEvent:
+    def __init__(self, countries: tuple[Country, ...]):
+        self._countries = countries
+
+
+    def countries(self) -> tuple[Country, ...]:
+        return self._countries
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: countries = {repr(self._countries)}'
+
+
+
+class CountriesBatchSavedEvent:
+    def __init__(self, saved: tuple[Country, ...], failures: tuple[BatchSaveFailure, ...]):
+        self._saved = saved
+        self._failures = failures
+
+
+    def saved(self) -> tuple[Country, ...]:
+        return self._saved
+
+
+    def failures(self) -> tuple[BatchSaveFailure, ...]:
+        return self._failures
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: saved = {repr(self._saved)}, ' + \
+               f'failures = {repr(self._failures)}'
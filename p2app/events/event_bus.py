@@ -10,8 +10,9 @@
 #   results routed back to the user interface.
 # * The user interface's internal events are routed back to the user interface
 #   to be processed, with the engine never seeing them.
-#
-# YOU WILL NOT NEED TO MODIFY THIS FILE AT ALL
+# * When a worker is registered, events are instead queued for the engine to
+#   process on a background thread, and its results are routed back to the user
+#   interface whenever the user interface calls dispatch_results().
 
 
 
@@ -19,6 +20,7 @@ class EventBus:
     def __init__(self):
         self._view = None
         self._engine = None
+        self._worker = None
         self._is_debug_mode = False
 
 
@@ -30,6 +32,10 @@ class EventBus:
         self._engine = engine
 
 
+    def register_worker(self, worker):
+        self._worker = worker
+
+
     def enable_debug_mode(self):
         self._is_debug_mode = True
 
@@ -38,12 +44,32 @@ class EventBus:
         self._is_debug_mode = False
 
 
+    def is_asynchronous(self) -> bool:
+        return self._worker is not None
+
+
     def initiate_event(self, event):
         if self._is_debug_mode:
             print(f'Sent by view  : {event}')
 
-        for result_event in self._engine.process_event(event):
-            if self._is_debug_mode:
-                print(f'Sent by engine: {result_event}')
+        if self._worker is not None:
+            self._worker.submit(event)
+        else:
+            for result_event in self._engine.process_event(event):
+                self._send_to_view(result_event)
+
+
+    def dispatch_results(self, limit = None, stop_when = None):
+        if self._worker is not None:
+            for result_event in self._worker.completed_events(limit):
+                self._send_to_view(result_event)
+
+                if stop_when is not None and stop_when():
+                    break
+
+
+    def _send_to_view(self, result_event):
+        if self._is_debug_mode:
+            print(f'Sent by engine: {result_event}')
 
-            self._view.handle_event(result_event)
+        self._view.handle_event(result_event)
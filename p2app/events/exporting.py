@@ -0,0 +1,172 @@
+# p2app/events/exporting.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Events related to writing the results of a search to a file, or a part of the
+# database to a database of its own.
+
+from pathlib import Path
+
+
+
+# The formats a search's results can be written in: comma-separated values with a
+# header row, or one JSON object per line
+EXPORT_CSV = 'csv'
+EXPORT_JSONL = 'jsonl'
+
+
+
+class ExportEvent:
+    def __init__(self, entity: str, criteria: tuple, path: Path, export_format: str = EXPORT_CSV):
+        self._entity = entity
+        self._criteria = criteria
+        self._path = path
+        self._export_format = export_format
+
+
+    def entity(self) -> str:
+        return self._entity
+
+
+    def criteria(self) -> tuple:
+        return self._criteria
+
+
+    def path(self) -> Path:
+        return self._path
+
+
+    def export_format(self) -> str:
+        return self._export_format
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: entity = {repr(self._entity)}, ' + \
+               f'criteria = {repr(self._criteria)}, path = {repr(self._path)}, ' + \
+               f'export_format = {repr(self._export_format)}'
+
+
+
+class CancelExportEvent:
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}'
+
+
+
+class ExportProgressEvent:
+    def __init__(self, rows: int):
+        self._rows = rows
+
+
+    def rows(self) -> int:
+        return self._rows
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: rows = {repr(self._rows)}'
+
+
+
+class DataExportedEvent:
+    def __init__(self, path: Path, rows: int):
+        self._path = path
+        self._rows = rows
+
+
+    def path(self) -> Path:
+        return self._path
+
+
+    def rows(self) -> int:
+        return self._rows
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: path = {repr(self._path)}, rows = {repr(self._rows)}'
+
+
+
+class ExportCancelledEvent:
+    def __init__(self, rows: int):
+        self._rows = rows
+
+
+    def rows(self) -> int:
+        return self._rows
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: rows = {repr(self._rows)}'
+
+
+
+class ExportFailedEvent:
+    def __init__(self, reason: str):
+        self._reason = reason
+
+
+    def reason(self) -> str:
+        return self._reason
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: reason = {repr(self._reason)}'
+
+
+
+class ExtractDatabaseEvent:
+    def __init__(self, path: Path, continent_code: str | None = None, country_code: str | None = None):
+        self._path = path
+        self._continent_code = continent_code
+        self._country_code = country_code
+
+
+    def path(self) -> Path:
+        return self._path
+
+
+    def continent_code(self) -> str | None:
+        return self._continent_code
+
+
+    def country_code(self) -> str | None:
+        return self._country_code
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: path = {repr(self._path)}, ' + \
+               f'continent_code = {repr(self._continent_code)}, country_code = {repr(self._country_code)}'
+
+
+
+class DatabaseExtractedEvent:
+    def __init__(self, path: Path, rows: dict[str, int]):
+        self._path = path
+        self._rows = rows
+
+
+    def path(self) -> Path:
+        return self._path
+
+
+    def rows(self) -> dict[str, int]:
+        return self._rows
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: path = {repr(self._path)}, rows = {repr(self._rows)}'
+
+
+
+class ExtractFailedEvent:
+    def __init__(self, reason: str):
+        self._reason = reason
+
+
+    def reason(self) -> str:
+        return self._reason
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: reason = {repr(self._reason)}'
@@ -0,0 +1,136 @@
+# p2app/events/importing.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Events related to loading the CSV files published by OurAirports into the open
+# database, either replacing what's there or bringing it up to date.
+
+from collections import namedtuple
+from pathlib import Path
+
+
+
+# The number of rows of a table inserted, updated and deleted by a sync
+TableChanges = namedtuple('TableChanges', ['inserted', 'updated', 'deleted'])
+
+TableChanges.__annotations__ = {
+    'inserted': int,
+    'updated': int,
+    'deleted': int
+}
+
+
+
+class ImportDataEvent:
+    def __init__(self, directory: Path):
+        self._directory = directory
+
+
+    def directory(self) -> Path:
+        return self._directory
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: directory = {repr(self._directory)}'
+
+
+
+class ImportProgressEvent:
+    def __init__(self, table: str, rows: int):
+        self._table = table
+        self._rows = rows
+
+
+    def table(self) -> str:
+        return self._table
+
+
+    def rows(self) -> int:
+        return self._rows
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: table = {repr(self._table)}, rows = {repr(self._rows)}'
+
+
+
+class DataImportedEvent:
+    def __init__(self, imported: dict[str, int], rejected: dict[str, int]):
+        self._imported = imported
+        self._rejected = rejected
+
+
+    def imported(self) -> dict[str, int]:
+        return self._imported
+
+
+    def rejected(self) -> dict[str, int]:
+        return self._rejected
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: imported = {repr(self._imported)}, ' + \
+               f'rejected = {repr(self._rejected)}'
+
+
+
+class ImportFailedEvent:
+    def __init__(self, reason: str):
+        self._reason = reason
+
+
+    def reason(self) -> str:
+        return self._reason
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: reason = {repr(self._reason)}'
+
+
+
+class SyncDataEvent:
+    def __init__(self, directory: Path):
+        self._directory = directory
+
+
+    def directory(self) -> Path:
+        return self._directory
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: directory = {repr(self._directory)}'
+
+
+
+class DataSyncedEvent:
+    def __init__(self, changes: dict[str, TableChanges], rejected: dict[str, int]):
+        self._changes = changes
+        self._rejected = rejected
+
+
+    def changes(self) -> dict[str, TableChanges]:
+        return self._changes
+
+
+    def rejected(self) -> dict[str, int]:
+        return self._rejected
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: changes = {repr(self._changes)}, ' + \
+               f'rejected = {repr(self._rejected)}'
+
+
+
+class SyncFailedEvent:
+    def __init__(self, reason: str):
+        self._reason = reason
+
+
+    def reason(self) -> str:
+        return self._reason
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: reason = {repr(self._reason)}'
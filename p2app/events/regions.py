@@ -11,6 +11,7 @@
 # YOU WILL NOT NEED TO MODIFY THIS FILE AT ALL
 
 from collections import namedtuple
+from .batches import BatchSaveFailure
 
 
 
@@ -71,6 +72,20 @@ class RegionSearchResultEvent:
 
 
 
+class RegionSearchResultsBatchEvent:
+    def __init__(self, regions: tuple[Region, ...]):
+        self._regions = regions
+
+
+    def regions(self) -> tuple[Region, ...]:
+        return self._regions
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: regions = {repr(self._regions)}'
+
+
+
 class LoadRegionEvent:
     def __init__(self, region_id: int):
         self._region_id = region_id
@@ -152,3 +167,37 @@ class SaveRegionFailedEvent:
 
     def __repr__(self) -> str:
         return f'{type(self).__name__}: reason = {repr(self._reason)}'
+
+
+
+class SaveRegionsBatchEvent:
+    def __init__(self, regions: tuple[Region, ...]):
+        self._regions = regions
+
+
+    def regions(self) -> tuple[Region, ...]:
+        return self._regions
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: regions = {repr(self._regions)}'
+
+
+
+class RegionsBatchSavedEvent:
+    def __init__(self, saved: tuple[Region, ...], failures: tuple[BatchSaveFailure, ...]):
+        self._saved = saved
+        self._failures = failures
+
+
+    def saved(self) -> tuple[Region, ...]:
+        return self._saved
+
+
+    def failures(self) -> tuple[BatchSaveFailure, ...]:
+        return self._failures
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: saved = {repr(self._saved)}, ' + \
+               f'failures = {repr(self._failures)}'
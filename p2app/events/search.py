@@ -0,0 +1,50 @@
+# p2app/events/search.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Events that are related to searches whose results are sent one page at a time,
+# regardless of which kind of entity is being searched for.
+
+from collections import namedtuple
+
+
+
+# Where a search left off: the kind of entity being searched for ('continent',
+# 'country', 'region' or 'airport'), the search's criteria, and the sort key of the
+# last result sent, after which the next page begins
+SearchContinuation = namedtuple('SearchContinuation', ['entity', 'criteria', 'last_key'])
+
+SearchContinuation.__annotations__ = {
+    'entity': str,
+    'criteria': tuple,
+    'last_key': tuple
+}
+
+
+
+class SearchPageEndEvent:
+    def __init__(self, continuation: SearchContinuation):
+        self._continuation = continuation
+
+
+    def continuation(self) -> SearchContinuation:
+        return self._continuation
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: continuation = {repr(self._continuation)}'
+
+
+
+class LoadMoreSearchResultsEvent:
+    def __init__(self, continuation: SearchContinuation):
+        self._continuation = continuation
+
+
+    def continuation(self) -> SearchContinuation:
+        return self._continuation
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: continuation = {repr(self._continuation)}'
@@ -0,0 +1,360 @@
+# p2app/events/spatial.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Events related to finding airports, navigation aids and runways by where they
+# are, rather than by their names or codes.
+#
+# The kinds of entity that can be found this way are 'airport', 'navigation_aid'
+# and 'runway' (whose location is that of its thresholds). The events that find
+# airports near many points at once, or compute the distances between a
+# country's airports, need NumPy; without it, they fail with a
+# SpatialSearchFailedEvent.
+#
+# The number of airports in each cell of a map grid can also be asked for, to draw
+# where airports are on a map at any zoom level.
+
+from collections import namedtuple
+
+
+
+# A place that was found: the kind of entity it is, its id and name, the
+# latitude and longitude of the point of it that was found (the nearer threshold,
+# for a runway), and its distance from the point searched around, in kilometres,
+# or None for a search of a box
+Place = namedtuple(
+    'Place', ['entity', 'place_id', 'name', 'latitude_deg', 'longitude_deg', 'distance_km'])
+
+Place.__annotations__ = {
+    'entity': str,
+    'place_id': int,
+    'name': str,
+    'latitude_deg': float,
+    'longitude_deg': float,
+    'distance_km': float | None
+}
+
+
+
+# A cell of a map grid with airports in it: its column and row in the grid at its
+# zoom level (counted from the south-west corner), its edges in degrees, and the
+# number of airports in it
+DensityCell = namedtuple(
+    'DensityCell', ['cell_x', 'cell_y', 'south', 'west', 'north', 'east', 'airports'])
+
+DensityCell.__annotations__ = {
+    'cell_x': int,
+    'cell_y': int,
+    'south': float,
+    'west': float,
+    'north': float,
+    'east': float,
+    'airports': int
+}
+
+
+
+class StartBoxSearchEvent:
+    def __init__(self, entity: str, south: float, west: float, north: float, east: float,
+                 limit: int | None = None):
+        self._entity = entity
+        self._south = south
+        self._west = west
+        self._north = north
+        self._east = east
+        self._limit = limit
+
+
+    def entity(self) -> str:
+        return self._entity
+
+
+    def south(self) -> float:
+        return self._south
+
+
+    def west(self) -> float:
+        return self._west
+
+
+    def north(self) -> float:
+        return self._north
+
+
+    def east(self) -> float:
+        return self._east
+
+
+    def limit(self) -> int | None:
+        return self._limit
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: entity = {repr(self._entity)}, ' + \
+               f'south = {repr(self._south)}, west = {repr(self._west)}, ' + \
+               f'north = {repr(self._north)}, east = {repr(self._east)}, limit = {repr(self._limit)}'
+
+
+
+class StartRadiusSearchEvent:
+    def __init__(self, entity: str, latitude: float, longitude: float, radius_km: float,
+                 limit: int | None = None):
+        self._entity = entity
+        self._latitude = latitude
+        self._longitude = longitude
+        self._radius_km = radius_km
+        self._limit = limit
+
+
+    def entity(self) -> str:
+        return self._entity
+
+
+    def latitude(self) -> float:
+        return self._latitude
+
+
+    def longitude(self) -> float:
+        return self._longitude
+
+
+    def radius_km(self) -> float:
+        return self._radius_km
+
+
+    def limit(self) -> int | None:
+        return self._limit
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: entity = {repr(self._entity)}, ' + \
+               f'latitude = {repr(self._latitude)}, longitude = {repr(self._longitude)}, ' + \
+               f'radius_km = {repr(self._radius_km)}, limit = {repr(self._limit)}'
+
+
+
+class StartNearestSearchEvent:
+    def __init__(self, entity: str, latitude: float, longitude: float, count: int):
+        self._entity = entity
+        self._latitude = latitude
+        self._longitude = longitude
+        self._count = count
+
+
+    def entity(self) -> str:
+        return self._entity
+
+
+    def latitude(self) -> float:
+        return self._latitude
+
+
+    def longitude(self) -> float:
+        return self._longitude
+
+
+    def count(self) -> int:
+        return self._count
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: entity = {repr(self._entity)}, ' + \
+               f'latitude = {repr(self._latitude)}, longitude = {repr(self._longitude)}, ' + \
+               f'count = {repr(self._count)}'
+
+
+
+class PlacesFoundEvent:
+    def __init__(self, entity: str, places: tuple[Place, ...]):
+        self._entity = entity
+        self._places = places
+
+
+    def entity(self) -> str:
+        return self._entity
+
+
+    def places(self) -> tuple[Place, ...]:
+        return self._places
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: entity = {repr(self._entity)}, ' + \
+               f'places = {repr(self._places)}'
+
+
+
+class SpatialSearchFailedEvent:
+    def __init__(self, reason: str):
+        self._reason = reason
+
+
+    def reason(self) -> str:
+        return self._reason
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: reason = {repr(self._reason)}'
+
+
+
+class FindNearestAirportsEvent:
+    def __init__(self, points: tuple[tuple[float, float], ...], count: int):
+        self._points = points
+        self._count = count
+
+
+    def points(self) -> tuple[tuple[float, float], ...]:
+        return self._points
+
+
+    def count(self) -> int:
+        return self._count
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: points = {repr(self._points)}, count = {repr(self._count)}'
+
+
+
+class FindAirportsWithinEvent:
+    def __init__(self, points: tuple[tuple[float, float], ...], radius_km: float):
+        self._points = points
+        self._radius_km = radius_km
+
+
+    def points(self) -> tuple[tuple[float, float], ...]:
+        return self._points
+
+
+    def radius_km(self) -> float:
+        return self._radius_km
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: points = {repr(self._points)}, ' + \
+               f'radius_km = {repr(self._radius_km)}'
+
+
+
+class NearbyAirportsFoundEvent:
+    def __init__(self, places: tuple[tuple[Place, ...], ...]):
+        self._places = places
+
+
+    def places(self) -> tuple[tuple[Place, ...], ...]:
+        return self._places
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: places = {repr(self._places)}'
+
+
+
+class ComputeDistanceMatrixEvent:
+    def __init__(self, country_id: int):
+        self._country_id = country_id
+
+
+    def country_id(self) -> int:
+        return self._country_id
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: country_id = {repr(self._country_id)}'
+
+
+
+# The distances are a NumPy array, whose row i and column j hold the distance in
+# kilometres between the airports whose ids are airport_ids[i] and airport_ids[j]
+class DistanceMatrixComputedEvent:
+    def __init__(self, country_id: int, airport_ids: tuple[int, ...], distances):
+        self._country_id = country_id
+        self._airport_ids = airport_ids
+        self._distances = distances
+
+
+    def country_id(self) -> int:
+        return self._country_id
+
+
+    def airport_ids(self) -> tuple[int, ...]:
+        return self._airport_ids
+
+
+    def distances(self):
+        return self._distances
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: country_id = {repr(self._country_id)}, ' + \
+               f'airport_ids = {repr(self._airport_ids)}, distances = {repr(self._distances)}'
+
+
+
+class StartDensitySearchEvent:
+    def __init__(self, zoom: int, south: float, west: float, north: float, east: float,
+                 airport_type: str | None = None, scheduled_service: bool | None = None):
+        self._zoom = zoom
+        self._south = south
+        self._west = west
+        self._north = north
+        self._east = east
+        self._airport_type = airport_type
+        self._scheduled_service = scheduled_service
+
+
+    def zoom(self) -> int:
+        return self._zoom
+
+
+    def south(self) -> float:
+        return self._south
+
+
+    def west(self) -> float:
+        return self._west
+
+
+    def north(self) -> float:
+        return self._north
+
+
+    def east(self) -> float:
+        return self._east
+
+
+    def airport_type(self) -> str | None:
+        return self._airport_type
+
+
+    def scheduled_service(self) -> bool | None:
+        return self._scheduled_service
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: zoom = {repr(self._zoom)}, ' + \
+               f'south = {repr(self._south)}, west = {repr(self._west)}, ' + \
+               f'north = {repr(self._north)}, east = {repr(self._east)}, ' + \
+               f'airport_type = {repr(self._airport_type)}, ' + \
+               f'scheduled_service = {repr(self._scheduled_service)}'
+
+
+
+class AirportDensityEvent:
+    def __init__(self, zoom: int, cells: tuple[DensityCell, ...]):
+        self._zoom = zoom
+        self._cells = cells
+
+
+    def zoom(self) -> int:
+        return self._zoom
+
+
+    def cells(self) -> tuple[DensityCell, ...]:
+        return self._cells
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: zoom = {repr(self._zoom)}, cells = {repr(self._cells)}'
@@ -0,0 +1,117 @@
+# p2app/events/summary.py
+#
+# ICS 33 Winter 2024
+# Project 2: Learning to Fly
+#
+# Events related to the number of regions, airports and runways in each continent,
+# country and region.
+#
+# The counts are read from summary tables that the database keeps up to date as
+# it's written to, when it has them, and are counted from the rows themselves when
+# it doesn't. A runway is counted in the areas its airport is in.
+
+from collections import namedtuple
+
+
+
+# The kinds of area whose regions, airports and runways are counted
+AREA_CONTINENT = 'continent'
+AREA_COUNTRY = 'country'
+AREA_REGION = 'region'
+
+
+
+# What's in one continent, country or region: the kind of area it is and its id,
+# the number of regions in it (None for a region), and the number of airports and
+# runways in it, in all and by the type of airport and the runway's surface (None
+# for runways whose surface isn't known)
+AreaSummary = namedtuple(
+    'AreaSummary',
+    ['area', 'area_id', 'regions', 'airports', 'airports_by_type', 'runways', 'runways_by_surface'])
+
+AreaSummary.__annotations__ = {
+    'area': str,
+    'area_id': int,
+    'regions': int | None,
+    'airports': int,
+    'airports_by_type': dict[str, int],
+    'runways': int,
+    'runways_by_surface': dict[str | None, int]
+}
+
+
+
+class LoadAreaSummaryEvent:
+    def __init__(self, area: str, area_id: int | None = None):
+        self._area = area
+        self._area_id = area_id
+
+
+    def area(self) -> str:
+        return self._area
+
+
+    def area_id(self) -> int | None:
+        return self._area_id
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: area = {repr(self._area)}, area_id = {repr(self._area_id)}'
+
+
+
+class AreaSummariesLoadedEvent:
+    def __init__(self, area: str, summaries: tuple[AreaSummary, ...]):
+        self._area = area
+        self._summaries = summaries
+
+
+    def area(self) -> str:
+        return self._area
+
+
+    def summaries(self) -> tuple[AreaSummary, ...]:
+        return self._summaries
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: area = {repr(self._area)}, summaries = {repr(self._summaries)}'
+
+
+
+class RebuildAreaSummariesEvent:
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}'
+
+
+
+class AreaSummariesRebuiltEvent:
+    def __init__(self, created: bool, drifted: int):
+        self._created = created
+        self._drifted = drifted
+
+
+    def created(self) -> bool:
+        return self._created
+
+
+    def drifted(self) -> int:
+        return self._drifted
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: created = {repr(self._created)}, drifted = {repr(self._drifted)}'
+
+
+
+class AreaSummaryFailedEvent:
+    def __init__(self, reason: str):
+        self._reason = reason
+
+
+    def reason(self) -> str:
+        return self._reason
+
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}: reason = {repr(self._reason)}'
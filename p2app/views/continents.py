@@ -19,6 +19,9 @@ from .events import *
 class ContinentsView(tkinter.Frame, EventHandler):
     def __init__(self, parent):
         super().__init__(parent)
+        self.subscribe(
+            SaveContinentFailedEvent, DiscardContinentEvent, NewContinentEvent,
+            StartEditingContinentEvent, ContinentLoadedEvent, ContinentSavedEvent)
 
         search_view = _ContinentsSearchView(self)
         search_view.grid(row = 0, column = 0, sticky = tkinter.NSEW)
@@ -61,6 +64,9 @@ class ContinentsView(tkinter.Frame, EventHandler):
 class _ContinentsSearchView(tkinter.LabelFrame, EventHandler):
     def __init__(self, parent):
         super().__init__(parent, text = 'Continent Search')
+        self.subscribe(
+            ClearContinentsSearchListEvent, SearchPageEndEvent, ContinentSearchResultEvent,
+            ContinentSearchResultsBatchEvent)
 
         code_label = tkinter.Label(self, text = 'Continent Code: ')
         code_label.grid(row = 0, column = 0, padx = 5, pady = 5, sticky = tkinter.E)
@@ -103,17 +109,25 @@ class _ContinentsSearchView(tkinter.LabelFrame, EventHandler):
         button_frame = tkinter.Frame(self)
         button_frame.grid(row = 4, column = 2, sticky = tkinter.E, padx = 5, pady = 5)
 
+        self._load_more_button = tkinter.Button(
+            button_frame, text = 'Load More', state = tkinter.DISABLED,
+            command = self._on_load_more)
+
+        self._load_more_button.grid(row = 0, column = 0, padx = 5, pady = 5)
+
+        self._search_continuation = None
+
         self._new_button = tkinter.Button(
             button_frame, text = 'New Continent',
             command = self._on_new_continent)
 
-        self._new_button.grid(row = 0, column = 0, padx = 5, pady = 5)
+        self._new_button.grid(row = 0, column = 1, padx = 5, pady = 5)
 
         self._edit_button = tkinter.Button(
             button_frame, text = 'Edit Continent', state = tkinter.DISABLED,
             command = self._on_edit_continent)
 
-        self._edit_button.grid(row = 0, column = 1, padx = 5, pady = 5)
+        self._edit_button.grid(row = 0, column = 2, padx = 5, pady = 5)
 
         self.rowconfigure(0, weight = 0)
         self.rowconfigure(1, weight = 0)
@@ -164,6 +178,13 @@ class _ContinentsSearchView(tkinter.LabelFrame, EventHandler):
         self._edit_button['state'] = new_state
 
 
+    def _on_load_more(self):
+        continuation = self._search_continuation
+        self._search_continuation = None
+        self._load_more_button['state'] = tkinter.DISABLED
+        self.initiate_event(LoadMoreSearchResultsEvent(continuation))
+
+
     def _on_new_continent(self):
         self.initiate_event(DiscardContinentEvent())
         self.initiate_event(NewContinentEvent())
@@ -180,10 +201,19 @@ class _ContinentsSearchView(tkinter.LabelFrame, EventHandler):
             self._search_list.delete(0, tkinter.END)
             self._search_continent_ids = []
             self._edit_button['state'] = tkinter.DISABLED
+            self._search_continuation = None
+            self._load_more_button['state'] = tkinter.DISABLED
+        elif isinstance(event, SearchPageEndEvent) and event.continuation().entity == 'continent':
+            self._search_continuation = event.continuation()
+            self._load_more_button['state'] = tkinter.NORMAL
         elif isinstance(event, ContinentSearchResultEvent):
             display_name = f'{event.continent().continent_code} - {event.continent().name}'
             self._search_list.insert(tkinter.END, display_name)
             self._search_continent_ids.append(event.continent().continent_id)
+        elif isinstance(event, ContinentSearchResultsBatchEvent):
+            display_names = [f'{continent.continent_code} - {continent.name}' for continent in event.continents()]
+            self._search_list.insert(tkinter.END, *display_names)
+            self._search_continent_ids.extend(continent.continent_id for continent in event.continents())
 
 
 
@@ -19,6 +19,9 @@ from .events import *
 class CountriesView(tkinter.Frame, EventHandler):
     def __init__(self, parent):
         super().__init__(parent)
+        self.subscribe(
+            SaveCountryFailedEvent, DiscardCountryEvent, NewCountryEvent,
+            StartEditingCountryEvent, CountryLoadedEvent, CountrySavedEvent)
 
         search_view = _CountriesSearchView(self)
         search_view.grid(row = 0, column = 0, sticky = tkinter.NSEW)
@@ -62,6 +65,9 @@ class CountriesView(tkinter.Frame, EventHandler):
 class _CountriesSearchView(tkinter.LabelFrame, EventHandler):
     def __init__(self, parent):
         super().__init__(parent, text = 'Country Search')
+        self.subscribe(
+            ClearCountriesSearchListEvent, SearchPageEndEvent, CountrySearchResultEvent,
+            CountrySearchResultsBatchEvent)
 
         code_label = tkinter.Label(self, text = 'Country Code: ')
         code_label.grid(row = 0, column = 0, padx = 5, pady = 5, sticky = tkinter.E)
@@ -104,17 +110,25 @@ class _CountriesSearchView(tkinter.LabelFrame, EventHandler):
         button_frame = tkinter.Frame(self)
         button_frame.grid(row = 4, column = 2, sticky = tkinter.E, padx = 5, pady = 5)
 
+        self._load_more_button = tkinter.Button(
+            button_frame, text = 'Load More', state = tkinter.DISABLED,
+            command = self._on_load_more)
+
+        self._load_more_button.grid(row = 0, column = 0, padx = 5, pady = 5)
+
+        self._search_continuation = None
+
         self._new_button = tkinter.Button(
             button_frame, text = 'New Country',
             command = self._on_new_country)
 
-        self._new_button.grid(row = 0, column = 0, padx = 5, pady = 5)
+        self._new_button.grid(row = 0, column = 1, padx = 5, pady = 5)
 
         self._edit_button = tkinter.Button(
             button_frame, text = 'Edit Country', state = tkinter.DISABLED,
             command = self._on_edit_country)
 
-        self._edit_button.grid(row = 0, column = 1, padx = 5, pady = 5)
+        self._edit_button.grid(row = 0, column = 2, padx = 5, pady = 5)
 
         self.rowconfigure(0, weight = 0)
         self.rowconfigure(1, weight = 0)
@@ -165,6 +179,13 @@ class _CountriesSearchView(tkinter.LabelFrame, EventHandler):
         self._edit_button['state'] = new_state
 
 
+    def _on_load_more(self):
+        continuation = self._search_continuation
+        self._search_continuation = None
+        self._load_more_button['state'] = tkinter.DISABLED
+        self.initiate_event(LoadMoreSearchResultsEvent(continuation))
+
+
     def _on_new_country(self):
         self.initiate_event(DiscardCountryEvent())
         self.initiate_event(NewCountryEvent())
@@ -181,10 +202,19 @@ class _CountriesSearchView(tkinter.LabelFrame, EventHandler):
             self._search_list.delete(0, tkinter.END)
             self._search_country_ids = []
             self._edit_button['state'] = tkinter.DISABLED
+            self._search_continuation = None
+            self._load_more_button['state'] = tkinter.DISABLED
+        elif isinstance(event, SearchPageEndEvent) and event.continuation().entity == 'country':
+            self._search_continuation = event.continuation()
+            self._load_more_button['state'] = tkinter.NORMAL
         elif isinstance(event, CountrySearchResultEvent):
             display_name = f'{event.country().country_code} - {event.country().name}'
             self._search_list.insert(tkinter.END, display_name)
             self._search_country_ids.append(event.country().country_id)
+        elif isinstance(event, CountrySearchResultsBatchEvent):
+            display_names = [f'{country.country_code} - {country.name}' for country in event.countries()]
+            self._search_list.insert(tkinter.END, *display_names)
+            self._search_country_ids.extend(country.country_id for country in event.countries())
 
 
 
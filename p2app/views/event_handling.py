@@ -7,9 +7,13 @@
 # (e.g., the events returned from the p2app.engine package, or events that are
 # internal to the user interface).
 #
-# YOU WILL NOT NEED TO MODIFY THIS FILE AT ALL
+# Each component subscribes to the types of events it handles, and an event is
+# delivered only to the components subscribed to its type, in the same order as it
+# would be if every component were given it, but without walking the parts of the
+# user interface where none of them are.
 
 import tkinter
+import weakref
 
 
 
@@ -27,18 +31,12 @@ class EventHandler:
             widget.initiate_event(event)
 
 
-    def handle_event(self, event):
-        self.on_event(event)
-
-        if isinstance(self, tkinter.Tk) or isinstance(self, tkinter.Widget):
-            for child in self.winfo_children():
-                if not child.winfo_exists():
-                    continue
+    def subscribe(self, *event_types):
+        _router_for(self).subscribe(self, event_types)
 
-                if isinstance(child, EventHandler):
-                    child.handle_event(event)
 
-        self.on_event_post(event)
+    def handle_event(self, event):
+        _router_for(self).deliver(self, event)
 
 
     def on_event(self, event):
@@ -47,3 +45,128 @@ class EventHandler:
 
     def on_event_post(self, event):
         pass
+
+
+
+class _EventRouter:
+    def __init__(self):
+        self._subscriptions = {}
+        self._handlers_by_type = {}
+        self._version = 0
+        self._routes_cache = None
+
+
+    def subscribe(self, handler, event_types):
+        reference = weakref.ref(handler, self._forget)
+
+        for event_type in event_types:
+            self._subscriptions.setdefault(event_type, []).append(reference)
+
+        self._changed()
+
+
+    def deliver(self, origin, event):
+        # The event goes where handle_event has always sent it: to the origin and then,
+        # depth first, to each of its children that's an EventHandler, with on_event
+        # called on the way down and on_event_post on the way back up. The only
+        # difference is that a subtree with no component subscribed to the event's
+        # type isn't walked at all.
+        try:
+            self._walk(origin, event)
+        finally:
+            self._routes_cache = None
+
+
+    def _walk(self, widget, event):
+        subscribed = self._routes(type(event)).get(widget, False)
+
+        if subscribed:
+            widget.on_event(event)
+
+        # The children are listed after on_event, so that any it creates (which
+        # subscribe as they're created) are given the event too
+        if isinstance(widget, tkinter.Tk) or isinstance(widget, tkinter.Widget):
+            for child in widget.winfo_children():
+                if isinstance(child, EventHandler) and child in self._routes(type(event)) and _exists(child):
+                    self._walk(child, event)
+
+        if subscribed:
+            widget.on_event_post(event)
+
+
+    def _routes(self, event_type):
+        # Maps each component subscribed to a type of event to True, and each
+        # component containing one of them to False, so that the walk can skip the
+        # rest; it's worked out again whenever a subscription changes
+        key = (self._version, event_type)
+
+        if self._routes_cache is None or self._routes_cache[0] != key:
+            routes = {}
+
+            for handler in self._handlers_for(event_type):
+                routes[handler] = True
+                widget = handler.master
+
+                while widget is not None and widget not in routes:
+                    routes[widget] = False
+                    widget = widget.master
+
+            self._routes_cache = (key, routes)
+
+        return self._routes_cache[1]
+
+
+    def _changed(self):
+        self._handlers_by_type.clear()
+        self._version += 1
+
+
+    def _forget(self, dead_ref):
+        for event_type, references in self._subscriptions.items():
+            self._subscriptions[event_type] = [ref for ref in references if ref is not dead_ref]
+
+        self._changed()
+
+
+    def _handlers_for(self, event_type):
+        if event_type not in self._handlers_by_type:
+            references = []
+
+            for base_type in event_type.__mro__:
+                if base_type in self._subscriptions:
+                    live = [ref for ref in self._subscriptions[base_type] if _exists(ref())]
+                    self._subscriptions[base_type] = live
+                    references.extend(live)
+
+            self._handlers_by_type[event_type] = references
+
+        handlers = [ref() for ref in self._handlers_by_type[event_type]]
+
+        # A handler that has been destroyed since the list was built means the list
+        # needs to be pruned and built again
+        if not all(_exists(handler) for handler in handlers):
+            del self._handlers_by_type[event_type]
+            return self._handlers_for(event_type)
+
+        return handlers
+
+
+
+def _router_for(widget):
+    root = widget._root()
+
+    if not hasattr(root, '_event_router'):
+        root._event_router = _EventRouter()
+
+    return root._event_router
+
+
+
+def _exists(widget):
+    if widget is None:
+        return False
+
+    try:
+        return bool(widget.winfo_exists())
+    except tkinter.TclError:
+        return False
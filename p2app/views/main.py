@@ -24,16 +24,23 @@ _INITIAL_WINDOW_WIDTH = 800
 _INITIAL_WINDOW_HEIGHT = 600
 _PROJECT_NAME = 'ICS 33 - Project 2'
 _MISSING_DATABASE_NAME = '[no database open]'
+_RESULT_POLL_INTERVAL_MS = 20
+_RESULT_POLL_BATCH_SIZE = 200
 
 
 
 class MainView(tkinter.Tk, EventHandler):
     def __init__(self, event_bus):
         super().__init__()
+        self.subscribe(
+            ShowEditContinentsViewEvent, ShowEditCountriesViewEvent, ShowEditRegionsViewEvent,
+            DatabaseOpenedEvent, DatabaseClosedEvent, DatabaseOpenFailedEvent,
+            EnableDebugModeEvent, DisableDebugModeEvent, EndApplicationEvent, ErrorEvent)
         self.geometry(f'{_INITIAL_WINDOW_WIDTH}x{_INITIAL_WINDOW_HEIGHT}')
         self.config(menu = MainMenu(self))
         self._event_bus = event_bus
         self._current_view = None
+        self._is_ended = False
         self.rowconfigure(0, weight = 1)
         self.columnconfigure(0, weight = 1)
 
@@ -48,9 +55,23 @@ class MainView(tkinter.Tk, EventHandler):
     def run(self):
         self._switch_view(EmptyView(self))
         self._update_database_path(None)
+
+        if self._event_bus.is_asynchronous():
+            self.after(_RESULT_POLL_INTERVAL_MS, self._poll_engine_results)
+
         self.mainloop()
 
 
+    def _poll_engine_results(self):
+        # Engine results arrive from the worker thread, but may only be handled on
+        # the Tk thread, so they're drained here in bounded batches, stopping once
+        # the application has ended and its windows are gone
+        self._event_bus.dispatch_results(_RESULT_POLL_BATCH_SIZE, lambda: self._is_ended)
+
+        if not self._is_ended:
+            self.after(_RESULT_POLL_INTERVAL_MS, self._poll_engine_results)
+
+
     def on_event(self, event):
         if isinstance(event, ShowEditContinentsViewEvent):
             self._switch_view(ContinentsView(self))
@@ -75,6 +96,7 @@ class MainView(tkinter.Tk, EventHandler):
 
     def on_event_post(self, event):
         if isinstance(event, EndApplicationEvent):
+            self._is_ended = True
             self.destroy()
         elif isinstance(event, ErrorEvent):
             tkinter.messagebox.showerror('Error', event.message())
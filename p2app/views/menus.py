@@ -28,6 +28,7 @@ class BaseMenu(tkinter.Menu, EventHandler):
 class MainMenu(BaseMenu):
     def __init__(self, parent):
         super().__init__(parent)
+        self.subscribe(DatabaseOpenedEvent, DatabaseClosedEvent)
         self.add_cascade(label = 'File', menu = FileMenu(self))
         self.add_cascade(label = 'Debug', menu = DebugMenu(self))
 
@@ -43,6 +44,7 @@ class MainMenu(BaseMenu):
 class FileMenu(BaseMenu):
     def __init__(self, parent):
         super().__init__(parent)
+        self.subscribe(DatabaseOpenedEvent, DatabaseClosedEvent)
         self.add_command(label = 'Open', state = tkinter.NORMAL, command = self._on_open)
         self.add_command(label = 'Close', state = tkinter.DISABLED, command = self._on_close)
         self.add_command(label = 'Exit', command = self._on_exit)
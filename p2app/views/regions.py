@@ -19,6 +19,9 @@ from .events import *
 class RegionsView(tkinter.Frame, EventHandler):
     def __init__(self, parent):
         super().__init__(parent)
+        self.subscribe(
+            SaveRegionFailedEvent, DiscardRegionEvent, NewRegionEvent,
+            StartEditingRegionEvent, RegionLoadedEvent, RegionSavedEvent)
 
         search_view = _RegionsSearchView(self)
         search_view.grid(row = 0, column = 0, sticky = tkinter.NSEW)
@@ -62,6 +65,9 @@ class RegionsView(tkinter.Frame, EventHandler):
 class _RegionsSearchView(tkinter.LabelFrame, EventHandler):
     def __init__(self, parent):
         super().__init__(parent, text = 'Region Search')
+        self.subscribe(
+            ClearRegionsSearchListEvent, SearchPageEndEvent, RegionSearchResultEvent,
+            RegionSearchResultsBatchEvent)
 
         region_code_label = tkinter.Label(self, text = 'Region Code: ')
         region_code_label.grid(row = 0, column = 0, padx = 5, pady = 5, sticky = tkinter.E)
@@ -113,17 +119,25 @@ class _RegionsSearchView(tkinter.LabelFrame, EventHandler):
         button_frame = tkinter.Frame(self)
         button_frame.grid(row = 5, column = 2, sticky = tkinter.E, padx = 5, pady = 5)
 
+        self._load_more_button = tkinter.Button(
+            button_frame, text = 'Load More', state = tkinter.DISABLED,
+            command = self._on_load_more)
+
+        self._load_more_button.grid(row = 0, column = 0, padx = 5, pady = 5)
+
+        self._search_continuation = None
+
         self._new_button = tkinter.Button(
             button_frame, text = 'New Region',
             command = self._on_new_region)
 
-        self._new_button.grid(row = 0, column = 0, padx = 5, pady = 5)
+        self._new_button.grid(row = 0, column = 1, padx = 5, pady = 5)
 
         self._edit_button = tkinter.Button(
             button_frame, text = 'Edit Region', state = tkinter.DISABLED,
             command = self._on_edit_region)
 
-        self._edit_button.grid(row = 0, column = 1, padx = 5, pady = 5)
+        self._edit_button.grid(row = 0, column = 2, padx = 5, pady = 5)
 
         self.rowconfigure(0, weight = 0)
         self.rowconfigure(1, weight = 0)
@@ -184,6 +198,13 @@ class _RegionsSearchView(tkinter.LabelFrame, EventHandler):
         self._edit_button['state'] = new_state
 
 
+    def _on_load_more(self):
+        continuation = self._search_continuation
+        self._search_continuation = None
+        self._load_more_button['state'] = tkinter.DISABLED
+        self.initiate_event(LoadMoreSearchResultsEvent(continuation))
+
+
     def _on_new_region(self):
         self.initiate_event(DiscardRegionEvent())
         self.initiate_event(NewRegionEvent())
@@ -200,10 +221,19 @@ class _RegionsSearchView(tkinter.LabelFrame, EventHandler):
             self._search_list.delete(0, tkinter.END)
             self._search_region_ids = []
             self._edit_button['state'] = tkinter.DISABLED
+            self._search_continuation = None
+            self._load_more_button['state'] = tkinter.DISABLED
+        elif isinstance(event, SearchPageEndEvent) and event.continuation().entity == 'region':
+            self._search_continuation = event.continuation()
+            self._load_more_button['state'] = tkinter.NORMAL
         elif isinstance(event, RegionSearchResultEvent):
             display_name = f'{event.region().region_code} - {event.region().name}'
             self._search_list.insert(tkinter.END, display_name)
             self._search_region_ids.append(event.region().region_id)
+        elif isinstance(event, RegionSearchResultsBatchEvent):
+            display_names = [f'{region.region_code} - {region.name}' for region in event.regions()]
+            self._search_list.insert(tkinter.END, *display_names)
+            self._search_region_ids.extend(region.region_id for region in event.regions())
 
 
 
@@ -9,18 +9,27 @@
 
 from p2app import EventBus
 from p2app import Engine
+from p2app import EngineWorker
 from p2app import MainView
+from p2app.engine.validation import DEFAULT_KNOWN_GOOD_PATH
 
 
 def main():
     event_bus = EventBus()
-    engine = Engine()
+    engine = Engine(known_good_path = DEFAULT_KNOWN_GOOD_PATH)
+    worker = EngineWorker(engine)
     main_view = MainView(event_bus)
 
     event_bus.register_engine(engine)
+    event_bus.register_worker(worker)
     event_bus.register_view(main_view)
 
-    main_view.run()
+    worker.start()
+
+    try:
+        main_view.run()
+    finally:
+        worker.stop()
 
 
 if __name__ == '__main__':